@@ -2,12 +2,17 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.mutable import MutableDict
+from sqlalchemy.orm.attributes import flag_modified
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.exceptions import Unauthorized
 import os
-import json
 from dotenv import load_dotenv
+from json_provider import init_json_provider
+import patient_search
+import report_store
 import jwt
 from werkzeug.exceptions import Unauthorized, InternalServerError
 
@@ -43,19 +48,42 @@ else:
     app.config['ENFORCE_AUTH_UNTIL'] = None
     # Explicitly ensure it's None, not an empty string or other falsy value
 
+# JSON responses: 'orjson' (fast, default) or 'default' (Flask's stdlib provider)
+app.config['JSON_PROVIDER'] = os.getenv('JSON_PROVIDER', 'orjson')
+init_json_provider(app)
+
+# Response cache for the dashboard: 'memory' (per-worker LRU) or 'redis' (shared by workers)
+app.config['CACHE_BACKEND'] = os.getenv('CACHE_BACKEND', 'memory')
+app.config['CACHE_REDIS_URL'] = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+app.config['DASHBOARD_CACHE_TTL'] = int(os.getenv('DASHBOARD_CACHE_TTL', '60'))
+# ?since= delta sync: how long deletions are remembered (older tokens get 410 and a full reload)
+app.config['SYNC_TOMBSTONE_RETENTION_DAYS'] = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', '30'))
+# Report bodies: 'zlib' (default) or 'zstd' (needs the zstandard package), see report_store.py
+app.config['REPORT_COMPRESSION'] = os.getenv('REPORT_COMPRESSION', 'zlib')
+# Patient avatar images (content-addressed files, see avatar_store.py)
+app.config['AVATAR_STORAGE_DIR'] = os.getenv('AVATAR_STORAGE_DIR', os.path.join(app.instance_path, 'avatars'))
+
 # Initialize extensions
 db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+migrate = Migrate(app, db, render_as_batch=True,  # SQLite needs batch mode for ALTER
+                  # the name search index is raw DDL (patient_search), not part of the models
+                  include_name=lambda name, type_, parents: not patient_search.is_search_object(name))
 # Configure CORS to allow Authorization header and credentials
 CORS(app, 
      resources={r"/api/*": {
          "origins": "*",
          "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         "allow_headers": ["Content-Type", "Authorization"],
-         "expose_headers": ["Content-Type"],
+         "allow_headers": ["Content-Type", "Authorization", "If-None-Match", "If-Modified-Since"],
+         "expose_headers": ["Content-Type", "ETag", "Last-Modified"],
          "supports_credentials": True
      }})
 
+# Structured columns: JSONB on Postgres, JSON (text + JSON1) on SQLite. Values are
+# decoded once when the row is loaded and the getters below return them as-is.
+# MutableDict marks the column dirty on in-place top-level edits; the setters
+# flag it too, so nested edits written back through them are saved.
+JSONType = MutableDict.as_mutable(db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql'))
+
 # Define models HERE after db is initialized to avoid circular import issues
 class User(db.Model):
     """User model for authentication"""
@@ -108,6 +136,19 @@ class User(db.Model):
 class Patient(db.Model):
     """Patient model"""
     __tablename__ = 'patients'
+    __table_args__ = (
+        db.Index('ix_patients_doctor_id_risk_score', 'doctor_id', 'risk_score'),
+        db.Index('ix_patients_doctor_id_risk_level', 'doctor_id', 'risk_level'),
+        db.Index('ix_patients_doctor_id_diagnosis_date', 'doctor_id', 'diagnosis_date'),
+        db.Index('ix_patients_doctor_id_id', 'doctor_id', 'id'),
+        db.Index('ix_patients_doctor_id_updated_at', 'doctor_id', 'updated_at'),
+        # server-side list filters and sort keys
+        db.Index('ix_patients_doctor_id_cancer_type', 'doctor_id', 'cancer_type'),
+        db.Index('ix_patients_doctor_id_stage', 'doctor_id', 'stage'),
+        db.Index('ix_patients_doctor_id_status', 'doctor_id', 'status'),
+        db.Index('ix_patients_doctor_id_age', 'doctor_id', 'age'),
+        db.Index('ix_patients_doctor_id_name', 'doctor_id', 'name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -117,18 +158,18 @@ class Patient(db.Model):
     phone = db.Column(db.String(20))
     address = db.Column(db.String(300))
     status = db.Column(db.String(50))
-    avatar_url = db.Column(db.Text)
+    avatar_url = db.Column(db.Text)  # /api/avatars/<sha256>.<ext>, or an external URL
     
     cancer_type = db.Column(db.String(100), nullable=False)
     cancer_subtype = db.Column(db.String(100))
     stage = db.Column(db.String(20))
     diagnosis_date = db.Column(db.Date)
     
-    clinical_data = db.Column(db.Text)
+    clinical_data = db.Column(JSONType)
     risk_score = db.Column(db.Float, default=0.0)
     risk_level = db.Column(db.String(20), default='low')
-    ml_recommendations = db.Column(db.Text)
-    treatment_protocol = db.Column(db.Text)
+    ml_recommendations = db.Column(JSONType)
+    treatment_protocol = db.Column(JSONType)
     
     doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -138,22 +179,25 @@ class Patient(db.Model):
     reports = db.relationship('Report', backref='patient', lazy=True, cascade='all, delete-orphan')
     
     def set_clinical_data(self, data):
-        self.clinical_data = json.dumps(data) if data else None
+        self.clinical_data = data if data else None
+        flag_modified(self, 'clinical_data')
     
     def get_clinical_data(self):
-        return json.loads(self.clinical_data) if self.clinical_data else {}
+        return self.clinical_data or {}
     
     def set_ml_recommendations(self, recommendations):
-        self.ml_recommendations = json.dumps(recommendations) if recommendations else None
+        self.ml_recommendations = recommendations if recommendations else None
+        flag_modified(self, 'ml_recommendations')
     
     def get_ml_recommendations(self):
-        return json.loads(self.ml_recommendations) if self.ml_recommendations else {}
+        return self.ml_recommendations or {}
     
     def set_treatment_protocol(self, protocol):
-        self.treatment_protocol = json.dumps(protocol) if protocol else None
+        self.treatment_protocol = protocol if protocol else None
+        flag_modified(self, 'treatment_protocol')
     
     def get_treatment_protocol(self):
-        return json.loads(self.treatment_protocol) if self.treatment_protocol else {}
+        return self.treatment_protocol or {}
     
     def calculate_risk_level(self):
         if self.risk_score <= 50:
@@ -163,34 +207,45 @@ class Patient(db.Model):
         else:
             self.risk_level = 'high'
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'age': self.age,
-            'gender': self.gender,
-            'email': self.email,
-            'phone': self.phone,
-            'address': self.address,
-            'status': self.status,
-            'avatar_url': self.avatar_url,
-            'cancer_type': self.cancer_type,
-            'cancer_subtype': self.cancer_subtype,
-            'stage': self.stage,
-            'diagnosis_date': self.diagnosis_date.isoformat() if self.diagnosis_date else None,
-            'clinical_data': self.get_clinical_data(),
-            'risk_score': self.risk_score,
-            'risk_level': self.risk_level,
-            'ml_recommendations': self.get_ml_recommendations(),
-            'treatment_protocol': self.get_treatment_protocol(),
-            'doctor_id': self.doctor_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    # Columns a list view can request with ?fields= (JSON text columns are decoded on output)
+    FIELDS = (
+        'id', 'name', 'age', 'gender', 'email', 'phone', 'address', 'status', 'avatar_url',
+        'cancer_type', 'cancer_subtype', 'stage', 'diagnosis_date', 'clinical_data',
+        'risk_score', 'risk_level', 'ml_recommendations', 'treatment_protocol',
+        'doctor_id', 'created_at', 'updated_at'
+    )
+    # ?view=summary: what list/grid cards show, no JSON columns
+    SUMMARY_FIELDS = (
+        'id', 'name', 'age', 'gender', 'status', 'avatar_url', 'cancer_type', 'cancer_subtype', 'stage',
+        'diagnosis_date', 'risk_score', 'risk_level', 'doctor_id', 'created_at', 'updated_at'
+    )
+    JSON_FIELDS = {
+        'clinical_data': 'get_clinical_data',
+        'ml_recommendations': 'get_ml_recommendations',
+        'treatment_protocol': 'get_treatment_protocol',
+    }
+    
+    def to_dict(self, fields=None):
+        """Serialize the patient; `fields` limits output (and JSON decoding) to those keys"""
+        data = {}
+        for field in fields or self.FIELDS:
+            if field in self.JSON_FIELDS:
+                value = getattr(self, self.JSON_FIELDS[field])()
+            else:
+                value = getattr(self, field)
+                if field in ('diagnosis_date', 'created_at', 'updated_at'):
+                    value = value.isoformat() if value else None
+            data[field] = value
+        return data
 
 class Appointment(db.Model):
     """Appointment model"""
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('ix_appointments_doctor_id_created_at', 'doctor_id', 'created_at'),
+        db.Index('ix_appointments_doctor_id_id', 'doctor_id', 'id'),
+        db.Index('ix_appointments_doctor_id_updated_at', 'doctor_id', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
@@ -212,40 +267,75 @@ class Appointment(db.Model):
             'appointment_type': self.appointment_type,
             'notes': self.notes,
             'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class ReportBlob(db.Model):
+    """Compressed report body, shared by every report with the same content (see report_store.py)"""
+    __tablename__ = 'report_blobs'
+    
+    content_hash = db.Column(db.String(64), primary_key=True)
+    encoding = db.Column(db.String(10), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class Report(db.Model):
     """Report model"""
     __tablename__ = 'reports'
+    __table_args__ = (
+        db.Index('ix_reports_doctor_id_generated_at', 'doctor_id', 'generated_at'),
+        db.Index('ix_reports_doctor_id_id', 'doctor_id', 'id'),
+        db.Index('ix_reports_doctor_id_updated_at', 'doctor_id', 'updated_at'),
+        db.Index('ix_reports_report_hash', 'report_hash'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
     doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     report_type = db.Column(db.String(50), nullable=False)
-    report_data = db.Column(db.Text)
+    # The body is a compressed, deduplicated report_blobs row; report_data reads/writes it
+    report_hash = db.Column(db.String(64), db.ForeignKey('report_blobs.content_hash'))
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def report_data(self):
+        return report_store.get_body(self)
+    
+    @report_data.setter
+    def report_data(self, data):
+        report_store.set_body(self, data)
     
     def set_report_data(self, data):
-        self.report_data = json.dumps(data) if data else None
+        self.report_data = data
     
     def get_report_data(self):
-        return json.loads(self.report_data) if self.report_data else {}
+        return self.report_data or {}
     
-    def to_dict(self):
-        return {
+    def to_dict(self, include_data=True):
+        """Serialize the report; list views leave out the body (fetched by id instead)"""
+        data = {
             'id': self.id,
             'patient_id': self.patient_id,
             'patient_name': self.patient.name if self.patient else None,
             'doctor_id': self.doctor_id,
             'report_type': self.report_type,
-            'report_data': self.get_report_data(),
-            'generated_at': self.generated_at.isoformat() if self.generated_at else None
+            'generated_at': self.generated_at.isoformat() if self.generated_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        if include_data:
+            data['report_data'] = self.get_report_data()
+        return data
 
 class Outcome(db.Model):
     """Outcome tracking model for real-world treatment outcomes"""
     __tablename__ = 'outcomes'
+    __table_args__ = (
+        db.Index('ix_outcomes_patient_id_created_at', 'patient_id', 'created_at'),
+        db.Index('ix_outcomes_patient_id_updated_at', 'patient_id', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
@@ -269,7 +359,7 @@ class Outcome(db.Model):
     actual_remission_date = db.Column(db.Date)
     
     # Outcome data (JSON for flexible fields)
-    outcome_data = db.Column(db.Text)  # Additional metrics, side effects, etc.
+    outcome_data = db.Column(JSONType)  # Additional metrics, side effects, etc.
     
     treatment_start_date = db.Column(db.Date)
     treatment_end_date = db.Column(db.Date)
@@ -281,10 +371,11 @@ class Outcome(db.Model):
     patient = db.relationship('Patient', backref='outcomes')
     
     def set_outcome_data(self, data):
-        self.outcome_data = json.dumps(data) if data else None
+        self.outcome_data = data if data else None
+        flag_modified(self, 'outcome_data')
     
     def get_outcome_data(self):
-        return json.loads(self.outcome_data) if self.outcome_data else {}
+        return self.outcome_data or {}
     
     def to_dict(self):
         return {
@@ -312,20 +403,139 @@ class Outcome(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+class DoctorDailyStats(db.Model):
+    """Per-doctor, per-day dashboard counts, kept in sync by rollups.py"""
+    __tablename__ = 'doctor_daily_stats'
+    
+    doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    new_patients = db.Column(db.Integer, nullable=False, default=0)  # by diagnosis_date
+    high_risk_patients = db.Column(db.Integer, nullable=False, default=0)  # of those, risk_level == 'high'
+    reports_generated = db.Column(db.Integer, nullable=False, default=0)  # by generated_at
+
+class Tombstone(db.Model):
+    """Ids of deleted rows for ?since= delta sync, written by delta_sync.py"""
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        db.Index('ix_tombstones_doctor_id_entity_deleted_at', 'doctor_id', 'entity', 'deleted_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(50), nullable=False)  # table name of the deleted row
+    record_id = db.Column(db.Integer, nullable=False)
+    doctor_id = db.Column(db.Integer, nullable=False)  # owner at deletion time (no FK: outlives the user)
+    patient_id = db.Column(db.Integer)  # for per-patient lists (outcomes)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class PatientMutation(db.Model):
+    """One mutated gene of a patient, copied from clinical_data by genomics.py"""
+    __tablename__ = 'patient_mutations'
+    __table_args__ = (
+        db.UniqueConstraint('patient_id', 'gene', name='uq_patient_mutations_patient_id_gene'),
+        db.Index('ix_patient_mutations_doctor_id_gene', 'doctor_id', 'gene', 'patient_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id', ondelete='CASCADE'), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    gene = db.Column(db.String(20), nullable=False)  # upper-cased, e.g. EGFR
+
+class PatientBiomarkers(db.Model):
+    """A patient's biomarkers, copied from clinical_data by genomics.py"""
+    __tablename__ = 'patient_biomarkers'
+    __table_args__ = (
+        db.Index('ix_patient_biomarkers_doctor_id_msi_status', 'doctor_id', 'msi_status'),
+        db.Index('ix_patient_biomarkers_doctor_id_tmb', 'doctor_id', 'tmb'),
+        db.Index('ix_patient_biomarkers_doctor_id_pd_l1', 'doctor_id', 'pd_l1'),
+    )
+    
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id', ondelete='CASCADE'), primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    pd_l1 = db.Column(db.Float)  # PD-L1 expression, %
+    tmb = db.Column(db.Float)  # tumor mutational burden, mut/Mb
+    msi_status = db.Column(db.String(10))  # MSS, MSI-L or MSI-H
+
 # Ensure database tables exist before importing routes or running any queries
 from ml_service import ml_service
 
 with app.app_context():
     # Create all tables defined by the models (idempotent)
     db.create_all()
+    # Trigram index behind the patients list ?q= name search
+    patient_search.ensure_search_index(db.engine)
+
+# Keep the dashboard rollup table in step with patient/report writes
+import rollups
+rollups.init_rollups(db, Patient, Report, DoctorDailyStats)
+
+@app.cli.command('backfill-rollups')
+def backfill_rollups_command():
+    """Rebuild doctor_daily_stats from the patients and reports tables"""
+    with app.app_context():
+        rows = rollups.backfill_rollups()
+    print(f"✅ Rebuilt doctor_daily_stats: {rows} rows")
+
+# Keep the indexed genomics tables in step with patients' clinical_data
+import genomics
+genomics.init_genomics(db, Patient, PatientMutation, PatientBiomarkers)
+
+@app.cli.command('backfill-genomics')
+def backfill_genomics_command():
+    """Rebuild patient_mutations and patient_biomarkers from clinical_data"""
+    with app.app_context():
+        patients = genomics.backfill_genomics()
+    print(f"✅ Rebuilt genomics tables from {patients} patients")
+
+# Report bodies are stored compressed and deduplicated in report_blobs
+report_store.init_report_store(db, Report, ReportBlob, app.config['REPORT_COMPRESSION'])
+
+@app.cli.command('prune-report-blobs')
+def prune_report_blobs_command():
+    """Delete stored report bodies that no report references"""
+    with app.app_context():
+        removed = report_store.prune_report_blobs()
+    print(f"✅ Pruned {removed} report bodies")
+
+# Cached dashboard responses are dropped when the doctor's patients/reports/appointments change
+import response_cache
+dashboard_cache = response_cache.init_response_cache(app, db, (Patient, Report, Appointment))
+
+# Record deleted ids for ?since= delta sync of the list endpoints
+import delta_sync
+delta_sync.init_delta_sync(db, Tombstone, (Patient, Appointment, Report, Outcome),
+                           app.config['SYNC_TOMBSTONE_RETENTION_DAYS'])
+
+@app.cli.command('prune-tombstones')
+def prune_tombstones_command():
+    """Drop delta-sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS"""
+    with app.app_context():
+        removed = delta_sync.prune_tombstones()
+    print(f"✅ Pruned {removed} tombstones")
+
+# Avatar images live on disk; patients.avatar_url only holds their URL
+import avatar_store
+avatar_store.init_avatar_store(app.config['AVATAR_STORAGE_DIR'])
+
+@app.cli.command('prune-avatars')
+def prune_avatars_command():
+    """Delete stored avatar images that no patient references"""
+    with app.app_context():
+        referenced = {avatar_store.stored_name(url) for url, in
+                      db.session.query(Patient.avatar_url).filter(Patient.avatar_url.like(avatar_store.URL_PREFIX + '%'))}
+        removed = avatar_store.prune_avatars(referenced)
+    print(f"✅ Pruned {removed} avatar files")
 
 # Import routes module and initialize it with models (avoids circular import)
 import routes
 # Initialize routes with db and models BEFORE importing blueprints
 routes.init_routes(db, User, Patient, Appointment, Report, Outcome)
+# The cohort filter language (POST /api/cohorts/query) compiles against these models
+import cohort_query
+cohort_query.init_cohort_query(Patient, PatientMutation, PatientBiomarkers, Outcome)
 
 # Now import blueprints after initialization
-from routes import auth_bp, patients_bp, recommendations_bp, reports_bp, appointments_bp, outcomes_bp
+from routes import auth_bp, patients_bp, recommendations_bp, reports_bp, appointments_bp, outcomes_bp, ml_bp, events_bp, cohorts_bp, avatars_bp
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -334,6 +544,10 @@ app.register_blueprint(recommendations_bp, url_prefix='/api/recommendations')
 app.register_blueprint(reports_bp, url_prefix='/api/reports')
 app.register_blueprint(appointments_bp, url_prefix='/api/appointments')
 app.register_blueprint(outcomes_bp, url_prefix='/api/outcomes')
+app.register_blueprint(ml_bp, url_prefix='/api/ml')
+app.register_blueprint(events_bp, url_prefix='/api/events')
+app.register_blueprint(cohorts_bp, url_prefix='/api/cohorts')
+app.register_blueprint(avatars_bp, url_prefix='/api/avatars')
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -357,6 +571,7 @@ def api_info():
             'reports': '/api/reports',
             'appointments': '/api/appointments',
             'dashboard': '/api/dashboard/summary',
+            'ml': '/api/ml',
         }
     }), 200
 
@@ -439,6 +654,71 @@ def _get_dashboard_user():
     return user
 
 
+def _recent_activities(doctor_id, limit=6):
+    """Activity feed (latest appointments and reports) as a single UNION ALL statement.
+
+    Each branch takes the doctor's `limit` newest rows by its indexed timestamp
+    (appointments.created_at / reports.generated_at); the union is then ordered
+    by the time shown in the feed.
+    """
+    from sqlalchemy import func, literal, select, union_all
+
+    appointments = (
+        select(
+            literal('app').label('kind'),
+            Appointment.id.label('id'),
+            Appointment.status.label('status'),
+            Patient.name.label('patient_name'),
+            func.coalesce(Appointment.appointment_date, Appointment.created_at).label('time'),
+        )
+        .outerjoin(Patient, Patient.id == Appointment.patient_id)
+        .where(Appointment.doctor_id == doctor_id)
+        .order_by(Appointment.created_at.desc())
+        .limit(limit)
+        .subquery()
+    )
+    reports = (
+        select(
+            literal('rep').label('kind'),
+            Report.id.label('id'),
+            literal(None).label('status'),
+            Patient.name.label('patient_name'),
+            Report.generated_at.label('time'),
+        )
+        .outerjoin(Patient, Patient.id == Report.patient_id)
+        .where(Report.doctor_id == doctor_id)
+        .order_by(Report.generated_at.desc())
+        .limit(limit)
+        .subquery()
+    )
+    feed = union_all(select(appointments), select(reports)).subquery()
+    rows = db.session.execute(
+        select(feed).where(feed.c.time.isnot(None)).order_by(feed.c.time.desc()).limit(limit)
+    ).all()
+
+    activities = []
+    for kind, item_id, status, patient_name, time in rows:
+        if isinstance(time, str):
+            time = datetime.fromisoformat(time)
+        if kind == 'app':
+            activities.append({
+                'id': f'app-{item_id}',
+                'type': 'appointment',
+                'message': f'Appointment {status} for {patient_name or "Unknown"}',
+                'time': time.isoformat(),
+                'status': 'info',
+            })
+        else:
+            activities.append({
+                'id': f'rep-{item_id}',
+                'type': 'report',
+                'message': f'Report generated for {patient_name or "Unknown"}',
+                'time': time.isoformat(),
+                'status': 'success',
+            })
+    return activities
+
+
 @app.route('/api/dashboard/summary', methods=['GET'])
 def dashboard_summary():
     """Aggregate stats for dashboard cards & charts (per doctor/demo user)"""
@@ -460,13 +740,25 @@ def dashboard_summary():
     
     try:
         # Filter all aggregates by current doctor's data
-        from sqlalchemy import func, and_
+        from sqlalchemy import func, and_, case
+        from sqlalchemy.orm import load_only
         from collections import defaultdict
         
         range_type = request.args.get('range', '6months')
         start_date_str = request.args.get('startDate')
         end_date_str = request.args.get('endDate')
 
+        # The timeline is relative to today, so the validators change with the date too
+        validators = dashboard_cache.validators(current_user.id, request.full_path, datetime.utcnow().date())
+        not_modified = response_cache.not_modified_response(validators)
+        if not_modified is not None:
+            return not_modified
+
+        cache_key = dashboard_cache.key('dashboard', current_user.id, range_type, start_date_str, end_date_str)
+        cached = dashboard_cache.get(cache_key)
+        if cached is not None:
+            return response_cache.add_validators(jsonify(cached), validators)
+
         now = datetime.utcnow()
         start_date = None
         
@@ -488,22 +780,16 @@ def dashboard_summary():
 
         print(f"[Dashboard] Fetching data for user: {current_user.email} (ID: {current_user.id}) with range: {range_type}")
         
-        # Totals
-        total_patients = Patient.query.filter_by(doctor_id=current_user.id).count()
-        high_risk_patients = Patient.query.filter_by(doctor_id=current_user.id, risk_level='high').count()
-
-        active_treatments = (
-            Patient.query.filter(
-                Patient.doctor_id == current_user.id,
-                Patient.treatment_protocol.isnot(None)
-            ).count()
-        )
-
-        ai_recommendations = (
-            Patient.query.filter(
-                Patient.doctor_id == current_user.id,
-                Patient.ml_recommendations.isnot(None)
-            ).count()
+        # Totals: one pass over the doctor's patients with conditional sums
+        total_patients, high_risk_patients, active_treatments, ai_recommendations = (
+            db.session.query(
+                func.count(Patient.id),
+                func.coalesce(func.sum(case((Patient.risk_level == 'high', 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Patient.treatment_protocol.isnot(None), 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Patient.ml_recommendations.isnot(None), 1), else_=0)), 0),
+            )
+            .filter(Patient.doctor_id == current_user.id)
+            .one()
         )
 
         # Determine the timeline for padding
@@ -545,21 +831,17 @@ def dashboard_summary():
         
         print(f"[Dashboard] Timeline built with {len(timeline)} points for range {range_type}")
 
-        # Growth Data
-        growth_query = db.session.query(
-            func.strftime(date_format, Patient.diagnosis_date).label('date_label'),
-            func.count(Patient.id),
-        ).filter(Patient.doctor_id == current_user.id, Patient.diagnosis_date >= start_date)
-            
-        growth_rows = growth_query.group_by('date_label').all()
-
-        # Outcomes Data
-        outcome_query = db.session.query(
-            func.strftime(date_format, Report.generated_at).label('date_label'),
-            func.count(Report.id),
-        ).filter(Report.doctor_id == current_user.id, Report.generated_at >= start_date)
-            
-        outcome_rows = outcome_query.group_by('date_label').all()
+        # Growth (patients by diagnosis date) and outcomes (reports generated) from the daily rollup
+        rollup_rows = db.session.query(
+            func.strftime(date_format, DoctorDailyStats.day).label('date_label'),
+            func.sum(DoctorDailyStats.new_patients),
+            func.sum(DoctorDailyStats.reports_generated),
+        ).filter(
+            DoctorDailyStats.doctor_id == current_user.id,
+            DoctorDailyStats.day >= start_date.date()
+        ).group_by('date_label').all()
+        growth_rows = [(label, patients) for label, patients, _ in rollup_rows if patients]
+        outcome_rows = [(label, reports) for label, _, reports in rollup_rows if reports]
 
         # Build map from existing data
         data_map = {label: count for label, count in growth_rows if label}
@@ -591,6 +873,7 @@ def dashboard_summary():
 
         top_patients_query = (
             Patient.query
+            .options(load_only(Patient.name, Patient.risk_score, Patient.risk_level, Patient.status, Patient.avatar_url))
             .filter_by(doctor_id=current_user.id)
             .order_by(Patient.risk_score.desc())
             .limit(6)
@@ -606,57 +889,9 @@ def dashboard_summary():
             'change': 0,
         } for p in top_patients_query]
 
-        recent_activities = []
-        try:
-          recent_appointments = (
-              Appointment.query
-              .filter_by(doctor_id=current_user.id)
-              .order_by(Appointment.created_at.desc())
-              .limit(6)
-              .all()
-          )
-        except Exception:
-          recent_appointments = []
-
-        try:
-          recent_reports = (
-              Report.query
-              .filter_by(doctor_id=current_user.id)
-              .order_by(Report.generated_at.desc())
-              .limit(6)
-              .all()
-          )
-        except Exception:
-          recent_reports = []
-
-        for a in recent_appointments:
-            recent_activities.append({
-                'id': f'app-{a.id}',
-                'type': 'appointment',
-                'message': f'Appointment {a.status} for {a.patient.name if a.patient else "Unknown"}',
-                'time': a.appointment_date.isoformat() if a.appointment_date else (a.created_at.isoformat() if a.created_at else None),
-                'status': 'info',
-            })
-
-        for r in recent_reports:
-            recent_activities.append({
-                'id': f'rep-{r.id}',
-                'type': 'report',
-                'message': f'Report generated for {r.patient.name if r.patient else "Unknown"}',
-                'time': r.generated_at.isoformat() if r.generated_at else None,
-                'status': 'success',
-            })
+        recent_activities = _recent_activities(current_user.id)
 
-        try:
-            recent_activities = sorted(
-                [a for a in recent_activities if a.get('time')],
-                key=lambda x: x['time'],
-                reverse=True,
-            )[:6]
-        except Exception:
-            pass
-
-        return jsonify({
+        summary = {
             'total_patients': total_patients,
             'active_treatments': active_treatments,
             'high_risk_patients': high_risk_patients,
@@ -664,7 +899,9 @@ def dashboard_summary():
             'monthly_stats': monthly_stats,
             'top_patients': top_patients,
             'recent_activities': recent_activities,
-        }), 200
+        }
+        dashboard_cache.set(cache_key, summary)
+        return response_cache.add_validators(jsonify(summary), validators)
     except Unauthorized as ue:
         return jsonify({'message': str(ue)}), 401
     except Exception as e:
@@ -0,0 +1,189 @@
+"""
+Content-addressed avatar image storage on local disk
+
+Patient avatars used to be base64 data URLs in patients.avatar_url, so every
+list row and dashboard payload carried the whole image. Images are now
+written once to AVATAR_STORAGE_DIR under the SHA-256 of their bytes:
+
+    <dir>/ab/abcdef....png            original upload
+    <dir>/thumbs/128/ab/abcdef....png resized copy, made on first request
+
+and avatar_url holds a short URL, /api/avatars/<sha256>.<ext>. Identical
+uploads share one file, and a file never changes under its name, so the
+serving route can tell browsers to cache it for a year.
+
+Only PNG, JPEG, GIF and WebP are accepted, recognised by their magic bytes
+(and fully decoded by Pillow when it is installed). Thumbnails need Pillow;
+without it the original is served for every size.
+
+Files are not removed when a patient's avatar changes (another patient may
+share them); `flask prune-avatars` deletes the ones no patient references.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+MAX_AVATAR_BYTES = 5 * 1024 * 1024
+MAX_AVATAR_PIXELS = 40_000_000
+THUMBNAIL_SIZES = (64, 128, 256)
+URL_PREFIX = '/api/avatars/'
+
+# extension -> (magic bytes, mimetype, Pillow format)
+FORMATS = {
+    'png': (b'\x89PNG\r\n\x1a\n', 'image/png', 'PNG'),
+    'jpg': (b'\xff\xd8\xff', 'image/jpeg', 'JPEG'),
+    'gif': (b'GIF8', 'image/gif', 'GIF'),
+    'webp': (b'RIFF', 'image/webp', 'WEBP'),
+}
+NAME_RE = re.compile(r'^([0-9a-f]{64})\.(png|jpg|gif|webp)$')
+DATA_URL_RE = re.compile(r'^data:image/[\w.+-]+;base64,', re.IGNORECASE)
+
+storage_dir = None
+
+
+class AvatarError(ValueError):
+    pass
+
+
+def init_avatar_store(directory):
+    global storage_dir
+    storage_dir = directory
+    os.makedirs(storage_dir, exist_ok=True)
+    if not HAS_PIL:
+        print("Warning: Pillow is not installed; avatars are served without thumbnails")
+
+
+def _sniff(data):
+    for ext, (magic, _, _) in FORMATS.items():
+        if data.startswith(magic) and (ext != 'webp' or data[8:12] == b'WEBP'):
+            return ext
+    return None
+
+
+def _path(name, size=None):
+    parts = [storage_dir] + (['thumbs', str(size)] if size else []) + [name[:2], name]
+    return os.path.join(*parts)
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def save_avatar(data):
+    """Store image bytes; returns their /api/avatars/ URL"""
+    if not data:
+        raise AvatarError('Empty image')
+    if len(data) > MAX_AVATAR_BYTES:
+        raise AvatarError(f'Image is larger than {MAX_AVATAR_BYTES // (1024 * 1024)} MB')
+    ext = _sniff(data)
+    if ext is None:
+        raise AvatarError('Avatar must be a PNG, JPEG, GIF or WebP image')
+    if HAS_PIL:
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                if image.width * image.height > MAX_AVATAR_PIXELS:
+                    raise AvatarError('Image dimensions are too large')
+                image.verify()
+        except AvatarError:
+            raise
+        except Exception:
+            raise AvatarError('Image could not be decoded')
+
+    name = f'{hashlib.sha256(data).hexdigest()}.{ext}'
+    path = _path(name)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    return URL_PREFIX + name
+
+
+def is_data_url(value):
+    return isinstance(value, str) and DATA_URL_RE.match(value) is not None
+
+
+def save_data_url(value):
+    """Store a base64 image data URL; returns its /api/avatars/ URL"""
+    try:
+        data = base64.b64decode(value.split(',', 1)[1], validate=True)
+    except (binascii.Error, ValueError):
+        raise AvatarError('Invalid base64 image data')
+    return save_avatar(data)
+
+
+def normalize_avatar_url(value):
+    """avatar_url as given by a client: data URLs are moved to storage, other URLs kept"""
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        raise AvatarError('avatar_url must be a string')
+    if is_data_url(value):
+        return save_data_url(value)
+    if value.startswith('data:'):
+        raise AvatarError('Avatar must be a base64 image data URL')
+    return value
+
+
+def stored_name(url):
+    """<sha256>.<ext> of a stored avatar URL, or None for anything else"""
+    if isinstance(url, str) and url.startswith(URL_PREFIX):
+        name = url[len(URL_PREFIX):]
+        if NAME_RE.match(name):
+            return name
+    return None
+
+
+def mimetype(name):
+    return FORMATS[NAME_RE.match(name).group(2)][1]
+
+
+def image_path(name, size=None):
+    """Path of a stored image or of its ``size`` px thumbnail (made on demand); None if unknown"""
+    if not NAME_RE.match(name):
+        return None
+    original = _path(name)
+    if not os.path.exists(original):
+        return None
+    if size is None or not HAS_PIL:
+        return original
+
+    thumb = _path(name, size)
+    if not os.path.exists(thumb):
+        image_format = FORMATS[name.rsplit('.', 1)[1]][2]
+        with Image.open(original) as image:
+            image.seek(0)  # first frame of an animated GIF
+            image.thumbnail((size, size))
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            out = io.BytesIO()
+            image.save(out, format=image_format)
+        _write_atomic(thumb, out.getvalue())
+    return thumb
+
+
+def prune_avatars(referenced):
+    """Delete stored images (and thumbnails) whose names are not in ``referenced``; returns files removed"""
+    removed = 0
+    for root, _, files in os.walk(storage_dir):
+        for filename in files:
+            if NAME_RE.match(filename) and filename not in referenced:
+                os.remove(os.path.join(root, filename))
+                removed += 1
+    return removed
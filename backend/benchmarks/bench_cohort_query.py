@@ -0,0 +1,173 @@
+"""
+Benchmark cohort queries: compiled SQL (POST /api/cohorts/query) vs client-side filtering
+
+A scratch SQLite database is filled with synthetic patients spread over
+N_DOCTORS doctors, with their genomics side tables and outcomes. Each cohort
+is answered two ways for one doctor:
+
+    client  - load the doctor's whole panel with clinical_data and filter in
+              Python (what the UI did with GET /api/patients)
+    sql     - cohort_query.compile_filter: one page (LIMIT 50) plus the count
+
+Usage (from backend/):
+    python benchmarks/bench_cohort_query.py [n_patients]   (default 1,000,000)
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app import db, Patient, PatientMutation, PatientBiomarkers, Outcome
+import cohort_query
+from clinical_data_helpers import MUTATIONS_BY_CANCER
+from genomics import extract_genomics
+
+N_DOCTORS = 20
+BATCH_SIZE = 20_000
+PAGE_SIZE = 50
+CANCER_TYPES = ["Lung Cancer", "Breast Cancer", "Colon Cancer", "Prostate Cancer", "Ovarian Cancer"]
+RESPONSES = ["complete", "partial", "stable", "progression"]
+
+COHORTS = {
+    "EGFR+ stage IV": {"and": [
+        {"field": "mutation", "op": "=", "value": "EGFR"},
+        {"field": "stage", "op": "=", "value": "IV"},
+    ]},
+    "age 60-80, TMB>=10 or PD-L1>=50": {"and": [
+        {"field": "age", "op": "between", "value": [60, 80]},
+        {"or": [
+            {"field": "tmb", "op": ">=", "value": 10},
+            {"field": "pd_l1", "op": ">=", "value": 50},
+        ]},
+    ]},
+    "responders without KRAS": {"and": [
+        {"field": "outcome.actual_response", "op": "in", "value": ["complete", "partial"]},
+        {"field": "mutation", "op": "not_in", "value": ["KRAS"]},
+    ]},
+}
+
+
+def _client_side(cohort):
+    """The same cohorts as Python predicates over a loaded patient (for the baseline)"""
+    def genes(p):
+        return set(extract_genomics(p["clinical_data"])[0])
+
+    def markers(p):
+        return extract_genomics(p["clinical_data"])[1] or {}
+
+    return {
+        "EGFR+ stage IV": lambda p: "EGFR" in genes(p) and p["stage"] == "IV",
+        "age 60-80, TMB>=10 or PD-L1>=50": lambda p: 60 <= p["age"] <= 80 and (
+            (markers(p).get("tmb") or 0) >= 10 or (markers(p).get("pd_l1") or 0) >= 50),
+        "responders without KRAS": lambda p: p["responses"] & {"complete", "partial"} and "KRAS" not in genes(p),
+    }[cohort]
+
+
+def _seed(engine, n_patients):
+    rng = random.Random(3)
+    start = date(2020, 1, 1)
+    patient_id = 0
+    with engine.begin() as conn:
+        conn.execute(db.metadata.tables["users"].insert(), [
+            {"id": i, "email": f"doctor{i}@example.com", "password_hash": "x", "name": f"Doctor {i}", "role": "doctor"}
+            for i in range(1, N_DOCTORS + 1)
+        ])
+    while patient_id < n_patients:
+        patients, mutations, biomarkers, outcomes = [], [], [], []
+        for _ in range(min(BATCH_SIZE, n_patients - patient_id)):
+            patient_id += 1
+            doctor_id = patient_id % N_DOCTORS + 1
+            cancer_type = rng.choice(CANCER_TYPES)
+            available = MUTATIONS_BY_CANCER[cancer_type]
+            clinical_data = {"genomics": {
+                "mutations": rng.sample(available, rng.randint(0, 2)),
+                "biomarkers": {"PD-L1": rng.randint(0, 100), "TMB": round(rng.uniform(0, 25), 1),
+                               "MSI_Status": rng.choice(["MSS", "MSS", "MSI-L", "MSI-H"])},
+            }}
+            score = rng.uniform(0, 100)
+            patients.append({
+                "id": patient_id, "name": f"Patient {patient_id}", "age": rng.randint(25, 90), "gender": "female",
+                "cancer_type": cancer_type, "stage": rng.choice(["I", "II", "III", "IV"]),
+                "diagnosis_date": start + timedelta(days=rng.randint(0, 1500)),
+                "clinical_data": clinical_data, "risk_score": score,
+                "risk_level": "high" if score > 75 else "medium" if score > 50 else "low", "doctor_id": doctor_id,
+            })
+            genes, markers = extract_genomics(clinical_data)
+            mutations += [{"patient_id": patient_id, "doctor_id": doctor_id, "gene": g} for g in genes]
+            biomarkers.append({"patient_id": patient_id, "doctor_id": doctor_id, **markers})
+            if rng.random() < 0.3:
+                outcomes.append({"patient_id": patient_id, "doctor_id": doctor_id, "treatment_type": "targeted",
+                                 "actual_response": rng.choice(RESPONSES)})
+        with engine.begin() as conn:
+            conn.execute(Patient.__table__.insert(), patients)
+            conn.execute(PatientMutation.__table__.insert(), mutations)
+            conn.execute(PatientBiomarkers.__table__.insert(), biomarkers)
+            if outcomes:
+                conn.execute(Outcome.__table__.insert(), outcomes)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def main(n_patients=1_000_000):
+    print("=" * 72)
+    print("Cohort Query Benchmark")
+    print("=" * 72)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'cohorts.db')}")
+        db.metadata.create_all(engine)
+        _, seed_ms = _timed(lambda: _seed(engine, n_patients))
+        doctor_id = 1
+        print(f"   Patients: {n_patients:,} over {N_DOCTORS} doctors ({n_patients // N_DOCTORS:,} per panel)")
+        print(f"   Seeded in {seed_ms / 1e3:,.1f}s")
+
+        def load_panel():
+            with Session(engine) as session:
+                responses = {}
+                for patient_id, response in session.execute(
+                        select(Outcome.patient_id, Outcome.actual_response).where(Outcome.doctor_id == doctor_id)):
+                    responses.setdefault(patient_id, set()).add(response)
+                return [
+                    {"id": p.id, "age": p.age, "stage": p.stage, "clinical_data": p.clinical_data,
+                     "responses": responses.get(p.id, set())}
+                    for p in session.query(Patient).filter(Patient.doctor_id == doctor_id)
+                ]
+
+        print(f"\n{'cohort':<34} | {'matches':>8} | {'client (ms)':>11} | {'sql (ms)':>9} | {'speedup':>7}")
+        print("-" * 82)
+        for label, spec in COHORTS.items():
+            predicate = _client_side(label)
+            client_matches, client_ms = _timed(lambda: [p for p in load_panel() if predicate(p)])
+
+            def compiled():
+                with Session(engine) as session:
+                    condition = cohort_query.compile_filter(spec, doctor_id)
+                    query = select(Patient).where(Patient.doctor_id == doctor_id, condition)
+                    page = session.scalars(query.order_by(Patient.id).limit(PAGE_SIZE)).all()
+                    total = session.scalar(select(func.count()).select_from(query.subquery()))
+                    return page, total
+
+            (page, total), sql_ms = _timed(compiled)
+            assert total == len(client_matches), (label, total, len(client_matches))
+            assert [p.id for p in page] == sorted(p["id"] for p in client_matches)[:PAGE_SIZE]
+            print(f"{label:<34} | {total:>8,} | {client_ms:>11,.0f} | {sql_ms:>9,.1f} | {client_ms / sql_ms:>6.0f}x")
+        engine.dispose()
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
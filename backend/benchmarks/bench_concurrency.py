@@ -0,0 +1,85 @@
+"""
+Concurrency benchmark: generate_treatment_recommendations from N threads
+
+Every thread scores the same fixed patient list through one shared adapter.
+Results are compared against a single-threaded baseline (they must be
+identical) and throughput is reported per thread count.
+
+Usage (from backend/):
+    python create_model_from_notebook.py --synthetic   # if no model yet
+    python benchmarks/bench_concurrency.py [sklearn|onnx]
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_service import OncoAIMLAdapter
+
+THREAD_COUNTS = [1, 2, 4, 8]
+STAGES = ["I", "II", "III", "IV"]
+N_PATIENTS = 50
+
+
+def _patients(n=N_PATIENTS):
+    return [
+        {
+            "age": 30 + (i * 7) % 55,
+            "stage": STAGES[i % len(STAGES)],
+            "targetable_mutation": i % 3 == 0,
+            "comorbidity_score": round((i * 13) % 100 / 100, 2),
+        }
+        for i in range(n)
+    ]
+
+
+def _fingerprint(result):
+    return json.dumps(result, sort_keys=True, default=str)
+
+
+def _run(adapter, patients, threads):
+    """Score every patient once per thread; returns (elapsed, per-thread result lists)"""
+    def worker(_):
+        return [_fingerprint(adapter.generate_treatment_recommendations(p)) for p in patients]
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(worker, range(threads)))
+        elapsed = time.perf_counter() - start
+    return elapsed, results
+
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else None
+    adapter = OncoAIMLAdapter(inference_backend=backend)
+    patients = _patients()
+
+    print("=" * 60)
+    print("Concurrent Recommendation Benchmark")
+    print("=" * 60)
+    print(f"   Backend:  {adapter.inference_backend}")
+    print(f"   Patients: {len(patients)} per thread")
+
+    baseline = [_fingerprint(adapter.generate_treatment_recommendations(p)) for p in patients]
+
+    print(f"\n{'threads':>7} | {'req/s':>10} | {'scaling':>7} | {'identical':>9}")
+    print("-" * 45)
+    single = None
+    for threads in THREAD_COUNTS:
+        elapsed, results = _run(adapter, patients, threads)
+        rps = threads * len(patients) / elapsed
+        single = single or rps
+        identical = all(r == baseline for r in results)
+        print(f"{threads:>7} | {rps:>10,.0f} | {rps / single:>6.2f}x | {str(identical):>9}")
+        if not identical:
+            print("ERROR: concurrent results differ from the single-threaded baseline")
+            sys.exit(1)
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
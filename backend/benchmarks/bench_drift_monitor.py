@@ -0,0 +1,72 @@
+"""
+Benchmark the per-prediction overhead of the streaming drift monitor
+
+Usage (from backend/):
+    python benchmarks/bench_drift_monitor.py [n_predictions]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_service import ml_service
+
+
+def _random_patient(rng):
+    return {
+        "age": rng.randint(25, 90),
+        "stage": rng.choice(["I", "II", "III", "IV"]),
+        "targetable_mutation": rng.random() < 0.5,
+        "comorbidity_score": round(rng.random(), 2),
+    }
+
+
+def main(n_predictions=200):
+    print("=" * 60)
+    print("Drift Monitor Overhead Benchmark")
+    print("=" * 60)
+
+    if ml_service.drift_monitor is None:
+        print("ERROR: No drift monitor loaded.")
+        print("Run: python create_model_from_notebook.py --synthetic")
+        return
+
+    rng = random.Random(42)
+    patients = [_random_patient(rng) for _ in range(n_predictions)]
+    monitor = ml_service.drift_monitor
+
+    # Observation cost alone (many iterations for a stable estimate)
+    features = [ml_service._drift_features(p) for p in patients]
+    n_observe = 100_000
+    start = time.perf_counter()
+    for i in range(n_observe):
+        monitor.observe(features[i % n_predictions])
+    observe_us = (time.perf_counter() - start) / n_observe * 1e6
+
+    # Full prediction with and without the monitor
+    start = time.perf_counter()
+    for p in patients:
+        ml_service._score_treatments(p)
+    without_ms = (time.perf_counter() - start) / n_predictions * 1e3
+
+    start = time.perf_counter()
+    for p in patients:
+        ml_service.generate_treatment_recommendations(p)
+    with_ms = (time.perf_counter() - start) / n_predictions * 1e3
+
+    monitor.reset()
+
+    print(f"\nPredictions:                    {n_predictions}")
+    print(f"observe() per input:            {observe_us:.2f} us")
+    print(f"prediction without monitor:     {without_ms:.2f} ms")
+    print(f"prediction with monitor:        {with_ms:.2f} ms")
+    print(f"monitor share of prediction:    {observe_us / 1e3 / without_ms:.4%}")
+    print(f"histogram memory:               {sum(len(h.counts) for h in monitor.histograms.values())} counters (constant)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,109 @@
+"""
+Encode time of the JSON providers for GET /api/patients and GET /api/reports
+
+Seeds a scratch database (DATABASE_URL is pointed at a temp file before the app
+is imported), then times the encode step alone on the endpoints' payloads and
+the full request through the test client with each provider.
+
+Usage (from backend/):
+    python benchmarks/bench_json_provider.py [n_patients]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from datetime import datetime, timedelta
+
+import jwt
+from flask.json.provider import DefaultJSONProvider
+
+from app import app, db, User, Patient, Report
+from benchmarks.bench_patient_serialization import _recommendations
+from clinical_data_helpers import generate_clinical_data
+from json_provider import HAS_ORJSON, OrjsonProvider
+
+
+def _seed(n_patients):
+    rng = random.Random(3)
+    doctor = User(email='bench-json@oncoai.com', name='Bench Doctor', role='doctor')
+    doctor.set_password('bench')
+    db.session.add(doctor)
+    db.session.flush()
+    for i in range(n_patients):
+        stage = rng.choice(['I', 'II', 'III', 'IV'])
+        age = rng.randint(25, 90)
+        patient = Patient(name=f'Patient {i}', age=age, gender='female', cancer_type='Lung Cancer',
+                          stage=stage, doctor_id=doctor.id, risk_score=rng.uniform(0, 100))
+        patient.set_clinical_data(generate_clinical_data('Lung Cancer', stage, age))
+        patient.set_ml_recommendations(_recommendations(rng))
+        db.session.add(patient)
+        db.session.flush()
+        db.session.add(Report(
+            patient_id=patient.id, doctor_id=doctor.id, report_type='comprehensive',
+            report_data={'patient_info': patient.to_dict(), 'recommendations': patient.get_ml_recommendations(),
+                         'generated_at': datetime.utcnow().isoformat()}
+        ))
+    db.session.commit()
+    return doctor
+
+
+def _best_of(fn, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def main(n_patients=2000):
+    print("=" * 60)
+    print("JSON Provider Benchmark")
+    print("=" * 60)
+    if not HAS_ORJSON:
+        print("ERROR: orjson is not installed (pip install orjson)")
+        return
+
+    providers = {'default': DefaultJSONProvider(app), 'orjson': OrjsonProvider(app)}
+    with app.app_context():
+        db.create_all()
+        doctor = _seed(n_patients)
+        token = jwt.encode({'user_id': doctor.id, 'email': doctor.email,
+                            'exp': datetime.utcnow() + timedelta(hours=1)},
+                           app.config['SECRET_KEY'], algorithm='HS256')
+        headers = {'Authorization': f'Bearer {token}'}
+        payloads = {
+            '/api/patients': {'patients': [p.to_dict() for p in Patient.query.all()]},
+            '/api/reports': {'reports': [r.to_dict(include_data=False) for r in Report.query.all()]},
+        }
+    print(f"   Patients/reports: {n_patients:,}")
+
+    client = app.test_client()
+    print(f"\n{'endpoint':<15} {'step':<9} | {'default (ms)':>12} | {'orjson (ms)':>11} | {'speedup':>7}")
+    print("-" * 66)
+    for url, payload in payloads.items():
+        timings = {}
+        for name, provider in providers.items():
+            app.json = provider
+            with app.app_context():
+                size = len(provider.response(payload).get_data())
+                encode_ms = _best_of(lambda: provider.response(payload))
+            request_ms = _best_of(lambda: client.get(url, headers=headers), repeats=3)
+            timings[name] = (encode_ms, request_ms, size)
+        for i, step in enumerate(['encode', 'request']):
+            d, o = timings['default'][i], timings['orjson'][i]
+            print(f"{url:<15} {step:<9} | {d:>12,.1f} | {o:>11,.1f} | {d / o:>6.2f}x")
+        print(f"{'':<15} {'body':<9} | {timings['default'][2] / 1e6:>10.1f}MB | {timings['orjson'][2] / 1e6:>9.1f}MB |")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
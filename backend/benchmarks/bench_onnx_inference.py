@@ -0,0 +1,63 @@
+"""
+Throughput comparison: sklearn (joblib pickle) vs onnxruntime inference
+
+Usage (from backend/):
+    python create_model_from_notebook.py --synthetic   # if no model yet
+    python export_onnx.py
+    python benchmarks/bench_onnx_inference.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from create_model_from_notebook import generate_synthetic_dataset
+from ml_service import OncoAIMLAdapter
+
+BATCH_SIZES = [1, 3, 64, 1024]
+
+
+def _throughput(adapter, df, min_seconds=1.0):
+    """Rows per second, repeating the batch for at least min_seconds"""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        adapter._predict_positive_proba(df)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls * len(df) / elapsed, elapsed / calls * 1e3
+
+
+def main():
+    print("=" * 60)
+    print("sklearn vs ONNX Runtime Inference Benchmark")
+    print("=" * 60)
+
+    sklearn_adapter = OncoAIMLAdapter(inference_backend="sklearn")
+    onnx_adapter = OncoAIMLAdapter(inference_backend="onnx")
+    if onnx_adapter.inference_backend != "onnx":
+        print("ERROR: ONNX model not available. Run: python export_onnx.py")
+        return
+
+    data = generate_synthetic_dataset(max(BATCH_SIZES), random_state=123).drop(columns=["treatment_response"])
+
+    diff = np.abs(sklearn_adapter._predict_positive_proba(data) - onnx_adapter._predict_positive_proba(data))
+    print(f"\nParity over {len(data)} rows: max |diff| = {diff.max():.2e}")
+
+    print(f"\n{'batch':>6} | {'sklearn rows/s':>15} {'ms/call':>8} | {'onnx rows/s':>12} {'ms/call':>8} | {'speedup':>7}")
+    print("-" * 70)
+    for batch in BATCH_SIZES:
+        df = data.iloc[:batch]
+        sk_rps, sk_ms = _throughput(sklearn_adapter, df)
+        ox_rps, ox_ms = _throughput(onnx_adapter, df)
+        print(f"{batch:>6} | {sk_rps:>15,.0f} {sk_ms:>8.2f} | {ox_rps:>12,.0f} {ox_ms:>8.2f} | {ox_rps / sk_rps:>6.1f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
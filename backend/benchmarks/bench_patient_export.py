@@ -0,0 +1,97 @@
+"""
+Peak memory of GET /api/patients/export (streamed) vs GET /api/patients (one body)
+
+Seeds a scratch SQLite database (DATABASE_URL is pointed at a temp file
+before the app is imported) with one doctor's panel, then reads each
+response through the test client chunk by chunk, keeping only the byte
+count, and reports the Python heap peak (tracemalloc) while it ran.
+
+Usage (from backend/):
+    python benchmarks/bench_patient_export.py [n_patients]   (default 1,000,000)
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'export.db')}"
+
+from datetime import date, datetime, timedelta
+
+import jwt
+
+from app import app, db, User, Patient
+from clinical_data_helpers import generate_clinical_data
+import patient_export
+
+BATCH_SIZE = 20_000
+CANCER_TYPES = ["Lung Cancer", "Breast Cancer", "Colon Cancer", "Prostate Cancer", "Ovarian Cancer"]
+
+
+def _seed(n_patients):
+    rng = random.Random(3)
+    random.seed(3)  # generate_clinical_data uses the module RNG
+    with db.engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": 1, "email": "bench-export@oncoai.com", "password_hash": "x",
+                                                "name": "Bench Doctor", "role": "doctor"}])
+    start = date(2020, 1, 1)
+    for offset in range(0, n_patients, BATCH_SIZE):
+        rows = []
+        for i in range(offset + 1, min(offset + BATCH_SIZE, n_patients) + 1):
+            cancer_type, stage, age = rng.choice(CANCER_TYPES), rng.choice(["I", "II", "III", "IV"]), rng.randint(25, 90)
+            rows.append({
+                "id": i, "name": f"Patient {i}", "age": age, "gender": "female", "cancer_type": cancer_type,
+                "stage": stage, "diagnosis_date": start + timedelta(days=rng.randint(0, 1500)),
+                "clinical_data": generate_clinical_data(cancer_type, stage, age),
+                "risk_score": rng.uniform(0, 100), "risk_level": "medium", "doctor_id": 1,
+            })
+        with db.engine.begin() as conn:
+            conn.execute(Patient.__table__.insert(), rows)
+
+
+def _measure(client, url, headers):
+    """(seconds, response bytes, peak traced MB) reading the response incrementally"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, headers=headers, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, peak / 1e6
+
+
+def main(n_patients=1_000_000):
+    print("=" * 72)
+    print("Patient Export Benchmark")
+    print("=" * 72)
+    with app.app_context():
+        start = time.perf_counter()
+        _seed(n_patients)
+        print(f"   Patients: {n_patients:,} (seeded in {time.perf_counter() - start:,.1f}s)")
+        token = jwt.encode({'user_id': 1, 'email': 'bench-export@oncoai.com',
+                            'exp': datetime.utcnow() + timedelta(hours=1)},
+                           app.config['SECRET_KEY'], algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    urls = [f'/api/patients/export?format={fmt}' for fmt in patient_export.FORMATS
+            if fmt != 'parquet' or patient_export.HAS_PYARROW]
+    urls.append('/api/patients')
+    print(f"\n{'request':<36} | {'time (s)':>8} | {'body (MB)':>9} | {'peak heap (MB)':>14}")
+    print("-" * 76)
+    for url in urls:
+        elapsed, size, peak = _measure(client, url, headers)
+        print(f"{url:<36} | {elapsed:>8.1f} | {size / 1e6:>9.1f} | {peak:>14.1f}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,152 @@
+"""
+Benchmark loading and serializing patients: Text columns vs JSON columns
+
+"text" maps the patients table the way the models used to (db.Text plus
+json.loads in every getter call); "json" is the current Patient model, where
+the JSON column is decoded once at load and the getters return that value.
+
+Usage (from backend/):
+    python benchmarks/bench_patient_serialization.py [n_patients]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import Column, Date, DateTime, Float, Integer, String, Text, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from app import db, Patient
+from clinical_data_helpers import generate_clinical_data
+
+LegacyBase = declarative_base()
+
+
+class TextPatient(LegacyBase):
+    """Patient as mapped before the JSON column types"""
+    __tablename__ = 'patients'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100))
+    age = Column(Integer)
+    gender = Column(String(10))
+    email = Column(String(120))
+    phone = Column(String(20))
+    address = Column(String(300))
+    status = Column(String(50))
+    avatar_url = Column(Text)
+    cancer_type = Column(String(100))
+    cancer_subtype = Column(String(100))
+    stage = Column(String(20))
+    diagnosis_date = Column(Date)
+    clinical_data = Column(Text)
+    risk_score = Column(Float)
+    risk_level = Column(String(20))
+    ml_recommendations = Column(Text)
+    treatment_protocol = Column(Text)
+    doctor_id = Column(Integer)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    def get_clinical_data(self):
+        return json.loads(self.clinical_data) if self.clinical_data else {}
+
+    def get_ml_recommendations(self):
+        return json.loads(self.ml_recommendations) if self.ml_recommendations else {}
+
+    def get_treatment_protocol(self):
+        return json.loads(self.treatment_protocol) if self.treatment_protocol else {}
+
+    to_dict = Patient.to_dict
+    FIELDS = Patient.FIELDS
+    JSON_FIELDS = Patient.JSON_FIELDS
+
+
+def _recommendations(rng):
+    treatments = []
+    for t in ['chemo', 'targeted', 'immuno']:
+        p = round(rng.random(), 3)
+        treatments.append({
+            'treatment': t,
+            'response_probability': p,
+            'confidence_interval': [max(0, p - 0.1), min(1, p + 0.1)],
+            'shap_explanation': {
+                'positive_factors': {f'num__{f}': round(rng.random() / 10, 4) for f in ['age', 'cancer_stage']},
+                'negative_factors': {f'num__{f}': -round(rng.random() / 10, 4) for f in ['comorbidity_score']},
+            },
+            'side_effects': {'common_side_effects': ['fatigue', 'nausea'], 'risk_level': 'moderate'},
+            'outcomes': {'survival_1yr': 0.8, 'survival_3yr': 0.6, 'survival_5yr': 0.45},
+            'explanation': 'x' * 400,
+        })
+    return {'treatments': treatments, 'note': 'AI-generated decision support.'}
+
+
+def _seed(engine, n_patients):
+    rng = random.Random(1)
+    stages = ['I', 'II', 'III', 'IV']
+    with Session(engine) as session:
+        for i in range(n_patients):
+            stage = rng.choice(stages)
+            age = rng.randint(25, 90)
+            patient = Patient(name=f'Patient {i}', age=age, gender='female', cancer_type='Breast Cancer',
+                              stage=stage, doctor_id=1, risk_score=rng.uniform(0, 100))
+            patient.set_clinical_data(generate_clinical_data('Breast Cancer', stage, age))
+            patient.set_ml_recommendations(_recommendations(rng))
+            patient.set_treatment_protocol({'regimen': 'AC-T', 'cycles': 6})
+            session.add(patient)
+        session.commit()
+
+
+def _best_of(fn, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def main(n_patients=10_000):
+    print("=" * 60)
+    print("Patient Serialization Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'patients.db')}")
+        db.metadata.create_all(engine)
+        _seed(engine, n_patients)
+        print(f"   Patients: {n_patients:,}")
+
+        def to_dicts(model):
+            def run():
+                with Session(engine) as session:
+                    [p.to_dict() for p in session.query(model).all()]
+            return run
+
+        def repeated_getters(model):
+            # to_dict + list_recommendations + report generation each read the JSON again
+            def run():
+                with Session(engine) as session:
+                    for p in session.query(model).all():
+                        for _ in range(3):
+                            p.get_ml_recommendations()
+                            p.get_clinical_data()
+            return run
+
+        print(f"\n{'scenario':<28} | {'text (ms)':>10} | {'json (ms)':>10} | {'speedup':>7}")
+        print("-" * 64)
+        for label, scenario in [('load + to_dict', to_dicts), ('load + 3x getters', repeated_getters)]:
+            text_ms = _best_of(scenario(TextPatient))
+            json_ms = _best_of(scenario(Patient))
+            print(f"{label:<28} | {text_ms:>10,.0f} | {json_ms:>10,.0f} | {text_ms / json_ms:>6.2f}x")
+        engine.dispose()
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
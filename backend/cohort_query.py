@@ -0,0 +1,222 @@
+"""
+Cohort builder filter language, compiled to a single SQL query
+
+A filter is a JSON tree:
+
+    {"and": [node, ...]}                          every node holds
+    {"or": [node, ...]}                           at least one node holds
+    {"not": node}
+    {"field": "age", "op": ">=", "value": 65}     a condition
+
+Fields:
+    patient      age, risk_score (numbers), diagnosis_date (ISO date), stage,
+                 cancer_type, cancer_subtype, gender, status, risk_level
+    biomarkers   pd_l1, tmb (numbers), msi_status       (patient_biomarkers)
+    genomics     mutation                               (patient_mutations)
+    outcomes     outcome.actual_response, outcome.actual_survival_status,
+                 outcome.actual_remission_status, outcome.treatment_type
+
+Operators are = != < <= > >= in not_in between; text fields only take
+= != in not_in. A patient has several mutations and outcomes, so those
+fields take = / in (some row matches) and not_in (no row matches).
+Comparisons never match a missing value.
+
+Values are bound parameters, never SQL text, and numbers must fit a 64-bit
+integer column. Biomarker and mutation lookups
+are subqueries restricted to the doctor's rows, so they use the
+(doctor_id, ...) indexes of the genomics tables. The tree is bounded
+(MAX_DEPTH, MAX_CONDITIONS, MAX_VALUES) so a request cannot build an
+arbitrarily large statement.
+"""
+
+import math
+import operator
+from datetime import date
+
+from sqlalchemy import and_, exists, not_, or_, select, true
+
+MAX_DEPTH = 6
+MAX_CONDITIONS = 40
+MAX_VALUES = 100
+# numbers are bound as 64-bit integers/doubles
+MIN_INT, MAX_INT = -2 ** 63, 2 ** 63 - 1
+
+NUMBER, TEXT, DATE = "number", "text", "date"
+
+PATIENT_FIELDS = {
+    "age": NUMBER,
+    "risk_score": NUMBER,
+    "diagnosis_date": DATE,
+    "stage": TEXT,
+    "cancer_type": TEXT,
+    "cancer_subtype": TEXT,
+    "gender": TEXT,
+    "status": TEXT,
+    "risk_level": TEXT,
+}
+BIOMARKER_FIELDS = {"pd_l1": NUMBER, "tmb": NUMBER, "msi_status": TEXT}
+OUTCOME_FIELDS = {
+    "outcome.actual_response": "actual_response",
+    "outcome.actual_survival_status": "actual_survival_status",
+    "outcome.actual_remission_status": "actual_remission_status",
+    "outcome.treatment_type": "treatment_type",
+}
+
+COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+# operators for fields with several rows per patient
+ANY_OPS = ("=", "in", "not_in")
+
+Patient = None
+PatientMutation = None
+PatientBiomarkers = None
+Outcome = None
+
+
+class CohortQueryError(ValueError):
+    pass
+
+
+def init_cohort_query(Patient_model, PatientMutation_model, PatientBiomarkers_model, Outcome_model):
+    global Patient, PatientMutation, PatientBiomarkers, Outcome
+    Patient = Patient_model
+    PatientMutation = PatientMutation_model
+    PatientBiomarkers = PatientBiomarkers_model
+    Outcome = Outcome_model
+
+
+def compile_filter(spec, doctor_id):
+    """SQL condition on Patient for filter tree ``spec`` (everything for an empty filter)"""
+    if spec is None or spec == {}:
+        return true()
+    return _Compiler(doctor_id).node(spec, 1)
+
+
+class _Compiler:
+
+    def __init__(self, doctor_id):
+        self.doctor_id = doctor_id
+        self.conditions = 0
+
+    def node(self, node, depth):
+        if depth > MAX_DEPTH:
+            raise CohortQueryError(f"Filter is nested more than {MAX_DEPTH} levels deep")
+        if not isinstance(node, dict):
+            raise CohortQueryError("Each filter node must be an object")
+        if set(node) in ({"and"}, {"or"}):
+            key = next(iter(node))
+            children = node[key]
+            if not isinstance(children, list) or not children:
+                raise CohortQueryError(f"'{key}' needs a non-empty list")
+            clauses = [self.node(child, depth + 1) for child in children]
+            return and_(*clauses) if key == "and" else or_(*clauses)
+        if set(node) == {"not"}:
+            return not_(self.node(node["not"], depth + 1))
+        if "field" in node and set(node) <= {"field", "op", "value"}:
+            self.conditions += 1
+            if self.conditions > MAX_CONDITIONS:
+                raise CohortQueryError(f"Filter has more than {MAX_CONDITIONS} conditions")
+            field, op = node["field"], node.get("op", "=")
+            if not isinstance(field, str) or not isinstance(op, str):
+                raise CohortQueryError("A condition's field and op must be strings")
+            return self.condition(field, op, node.get("value"))
+        raise CohortQueryError(f"Unrecognised filter node: {sorted(node)}")
+
+    def condition(self, field, op, value):
+        if field in PATIENT_FIELDS:
+            return _compare(getattr(Patient, field), PATIENT_FIELDS[field], field, op, value)
+
+        if field in BIOMARKER_FIELDS:
+            column = getattr(PatientBiomarkers, field)
+            if field == "msi_status":
+                value = _upper(value)
+            matching = select(PatientBiomarkers.patient_id).where(
+                PatientBiomarkers.doctor_id == self.doctor_id,
+                _compare(column, BIOMARKER_FIELDS[field], field, op, value),
+            )
+            return Patient.id.in_(matching)
+
+        if field == "mutation":
+            genes = _upper(_any_values(field, op, value))
+            matching = select(PatientMutation.patient_id).where(
+                PatientMutation.doctor_id == self.doctor_id,
+                PatientMutation.gene.in_(genes),
+            )
+            return Patient.id.not_in(matching) if op == "not_in" else Patient.id.in_(matching)
+
+        if field in OUTCOME_FIELDS:
+            values = _any_values(field, op, value)
+            # Correlated on patient_id: outcomes are indexed by patient, and may be
+            # recorded by a doctor other than the patient's current one
+            matching = exists().where(
+                Outcome.patient_id == Patient.id,
+                getattr(Outcome, OUTCOME_FIELDS[field]).in_(values),
+            )
+            return not_(matching) if op == "not_in" else matching
+
+        raise CohortQueryError(f"Unknown field: {field}")
+
+
+def _upper(value):
+    if isinstance(value, str):
+        return value.upper()
+    if isinstance(value, list):
+        return [v.upper() if isinstance(v, str) else v for v in value]
+    return value
+
+
+def _scalar(kind, field, value):
+    if kind == NUMBER:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise CohortQueryError(f"{field} takes numbers")
+        if isinstance(value, int) and not MIN_INT <= value <= MAX_INT:
+            raise CohortQueryError(f"{field} is out of range")
+        if isinstance(value, float) and not math.isfinite(value):
+            raise CohortQueryError(f"{field} takes finite numbers")
+        return value
+    if not isinstance(value, str):
+        raise CohortQueryError(f"{field} takes {'ISO dates' if kind == DATE else 'strings'}")
+    if kind == DATE:
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CohortQueryError(f"{field} takes ISO dates (YYYY-MM-DD)")
+    return value
+
+
+def _value_list(field, value, size=None):
+    if not isinstance(value, list) or not value or len(value) > MAX_VALUES:
+        raise CohortQueryError(f"{field} needs a list of 1 to {MAX_VALUES} values")
+    if size is not None and len(value) != size:
+        raise CohortQueryError(f"{field} needs [low, high]")
+    return value
+
+
+def _compare(column, kind, field, op, value):
+    if op in COMPARISONS:
+        if kind == TEXT and op not in ("=", "!="):
+            raise CohortQueryError(f"{field} only supports =, !=, in and not_in")
+        return COMPARISONS[op](column, _scalar(kind, field, value))
+    if op in ("in", "not_in"):
+        values = [_scalar(kind, field, v) for v in _value_list(field, value)]
+        return column.in_(values) if op == "in" else column.not_in(values)
+    if op == "between":
+        if kind == TEXT:
+            raise CohortQueryError(f"{field} only supports =, !=, in and not_in")
+        low, high = (_scalar(kind, field, v) for v in _value_list(field, value, size=2))
+        return column.between(low, high)
+    raise CohortQueryError(f"Unknown operator: {op}")
+
+
+def _any_values(field, op, value):
+    """Values for a several-rows-per-patient field (mutation, outcome.*)"""
+    if op not in ANY_OPS:
+        raise CohortQueryError(f"{field} only supports {', '.join(ANY_OPS)}")
+    values = [value] if op == "=" else _value_list(field, value)
+    return [_scalar(TEXT, field, v) for v in values]
@@ -13,9 +13,43 @@ from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.calibration import CalibratedClassifierCV
 from sklearn.metrics import classification_report, roc_auc_score
+from drift_monitor import build_training_histograms, save_training_histograms, TRAINING_HISTOGRAMS_FILE
 import os
 
-def create_model(dataset_path="synthetic_cancer_treatment_dataset.csv"):
+def generate_synthetic_dataset(n_samples=2000, random_state=42):
+    """
+    Generate a synthetic treatment-response dataset with the training schema.
+    Used when the notebook CSV is not available (local development, tests).
+    """
+    rng = np.random.default_rng(random_state)
+    age = rng.integers(25, 90, n_samples)
+    cancer_stage = rng.integers(1, 5, n_samples)
+    targetable_mutation = rng.integers(0, 2, n_samples)
+    comorbidity_score = np.round(rng.uniform(0, 1, n_samples), 2)
+    treatment_type = rng.choice(["chemo", "targeted", "immuno"], n_samples)
+
+    logit = (
+        1.5
+        - 0.03 * (age - 55)
+        - 0.6 * (cancer_stage - 2)
+        - 1.2 * comorbidity_score
+        + np.where((treatment_type == "targeted") & (targetable_mutation == 1), 1.5, 0.0)
+        + np.where(treatment_type == "immuno", 0.2, 0.0)
+    )
+    prob = 1 / (1 + np.exp(-logit))
+    treatment_response = (rng.uniform(0, 1, n_samples) < prob).astype(int)
+
+    return pd.DataFrame({
+        "age": age,
+        "cancer_stage": cancer_stage,
+        "targetable_mutation": targetable_mutation,
+        "comorbidity_score": comorbidity_score,
+        "treatment_type": treatment_type,
+        "treatment_response": treatment_response,
+    })
+
+
+def create_model(dataset_path="synthetic_cancer_treatment_dataset.csv", models_dir=None, df=None):
     """Create and save the calibrated model"""
     
     print("="*60)
@@ -23,15 +57,18 @@ def create_model(dataset_path="synthetic_cancer_treatment_dataset.csv"):
     print("="*60)
     
     # 1. Load data
-    print(f"\n1. Loading dataset from: {dataset_path}")
-    if not os.path.exists(dataset_path):
-        # Try in parent directory
-        dataset_path = os.path.join("..", dataset_path)
+    if df is None:
+        print(f"\n1. Loading dataset from: {dataset_path}")
         if not os.path.exists(dataset_path):
-            print(f"ERROR: Dataset file not found: {dataset_path}")
-            return False
-    
-    df = pd.read_csv(dataset_path)
+            # Try in parent directory
+            dataset_path = os.path.join("..", dataset_path)
+            if not os.path.exists(dataset_path):
+                print(f"ERROR: Dataset file not found: {dataset_path}")
+                return False
+        
+        df = pd.read_csv(dataset_path)
+    else:
+        print("\n1. Using in-memory dataset")
     print(f"   Dataset shape: {df.shape}")
     print(f"   Columns: {list(df.columns)}")
     
@@ -105,13 +142,18 @@ def create_model(dataset_path="synthetic_cancer_treatment_dataset.csv"):
     
     # 8. Save model
     print("\n8. Saving model...")
-    models_dir = os.path.join(os.path.dirname(__file__), "models")
+    models_dir = models_dir or os.path.join(os.path.dirname(__file__), "models")
     os.makedirs(models_dir, exist_ok=True)
     
     model_path = os.path.join(models_dir, "model_calibrated.pkl")
     joblib.dump(calibrated_model, model_path)
     print(f"   Model saved to: {model_path}")
     
+    # Training distribution for the serving-time drift monitor
+    histograms_path = os.path.join(models_dir, TRAINING_HISTOGRAMS_FILE)
+    save_training_histograms(build_training_histograms(X_train), histograms_path)
+    print(f"   Training histograms saved to: {histograms_path}")
+    
     # 9. Test the saved model
     print("\n9. Testing saved model...")
     test_model = joblib.load(model_path)
@@ -136,5 +178,8 @@ if __name__ == '__main__':
     import sys
     
     dataset_path = sys.argv[1] if len(sys.argv) > 1 else "synthetic_cancer_treatment_dataset.csv"
-    create_model(dataset_path)
+    if dataset_path == "--synthetic":
+        create_model(df=generate_synthetic_dataset())
+    else:
+        create_model(dataset_path)
 
@@ -0,0 +1,119 @@
+"""
+Delta sync for the list endpoints (?since=<sync_token>)
+
+Every list response carries a `sync_token`. Passing it back as ?since=
+returns only the rows created or updated after it (found through
+updated_at, indexed together with doctor_id) plus the ids deleted since then.
+
+Deletions are recorded as tombstones by a before_flush listener on
+db.session, in the same transaction as the delete. That also covers rows
+removed by cascade, and rows moved to another doctor, which read as
+deleted to the previous owner. Bulk Query.delete() bypasses the listener.
+
+The token lags the server clock by SYNC_OVERLAP_SECONDS. Rows written
+while a sync query runs are then sent again on the next sync instead of
+being missed. Clients merge by id, so repeats are harmless. Tombstones are
+kept for SYNC_TOMBSTONE_RETENTION_DAYS (`flask prune-tombstones`). An older
+token gets 410 Gone and the client reloads the full list.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, inspect
+
+SYNC_OVERLAP_SECONDS = 5
+DEFAULT_RETENTION_DAYS = 30
+
+db = None
+Tombstone = None
+retention_days = DEFAULT_RETENTION_DAYS
+
+# models whose deletions are recorded
+_TRACKED = ()
+
+
+class InvalidSinceError(ValueError):
+    pass
+
+
+class SyncExpiredError(ValueError):
+    pass
+
+
+def init_delta_sync(db_instance, Tombstone_model, tracked_models, retention=DEFAULT_RETENTION_DAYS):
+    """Register the tombstone listener on the app's scoped session"""
+    global db, Tombstone, retention_days, _TRACKED
+    db = db_instance
+    Tombstone = Tombstone_model
+    retention_days = retention
+    _TRACKED = tuple(tracked_models)
+    event.listen(db.session, "before_flush", _before_flush)
+
+
+def _tombstone(obj, doctor_id, now):
+    return {
+        "entity": obj.__tablename__,
+        "record_id": obj.id,
+        "doctor_id": doctor_id,
+        "patient_id": getattr(obj, "patient_id", None),
+        "deleted_at": now,
+    }
+
+
+def _before_flush(session, flush_context, instances):
+    now = datetime.utcnow()
+    rows = []
+    for obj in session.deleted:
+        if isinstance(obj, _TRACKED) and obj.doctor_id is not None:
+            rows.append(_tombstone(obj, obj.doctor_id, now))
+    for obj in session.dirty:
+        if isinstance(obj, _TRACKED):
+            for previous in inspect(obj).attrs.doctor_id.history.deleted or ():
+                if previous is not None and previous != obj.doctor_id:
+                    rows.append(_tombstone(obj, previous, now))
+    if rows:
+        session.connection().execute(Tombstone.__table__.insert(), rows)
+
+
+def parse_since(value):
+    """Naive-UTC datetime for a ?since= value (ISO 8601), or None when absent"""
+    if not value:
+        return None
+    try:
+        since = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise InvalidSinceError("Invalid since timestamp")
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    if since < datetime.utcnow() - timedelta(days=retention_days):
+        raise SyncExpiredError("since is older than the deletion log; reload the full list")
+    return since
+
+
+def sync_token():
+    """Value for the next ?since= (taken before the sync query runs)"""
+    return (datetime.utcnow() - timedelta(seconds=SYNC_OVERLAP_SECONDS)).isoformat()
+
+
+def changed_since(query, model, since):
+    return query.filter(model.updated_at > since)
+
+
+def deleted_since(entity, doctor_id, since, patient_id=None):
+    """Ids of `entity` rows deleted (or moved away from `doctor_id`) after `since`"""
+    query = db.session.query(Tombstone.record_id).filter(
+        Tombstone.doctor_id == doctor_id,
+        Tombstone.entity == entity,
+        Tombstone.deleted_at > since,
+    )
+    if patient_id is not None:
+        query = query.filter(Tombstone.patient_id == patient_id)
+    return sorted({record_id for record_id, in query})
+
+
+def prune_tombstones(days=None) -> int:
+    """Delete tombstones older than the retention window; returns how many were removed"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days if days is None else days)
+    removed = Tombstone.query.filter(Tombstone.deleted_at < cutoff).delete()
+    db.session.commit()
+    return removed
@@ -0,0 +1,166 @@
+"""
+Feature drift monitoring against the training distribution
+
+Training histograms are saved next to the model artifact by
+create_model_from_notebook.py; at serving time every scored input is added to
+fixed-bin streaming histograms (constant memory per feature) and compared to
+the training histograms with PSI and a binned Kolmogorov-Smirnov statistic.
+"""
+
+import json
+import math
+import threading
+from bisect import bisect_right
+from typing import Dict, List
+
+# Patient-level model inputs (treatment_type is varied by the service itself)
+DRIFT_FEATURES = ["age", "cancer_stage", "targetable_mutation", "comorbidity_score"]
+
+TRAINING_HISTOGRAMS_FILE = "training_histograms.json"
+
+# Conventional PSI bands: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+_EPSILON = 1e-4
+
+
+def _bin_edges(values: List[float], bins: int) -> List[float]:
+    """
+    Interior bin edges for a feature.
+
+    Discrete features (few distinct values) get one bin per value; continuous
+    features get quantile edges so each training bin holds similar mass.
+    """
+    distinct = sorted(set(float(v) for v in values))
+    if len(distinct) <= bins:
+        return [(a + b) / 2 for a, b in zip(distinct, distinct[1:])]
+
+    ordered = sorted(float(v) for v in values)
+    n = len(ordered)
+    edges = []
+    for i in range(1, bins):
+        edge = ordered[min(n - 1, int(round(i * n / bins)))]
+        if not edges or edge > edges[-1]:
+            edges.append(edge)
+    return edges
+
+
+def build_training_histograms(df, features: List[str] = DRIFT_FEATURES, bins: int = 10) -> Dict:
+    """Build the per-feature histograms saved alongside the model artifact"""
+    histograms = {}
+    for feature in features:
+        values = df[feature].astype(float).tolist()
+        edges = _bin_edges(values, bins)
+        counts = [0] * (len(edges) + 1)
+        for v in values:
+            counts[bisect_right(edges, v)] += 1
+        histograms[feature] = {"edges": edges, "counts": counts}
+    return {"features": histograms, "n_samples": len(df)}
+
+
+def save_training_histograms(histograms: Dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(histograms, f, indent=2)
+
+
+def _proportions(counts: List[int]) -> List[float]:
+    total = sum(counts)
+    if total == 0:
+        return [0.0] * len(counts)
+    return [c / total for c in counts]
+
+
+def psi(expected: List[int], actual: List[int]) -> float:
+    """Population Stability Index between two histograms over the same bins"""
+    score = 0.0
+    for e, a in zip(_proportions(expected), _proportions(actual)):
+        e = max(e, _EPSILON)
+        a = max(a, _EPSILON)
+        score += (a - e) * math.log(a / e)
+    return score
+
+
+def ks_statistic(expected: List[int], actual: List[int]) -> float:
+    """Binned two-sample KS statistic: max distance between the empirical CDFs"""
+    cdf_e = cdf_a = 0.0
+    stat = 0.0
+    for e, a in zip(_proportions(expected), _proportions(actual)):
+        cdf_e += e
+        cdf_a += a
+        stat = max(stat, abs(cdf_e - cdf_a))
+    return stat
+
+
+class StreamingHistogram:
+    """Fixed-bin histogram; memory is O(bins) regardless of how many values are added"""
+
+    __slots__ = ("edges", "counts")
+
+    def __init__(self, edges: List[float]):
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+
+    def add(self, value: float) -> None:
+        self.counts[bisect_right(self.edges, value)] += 1
+
+
+class DriftMonitor:
+    """Streaming histograms of scored inputs compared to the training distribution"""
+
+    def __init__(self, training_histograms: Dict):
+        self.training = training_histograms["features"]
+        self.training_samples = training_histograms.get("n_samples")
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_file(cls, path: str) -> "DriftMonitor":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.observed = 0
+            self.histograms = {
+                name: StreamingHistogram(hist["edges"]) for name, hist in self.training.items()
+            }
+
+    def observe(self, features: Dict) -> None:
+        """Add one scored input (dict of feature -> numeric value)"""
+        with self._lock:
+            self.observed += 1
+            for name, histogram in self.histograms.items():
+                value = features.get(name)
+                if value is not None:
+                    histogram.add(float(value))
+
+    def report(self) -> Dict:
+        with self._lock:
+            observed = self.observed
+            live_counts = {name: list(h.counts) for name, h in self.histograms.items()}
+
+        features = {}
+        for name, hist in self.training.items():
+            score = psi(hist["counts"], live_counts[name])
+            if score > PSI_SIGNIFICANT:
+                status = "significant"
+            elif score > PSI_MODERATE:
+                status = "moderate"
+            else:
+                status = "stable"
+            features[name] = {
+                "psi": round(score, 4),
+                "ks": round(ks_statistic(hist["counts"], live_counts[name]), 4),
+                "status": status if observed else "no_data",
+                "edges": hist["edges"],
+                "training_counts": hist["counts"],
+                "observed_counts": live_counts[name],
+            }
+
+        return {
+            "available": True,
+            "observed": observed,
+            "training_samples": self.training_samples,
+            "features": features,
+        }
@@ -0,0 +1,133 @@
+"""
+In-process pub/sub for the per-doctor server-sent events stream
+
+Route handlers call publish() after committing a change. Each doctor's
+recent events are kept in a ring buffer, so a reconnecting client can
+replay what it missed: EventSource sends the Last-Event-ID header for
+this. If the id is older than the buffer, or comes from before a restart,
+the client gets a single `resync` event and refetches everything.
+
+Only subscribers in the same process are reached. With several workers,
+a client only sees events published by the worker serving its stream.
+Clients keep a slow fallback poll for that case.
+"""
+
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+
+HEARTBEAT_SECONDS = 15
+BUFFER_SIZE = 200
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def _seq(event_id: str) -> int:
+    return int(event_id.rpartition("-")[2])
+
+
+class Subscription:
+
+    def __init__(self, broker, doctor_id):
+        self.broker = broker
+        self.doctor_id = doctor_id
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout):
+        """Next (event_id, event_type, data), or None after `timeout` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class EventBroker:
+
+    """
+    Per-doctor fan-out with a replay buffer. Event ids are "<epoch>-<seq>".
+    The epoch is the broker's start time, so ids from an earlier process are
+    recognised and answered with a resync.
+    """
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE):
+        self.epoch = str(int(time.time() * 1000))
+        self._seq = 0
+        self._buffers = defaultdict(lambda: deque(maxlen=buffer_size))
+        self._dropped = {}  # doctor_id -> seq of the newest event pushed out of the buffer
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, doctor_id, event_type: str, data: dict) -> str:
+        with self._lock:
+            self._seq += 1
+            event = (f"{self.epoch}-{self._seq}", event_type, data)
+            buffer = self._buffers[doctor_id]
+            if len(buffer) == buffer.maxlen:
+                self._dropped[doctor_id] = _seq(buffer[0][0])
+            buffer.append(event)
+            subscribers = list(self._subscribers[doctor_id])
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                # A stalled client: drop the backlog and tell it to refetch everything
+                self._reset(subscription)
+        return event[0]
+
+    def subscribe(self, doctor_id, last_event_id=None):
+        """
+        Register a subscriber; returns (subscription, replay). ``replay`` holds
+        the buffered events after ``last_event_id``, or a single resync event.
+        """
+        subscription = Subscription(self, doctor_id)
+        with self._lock:
+            self._subscribers[doctor_id].add(subscription)
+            replay = self._replay(doctor_id, last_event_id)
+        return subscription, replay
+
+    def _replay(self, doctor_id, last_event_id):
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return [self._resync_event()]
+        seq = int(seq)
+        # Some of the events after last_event_id were already pushed out of the buffer
+        if seq < self._dropped.get(doctor_id, 0):
+            return [self._resync_event()]
+        return [e for e in self._buffers.get(doctor_id, ()) if _seq(e[0]) > seq]
+
+    def _resync_event(self):
+        return (f"{self.epoch}-{self._seq}", "resync", {})
+
+    def _reset(self, subscription):
+        with self._lock:
+            resync = self._resync_event()
+        while True:
+            try:
+                subscription.queue.get_nowait()
+            except queue.Empty:
+                break
+        try:
+            subscription.queue.put_nowait(resync)
+        except queue.Full:
+            pass
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.doctor_id].discard(subscription)
+
+    def subscriber_count(self, doctor_id) -> int:
+        with self._lock:
+            return len(self._subscribers.get(doctor_id, ()))
+
+
+broker = EventBroker()
+
+
+def publish(doctor_id, event_type: str, **data) -> str:
+    """Notify ``doctor_id``'s open streams; call after the change is committed"""
+    return broker.publish(doctor_id, event_type, data)
@@ -0,0 +1,203 @@
+"""
+Script to export model_calibrated.pkl to ONNX for the onnxruntime backend
+
+skl2onnx cannot convert a CalibratedClassifierCV whose base estimator is a
+multi-input Pipeline, so the graph is assembled here: every CV fold's
+preprocessor and random forest are converted with skl2onnx, the forest's
+positive-class probability is passed through that fold's isotonic calibrator
+(np.interp written out as ONNX ops), and the calibrated folds are averaged
+exactly like CalibratedClassifierCV.predict_proba.
+
+Everything runs in double precision except for one step. sklearn trees cast
+features to float32 and compare them with float64 thresholds, and integer ages
+or two-decimal scores often land exactly on a split midpoint. The graph
+reproduces that rounding so ties are broken the same way.
+
+Usage:
+    python export_onnx.py [model_path] [output_path]
+"""
+
+import os
+
+import joblib
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import DoubleTensorType, StringTensorType
+
+NUMERIC_FEATURES = ['age', 'cancer_stage', 'targetable_mutation', 'comorbidity_score']
+CATEGORICAL_FEATURES = ['treatment_type']
+ONNX_MODEL_FILE = "model_calibrated.onnx"  # loaded by ml_service when ML_INFERENCE_BACKEND=onnx
+TARGET_OPSET = {'': 17, 'ai.onnx.ml': 3}
+
+
+def _initial_types():
+    return (
+        [(name, DoubleTensorType([None, 1])) for name in NUMERIC_FEATURES]
+        + [(name, StringTensorType([None, 1])) for name in CATEGORICAL_FEATURES]
+    )
+
+
+def _isotonic_nodes(prefix, x_name, calibrator, out_name):
+    """
+    np.interp(clip(x), X_thresholds_, y_thresholds_) as ONNX nodes.
+
+    x_name is an [N, 1] double tensor; the result is written to out_name [N, 1].
+    """
+    X = np.asarray(calibrator.X_thresholds_, dtype=np.float64)
+    Y = np.asarray(calibrator.y_thresholds_, dtype=np.float64)
+    if len(X) == 1:
+        # Constant calibrator: a flat two-point segment interpolates to the same value
+        X = np.array([X[0], X[0] + 1])
+        Y = np.array([Y[0], Y[0]])
+
+    def n(name):
+        return f"{prefix}{name}"
+
+    initializers = [
+        numpy_helper.from_array(X, n("X")),
+        numpy_helper.from_array(Y, n("Y")),
+        numpy_helper.from_array(np.array(X[0]), n("x_min")),
+        numpy_helper.from_array(np.array(X[-1]), n("x_max")),
+        numpy_helper.from_array(np.array(1, dtype=np.int64), n("one")),
+        numpy_helper.from_array(np.array(len(X) - 1, dtype=np.int64), n("last")),
+        numpy_helper.from_array(np.array([1], dtype=np.int64), n("axis")),
+    ]
+    nodes = [
+        helper.make_node("Clip", [x_name, n("x_min"), n("x_max")], [n("xc")]),
+        # j = number of thresholds <= x, kept inside [1, K-1] so [j-1, j] is a segment
+        helper.make_node("GreaterOrEqual", [n("xc"), n("X")], [n("ge")]),
+        helper.make_node("Cast", [n("ge")], [n("ge_int")], to=TensorProto.INT64),
+        helper.make_node("ReduceSum", [n("ge_int"), n("axis")], [n("count")], keepdims=1),
+        helper.make_node("Clip", [n("count"), n("one"), n("last")], [n("j")]),
+        helper.make_node("Sub", [n("j"), n("one")], [n("j0")]),
+        helper.make_node("Gather", [n("X"), n("j0")], [n("x0")]),
+        helper.make_node("Gather", [n("X"), n("j")], [n("x1")]),
+        helper.make_node("Gather", [n("Y"), n("j0")], [n("y0")]),
+        helper.make_node("Gather", [n("Y"), n("j")], [n("y1")]),
+        helper.make_node("Sub", [n("xc"), n("x0")], [n("dx")]),
+        helper.make_node("Sub", [n("x1"), n("x0")], [n("width")]),
+        helper.make_node("Div", [n("dx"), n("width")], [n("t")]),
+        helper.make_node("Sub", [n("y1"), n("y0")], [n("dy")]),
+        helper.make_node("Mul", [n("t"), n("dy")], [n("step")]),
+        helper.make_node("Add", [n("y0"), n("step")], [out_name]),
+    ]
+    return nodes, initializers
+
+
+def build_onnx_model(calibrated_model) -> onnx.ModelProto:
+    """Assemble the ONNX graph for a fitted CalibratedClassifierCV(Pipeline)"""
+    nodes, initializers, fold_outputs = [], [], []
+    inputs = None
+    opset_imports = None
+    ir_version = None
+
+    for i, fold in enumerate(calibrated_model.calibrated_classifiers_):
+        preprocessor = fold.estimator.named_steps["preprocessor"]
+        rf = fold.estimator.named_steps["model"]
+
+        pre_onnx = onnx.compose.add_prefix(
+            convert_sklearn(preprocessor, initial_types=_initial_types(), target_opset=TARGET_OPSET),
+            f"fold{i}_pre_", rename_inputs=False
+        )
+        n_features = len(preprocessor.get_feature_names_out())
+        rf_onnx = onnx.compose.add_prefix(
+            convert_sklearn(
+                rf,
+                initial_types=[("X", DoubleTensorType([None, n_features]))],
+                options={id(rf): {"zipmap": False}},
+                target_opset=TARGET_OPSET,
+            ),
+            f"fold{i}_rf_"
+        )
+        inputs = inputs or list(pre_onnx.graph.input)
+        opset_imports = opset_imports or list(rf_onnx.opset_import)
+        ir_version = ir_version or rf_onnx.ir_version
+
+        # preprocessor (double) -> float32 rounding as in sklearn trees -> forest (double thresholds)
+        features_name = pre_onnx.graph.output[0].name
+        nodes.extend(pre_onnx.graph.node)
+        nodes.extend([
+            helper.make_node("Cast", [features_name], [f"fold{i}_features_f32"], to=TensorProto.FLOAT),
+            helper.make_node("Cast", [f"fold{i}_features_f32"], [rf_onnx.graph.input[0].name], to=TensorProto.DOUBLE),
+        ])
+        nodes.extend(rf_onnx.graph.node)
+        initializers.extend(pre_onnx.graph.initializer)
+        initializers.extend(rf_onnx.graph.initializer)
+
+        proba_name = next(o.name for o in rf_onnx.graph.output if "probabilities" in o.name)
+        pos_name = f"fold{i}_positive"
+        initializers.extend([
+            numpy_helper.from_array(np.array([1], dtype=np.int64), f"fold{i}_start"),
+            numpy_helper.from_array(np.array([2], dtype=np.int64), f"fold{i}_end"),
+            numpy_helper.from_array(np.array([1], dtype=np.int64), f"fold{i}_slice_axis"),
+        ])
+        # TreeEnsembleClassifier always emits float probabilities
+        nodes.extend([
+            helper.make_node(
+                "Slice", [proba_name, f"fold{i}_start", f"fold{i}_end", f"fold{i}_slice_axis"], [f"{pos_name}_f32"]
+            ),
+            helper.make_node("Cast", [f"{pos_name}_f32"], [pos_name], to=TensorProto.DOUBLE),
+        ])
+
+        cal_nodes, cal_inits = _isotonic_nodes(
+            f"fold{i}_iso_", pos_name, fold.calibrators[0], f"fold{i}_calibrated"
+        )
+        nodes.extend(cal_nodes)
+        initializers.extend(cal_inits)
+        fold_outputs.append(f"fold{i}_calibrated")
+
+    initializers.extend([
+        numpy_helper.from_array(np.array(len(fold_outputs), dtype=np.float64), "n_folds"),
+        numpy_helper.from_array(np.array(1, dtype=np.float64), "unity"),
+    ])
+    nodes.extend([
+        helper.make_node("Sum", fold_outputs, ["fold_sum"]),
+        helper.make_node("Div", ["fold_sum", "n_folds"], ["positive_probability"]),
+        helper.make_node("Sub", ["unity", "positive_probability"], ["negative_probability"]),
+        helper.make_node("Concat", ["negative_probability", "positive_probability"], ["probabilities"], axis=1),
+    ])
+
+    graph = helper.make_graph(
+        nodes,
+        "oncoai_calibrated_model",
+        inputs,
+        [helper.make_tensor_value_info("probabilities", TensorProto.DOUBLE, [None, 2])],
+        initializer=initializers,
+    )
+    model = helper.make_model(graph, opset_imports=opset_imports, producer_name="oncoai")
+    # Match skl2onnx rather than the (possibly newer) default of the installed onnx package
+    model.ir_version = ir_version
+    onnx.checker.check_model(model)
+    return model
+
+
+def export_onnx(model_path=None, output_path=None):
+    """Convert model_calibrated.pkl and save it next to the pickle"""
+    models_dir = os.path.join(os.path.dirname(__file__), "models")
+    model_path = model_path or os.path.join(models_dir, "model_calibrated.pkl")
+    output_path = output_path or os.path.join(os.path.dirname(model_path), ONNX_MODEL_FILE)
+
+    print("=" * 60)
+    print("Exporting Calibrated Model to ONNX")
+    print("=" * 60)
+    print(f"   Source: {model_path}")
+
+    calibrated_model = joblib.load(model_path)
+    model = build_onnx_model(calibrated_model)
+    onnx.save(model, output_path)
+
+    print(f"   Folds:  {len(calibrated_model.calibrated_classifiers_)}")
+    print(f"   Saved:  {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)")
+    print("=" * 60)
+    return output_path
+
+
+if __name__ == '__main__':
+    import sys
+
+    export_onnx(
+        sys.argv[1] if len(sys.argv) > 1 else None,
+        sys.argv[2] if len(sys.argv) > 2 else None,
+    )
@@ -0,0 +1,163 @@
+"""
+Indexed genomics side tables, derived from Patient.clinical_data
+
+Mutations and biomarkers are stored in clinical_data["genomics"] (see
+clinical_data_helpers.generate_clinical_data). Questions like "EGFR-positive
+stage IV patients" would have to decode every patient's JSON, so the values
+are copied into two tables:
+
+    patient_mutations   one row per (patient, gene), indexed by (doctor_id, gene)
+    patient_biomarkers  one row per patient: PD-L1 %, TMB, MSI status
+
+A flush listener on db.session rewrites a patient's rows whenever the patient
+is inserted or its clinical_data changes, on the same connection, so they
+commit or roll back with the write. Bulk Query.update()/delete() and raw SQL
+bypass it; run `flask backfill-genomics` after those (or after importing data).
+"""
+
+from sqlalchemy import event, inspect, select
+
+MAX_GENE_LENGTH = 20
+
+db = None
+Patient = None
+PatientMutation = None
+PatientBiomarkers = None
+
+
+def init_genomics(db_instance, Patient_model, PatientMutation_model, PatientBiomarkers_model):
+    """Register the side-table maintenance listeners on the app's scoped session"""
+    global db, Patient, PatientMutation, PatientBiomarkers
+    db = db_instance
+    Patient = Patient_model
+    PatientMutation = PatientMutation_model
+    PatientBiomarkers = PatientBiomarkers_model
+    event.listen(db.session, "before_flush", _before_flush)
+    event.listen(db.session, "after_flush", _after_flush)
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None and not isinstance(value, bool) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_genomics(clinical_data):
+    """(genes, biomarkers) from a clinical_data dict; biomarkers is None when none are recorded
+
+    Genes are upper-cased and de-duplicated. Mutations may be gene names or
+    {"gene": ...} objects; malformed entries are skipped rather than failing the write.
+    """
+    genomics = clinical_data.get("genomics") if isinstance(clinical_data, dict) else None
+    if not isinstance(genomics, dict):
+        return [], None
+
+    genes = set()
+    for mutation in genomics.get("mutations") or ():
+        gene = mutation.get("gene") if isinstance(mutation, dict) else mutation
+        if isinstance(gene, str) and gene.strip():
+            genes.add(gene.strip().upper()[:MAX_GENE_LENGTH])
+
+    markers = genomics.get("biomarkers")
+    markers = markers if isinstance(markers, dict) else {}
+    msi_status = markers.get("MSI_Status")
+    biomarkers = {
+        "pd_l1": _number(markers.get("PD-L1")),
+        "tmb": _number(markers.get("TMB")),
+        "msi_status": msi_status.strip().upper() if isinstance(msi_status, str) and msi_status.strip() else None,
+    }
+    if all(value is None for value in biomarkers.values()):
+        biomarkers = None
+    return sorted(genes), biomarkers
+
+
+def _clear(connection, patient_ids):
+    for model in (PatientMutation, PatientBiomarkers):
+        connection.execute(model.__table__.delete().where(model.patient_id.in_(patient_ids)))
+
+
+def _write(connection, patients):
+    """Replace the side rows of (patient_id, doctor_id, clinical_data) triples"""
+    # Also clears rows left by a bulk delete: SQLite can hand a deleted patient's id to a new one
+    _clear(connection, [patient_id for patient_id, _, _ in patients])
+    mutations, biomarkers = [], []
+    for patient_id, doctor_id, clinical_data in patients:
+        genes, markers = extract_genomics(clinical_data)
+        mutations += [{"patient_id": patient_id, "doctor_id": doctor_id, "gene": gene} for gene in genes]
+        if markers:
+            biomarkers.append({"patient_id": patient_id, "doctor_id": doctor_id, **markers})
+    if mutations:
+        connection.execute(PatientMutation.__table__.insert(), mutations)
+    if biomarkers:
+        connection.execute(PatientBiomarkers.__table__.insert(), biomarkers)
+
+
+def _before_flush(session, flush_context, instances):
+    # Before the patient rows go, so a foreign key to them never dangles
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Patient) and obj.id is not None]
+    if deleted:
+        _clear(session.connection(), deleted)
+
+
+def _after_flush(session, flush_context):
+    # New patients only have ids after the flush; new/dirty/history still show the flushed changes here
+    rewrite, moved = [], []
+    for obj in session.new:
+        if isinstance(obj, Patient):
+            rewrite.append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Patient):
+            state = inspect(obj)
+            if state.attrs.clinical_data.history.has_changes():
+                rewrite.append(obj)
+            elif state.attrs.doctor_id.history.has_changes():
+                moved.append(obj)
+
+    if not rewrite and not moved:
+        return
+    connection = session.connection()
+    if rewrite:
+        _write(connection, [(obj.id, obj.doctor_id, obj.clinical_data) for obj in rewrite])
+    for obj in moved:
+        for model in (PatientMutation, PatientBiomarkers):
+            connection.execute(
+                model.__table__.update().where(model.patient_id == obj.id).values(doctor_id=obj.doctor_id)
+            )
+
+
+def patients_with_mutation(doctor_id, genes):
+    """Subquery of ``doctor_id``'s patient ids carrying any of ``genes`` (for Patient.id.in_())"""
+    return select(PatientMutation.patient_id).where(
+        PatientMutation.doctor_id == doctor_id,
+        PatientMutation.gene.in_([gene.upper() for gene in genes]),
+    )
+
+
+def patients_with_msi_status(doctor_id, statuses):
+    """Subquery of ``doctor_id``'s patient ids whose MSI status is one of ``statuses``"""
+    return select(PatientBiomarkers.patient_id).where(
+        PatientBiomarkers.doctor_id == doctor_id,
+        PatientBiomarkers.msi_status.in_([status.upper() for status in statuses]),
+    )
+
+
+def backfill_genomics(batch_size: int = 500) -> int:
+    """Rebuild patient_mutations and patient_biomarkers from clinical_data; returns patients processed"""
+    connection = db.session.connection()
+    connection.execute(PatientMutation.__table__.delete())
+    connection.execute(PatientBiomarkers.__table__.delete())
+
+    processed, last_id = 0, 0
+    while True:
+        rows = db.session.execute(
+            select(Patient.id, Patient.doctor_id, Patient.clinical_data)
+            .where(Patient.id > last_id).order_by(Patient.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        _write(connection, [tuple(row) for row in rows])
+        processed += len(rows)
+        last_id = rows[-1][0]
+    db.session.commit()
+    return processed
@@ -0,0 +1,68 @@
+"""
+orjson-backed JSON provider for Flask
+
+Selected with JSON_PROVIDER=orjson (the default when orjson is installed);
+JSON_PROVIDER=default keeps Flask's stdlib provider. Output matches the
+default provider for the types this API returns: dates use the same HTTP date
+format, Decimals become strings, numpy scalars/arrays (from ml_service)
+become plain numbers/lists, and keys are sorted.
+"""
+
+import decimal
+from datetime import date, time
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _default(o):
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, time):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+
+    def _options(self, indent=None):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(
+            obj, default=kwargs.get("default", _default), option=self._options(kwargs.get("indent"))
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default, option=self._options(indent=pretty) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app) -> str:
+    """Install the provider named by app.config['JSON_PROVIDER']; returns the one in use"""
+    if app.config.get("JSON_PROVIDER", "orjson") == "orjson":
+        if HAS_ORJSON:
+            app.json = OrjsonProvider(app)
+            return "orjson"
+        print("Warning: JSON_PROVIDER=orjson but orjson is not installed; using the default provider")
+    return "default"
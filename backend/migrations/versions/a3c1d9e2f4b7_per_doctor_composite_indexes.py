@@ -0,0 +1,39 @@
+"""Composite indexes for the per-doctor access paths
+
+Tables are still created by db.create_all() on startup, which also creates
+these indexes for new databases; this revision adds them to databases created
+before they were declared on the models.
+
+Revision ID: a3c1d9e2f4b7
+Revises: 
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c1d9e2f4b7'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_patients_doctor_id_risk_score', 'patients', ['doctor_id', 'risk_score']),
+    ('ix_patients_doctor_id_risk_level', 'patients', ['doctor_id', 'risk_level']),
+    ('ix_patients_doctor_id_diagnosis_date', 'patients', ['doctor_id', 'diagnosis_date']),
+    ('ix_appointments_doctor_id_created_at', 'appointments', ['doctor_id', 'created_at']),
+    ('ix_reports_doctor_id_generated_at', 'reports', ['doctor_id', 'generated_at']),
+    ('ix_outcomes_patient_id_created_at', 'outcomes', ['patient_id', 'created_at']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,61 @@
+"""Genomics side tables: patient_mutations and patient_biomarkers
+
+Indexed copies of clinical_data["genomics"], maintained by genomics.py.
+Decoding clinical_data needs the application code, so fill the new tables
+with `flask --app app backfill-genomics` after upgrading.
+
+Revision ID: a9d4e2b7c815
+Revises: f2c7a4e8b1d6
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d4e2b7c815'
+down_revision = 'f2c7a4e8b1d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'patient_mutations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('gene', sa.String(length=20), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('patient_id', 'gene', name='uq_patient_mutations_patient_id_gene'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_patient_mutations_doctor_id_gene', 'patient_mutations',
+                    ['doctor_id', 'gene', 'patient_id'], unique=False, if_not_exists=True)
+
+    op.create_table(
+        'patient_biomarkers',
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('pd_l1', sa.Float(), nullable=True),
+        sa.Column('tmb', sa.Float(), nullable=True),
+        sa.Column('msi_status', sa.String(length=10), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('patient_id'),
+        if_not_exists=True,
+    )
+    for column in ('msi_status', 'tmb', 'pd_l1'):
+        op.create_index(f'ix_patient_biomarkers_doctor_id_{column}', 'patient_biomarkers',
+                        ['doctor_id', column], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for column in ('pd_l1', 'tmb', 'msi_status'):
+        op.drop_index(f'ix_patient_biomarkers_doctor_id_{column}', table_name='patient_biomarkers', if_exists=True)
+    op.drop_table('patient_biomarkers')
+    op.drop_index('ix_patient_mutations_doctor_id_gene', table_name='patient_mutations', if_exists=True)
+    op.drop_table('patient_mutations')
@@ -0,0 +1,79 @@
+"""Move patient avatar data URLs into the avatar store
+
+Every patients.avatar_url that is a base64 data URL is written to
+AVATAR_STORAGE_DIR (avatar_store.py) and replaced by its short
+/api/avatars/<sha256>.<ext> URL. Rows are converted in id batches. Values
+that are not valid images are cleared. The column keeps its type; changing
+it would rebuild the patients table on SQLite and drop the name search
+triggers.
+
+Downgrade inlines the stored images back as data URLs (the files are kept).
+
+Revision ID: b3e8f1c6d247
+Revises: a9d4e2b7c815
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+import base64
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+import avatar_store
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8f1c6d247'
+down_revision = 'a9d4e2b7c815'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+patients = sa.table('patients', sa.column('id', sa.Integer), sa.column('avatar_url', sa.Text))
+
+
+def _rewrite(prefix, convert):
+    """Apply convert() to every avatar_url starting with prefix, in id batches"""
+    conn = op.get_bind()
+    last_id, converted = 0, 0
+    while True:
+        rows = conn.execute(
+            sa.select(patients.c.id, patients.c.avatar_url)
+            .where(patients.c.id > last_id, patients.c.avatar_url.like(prefix + '%'))
+            .order_by(patients.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for patient_id, url in rows:
+            conn.execute(patients.update().where(patients.c.id == patient_id).values(avatar_url=convert(url)))
+        converted += len(rows)
+        last_id = rows[-1][0]
+    print(f"Converted {converted} patient avatars")
+
+
+def _to_file(url):
+    try:
+        return avatar_store.save_data_url(url)
+    except avatar_store.AvatarError:
+        return None
+
+
+def _to_data_url(url):
+    name = avatar_store.stored_name(url)
+    path = avatar_store.image_path(name) if name else None
+    if path is None:
+        return url
+    with open(path, 'rb') as f:
+        return f'data:{avatar_store.mimetype(name)};base64,{base64.b64encode(f.read()).decode()}'
+
+
+def upgrade():
+    avatar_store.init_avatar_store(current_app.config['AVATAR_STORAGE_DIR'])
+    _rewrite('data:', _to_file)
+
+
+def downgrade():
+    avatar_store.init_avatar_store(current_app.config['AVATAR_STORAGE_DIR'])
+    _rewrite(avatar_store.URL_PREFIX, _to_data_url)
@@ -0,0 +1,32 @@
+"""Indexes for keyset pagination of the per-doctor lists
+
+Revision ID: b7e4f2a91c3d
+Revises: a3c1d9e2f4b7
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4f2a91c3d'
+down_revision = 'a3c1d9e2f4b7'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_patients_doctor_id_id', 'patients', ['doctor_id', 'id']),
+    ('ix_appointments_doctor_id_id', 'appointments', ['doctor_id', 'id']),
+    ('ix_reports_doctor_id_id', 'reports', ['doctor_id', 'id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,67 @@
+"""Store structured patient/report/outcome data in JSON columns
+
+Existing values are JSON text, so SQLite only needs the declared type changed
+(the table is rebuilt in batch mode) and Postgres casts them to jsonb.
+Columns that are not there are skipped: a database made by db.create_all()
+already has the later schema, without reports.report_data.
+
+Revision ID: c52d8e17b6a0
+Revises: b7e4f2a91c3d
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52d8e17b6a0'
+down_revision = 'b7e4f2a91c3d'
+branch_labels = None
+depends_on = None
+
+JSON_COLUMNS = {
+    'patients': ['clinical_data', 'ml_recommendations', 'treatment_protocol'],
+    'reports': ['report_data'],
+    'outcomes': ['outcome_data'],
+}
+
+JSON_TYPE = sa.JSON(none_as_null=True).with_variant(postgresql.JSONB(none_as_null=True), 'postgresql')
+
+
+def _existing(table, columns):
+    present = {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+    return [column for column in columns if column in present]
+
+
+def upgrade():
+    for table, columns in JSON_COLUMNS.items():
+        columns = _existing(table, columns)
+        if not columns:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.Text(),
+                    type_=JSON_TYPE,
+                    existing_nullable=True,
+                    postgresql_using=f'{column}::jsonb',
+                )
+
+
+def downgrade():
+    for table, columns in JSON_COLUMNS.items():
+        columns = _existing(table, columns)
+        if not columns:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=JSON_TYPE,
+                    type_=sa.Text(),
+                    existing_nullable=True,
+                    postgresql_using=f'{column}::text',
+                )
@@ -0,0 +1,123 @@
+"""Compressed, deduplicated report bodies in report_blobs
+
+reports.report_data (JSON) is replaced by reports.report_hash, pointing at
+a report_blobs row that holds the zlib/zstd-compressed canonical JSON
+(report_store.py). Existing bodies are moved over in id batches, identical
+ones sharing a row, then the report_data column is dropped. A database made
+by db.create_all() already has report_hash and no report_data; both steps
+are skipped there.
+
+Downgrade decompresses the bodies back into report_data.
+
+Revision ID: c7a2e9d4f318
+Revises: b3e8f1c6d247
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from flask import current_app
+
+import report_store
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a2e9d4f318'
+down_revision = 'b3e8f1c6d247'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+JSON_TYPE = sa.JSON(none_as_null=True).with_variant(postgresql.JSONB(none_as_null=True), 'postgresql')
+
+reports = sa.table('reports', sa.column('id', sa.Integer), sa.column('report_data', JSON_TYPE),
+                   sa.column('report_hash', sa.String))
+report_blobs = sa.table('report_blobs', sa.column('content_hash', sa.String), sa.column('encoding', sa.String),
+                        sa.column('size', sa.Integer), sa.column('data', sa.LargeBinary))
+
+
+def _batches(conn, column):
+    """Rows (id, column) of reports with a non-null column, in id batches"""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(reports.c.id, column)
+            .where(reports.c.id > last_id, column.isnot(None))
+            .order_by(reports.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    op.create_table(
+        'report_blobs',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('encoding', sa.String(length=10), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('content_hash'),
+        if_not_exists=True,
+    )
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('reports')}
+    if 'report_hash' not in columns:
+        with op.batch_alter_table('reports', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('report_hash', sa.String(length=64), nullable=True))
+            batch_op.create_index('ix_reports_report_hash', ['report_hash'], unique=False)
+            batch_op.create_foreign_key('fk_reports_report_hash_report_blobs', 'report_blobs',
+                                        ['report_hash'], ['content_hash'])
+    if 'report_data' not in columns:
+        return
+
+    report_store.compression = report_store._codec(current_app.config['REPORT_COMPRESSION'])
+    conn = op.get_bind()
+    moved, stored = 0, set()
+    for rows in _batches(conn, reports.c.report_data):
+        for report_id, data in rows:
+            if isinstance(data, str):  # double-encoded JSON text from older seed scripts
+                data = json.loads(data)
+            if not data:
+                continue
+            raw, content_hash = report_store.encode(data)
+            if content_hash not in stored:
+                encoding, compressed = report_store.compress(raw)
+                if conn.execute(sa.select(report_blobs.c.content_hash)
+                                .where(report_blobs.c.content_hash == content_hash)).first() is None:
+                    conn.execute(report_blobs.insert().values(content_hash=content_hash, encoding=encoding,
+                                                              size=len(raw), data=compressed))
+                stored.add(content_hash)
+            conn.execute(reports.update().where(reports.c.id == report_id).values(report_hash=content_hash))
+            moved += 1
+    print(f"Moved {moved} report bodies into {len(stored)} report_blobs rows")
+
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.drop_column('report_data')
+
+
+def downgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('report_data', JSON_TYPE, nullable=True))
+
+    conn = op.get_bind()
+    for rows in _batches(conn, reports.c.report_hash):
+        for report_id, content_hash in rows:
+            row = conn.execute(sa.select(report_blobs.c.encoding, report_blobs.c.data)
+                               .where(report_blobs.c.content_hash == content_hash)).first()
+            body = json.loads(report_store.decompress(*row)) if row else None
+            conn.execute(reports.update().where(reports.c.id == report_id).values(report_data=body))
+
+    # Unnamed when the table came from db.create_all(); dropping the column drops it too
+    foreign_keys = {fk['name'] for fk in sa.inspect(conn).get_foreign_keys('reports')}
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        if 'fk_reports_report_hash_report_blobs' in foreign_keys:
+            batch_op.drop_constraint('fk_reports_report_hash_report_blobs', type_='foreignkey')
+        batch_op.drop_index('ix_reports_report_hash')
+        batch_op.drop_column('report_hash')
+    op.drop_table('report_blobs')
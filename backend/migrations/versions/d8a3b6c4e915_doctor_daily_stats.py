@@ -0,0 +1,54 @@
+"""Per-doctor, per-day dashboard rollup table
+
+Creates doctor_daily_stats and fills it from the existing patients and
+reports (the same computation as `flask backfill-rollups`).
+
+Revision ID: d8a3b6c4e915
+Revises: c52d8e17b6a0
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a3b6c4e915'
+down_revision = 'c52d8e17b6a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'doctor_daily_stats',
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('new_patients', sa.Integer(), nullable=False),
+        sa.Column('high_risk_patients', sa.Integer(), nullable=False),
+        sa.Column('reports_generated', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('doctor_id', 'day'),
+        if_not_exists=True,
+    )
+    op.execute("DELETE FROM doctor_daily_stats")
+    op.execute(
+        """
+        INSERT INTO doctor_daily_stats (doctor_id, day, new_patients, high_risk_patients, reports_generated)
+        SELECT doctor_id, day, SUM(new_patients), SUM(high_risk_patients), SUM(reports_generated)
+        FROM (
+            SELECT doctor_id, diagnosis_date AS day, 1 AS new_patients,
+                   CASE WHEN risk_level = 'high' THEN 1 ELSE 0 END AS high_risk_patients,
+                   0 AS reports_generated
+            FROM patients WHERE diagnosis_date IS NOT NULL
+            UNION ALL
+            SELECT doctor_id, DATE(generated_at), 0, 0, 1
+            FROM reports WHERE generated_at IS NOT NULL
+        ) AS source
+        GROUP BY doctor_id, day
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('doctor_daily_stats')
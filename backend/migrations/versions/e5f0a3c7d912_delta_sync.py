@@ -0,0 +1,63 @@
+"""Delta sync: reports.updated_at, (owner, updated_at) indexes and tombstones
+
+Adds updated_at to reports (filled from generated_at), fills missing
+updated_at elsewhere from created_at, indexes updated_at next to the owning
+doctor (patient for outcomes) and creates the tombstones table.
+
+Revision ID: e5f0a3c7d912
+Revises: d8a3b6c4e915
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f0a3c7d912'
+down_revision = 'd8a3b6c4e915'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_patients_doctor_id_updated_at', 'patients', ['doctor_id', 'updated_at']),
+    ('ix_appointments_doctor_id_updated_at', 'appointments', ['doctor_id', 'updated_at']),
+    ('ix_reports_doctor_id_updated_at', 'reports', ['doctor_id', 'updated_at']),
+    ('ix_outcomes_patient_id_updated_at', 'outcomes', ['patient_id', 'updated_at']),
+]
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('reports')}
+    if 'updated_at' not in columns:
+        with op.batch_alter_table('reports') as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE reports SET updated_at = generated_at WHERE updated_at IS NULL")
+    for table in ('patients', 'appointments', 'outcomes'):
+        op.execute(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL")
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+    op.create_table(
+        'tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=50), nullable=False),
+        sa.Column('record_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_tombstones_doctor_id_entity_deleted_at', 'tombstones',
+                    ['doctor_id', 'entity', 'deleted_at'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_tombstones_doctor_id_entity_deleted_at', table_name='tombstones', if_exists=True)
+    op.drop_table('tombstones')
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+    with op.batch_alter_table('reports') as batch_op:
+        batch_op.drop_column('updated_at')
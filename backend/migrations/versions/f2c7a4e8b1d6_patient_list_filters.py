@@ -0,0 +1,72 @@
+"""Patient list filters: per-doctor filter/sort indexes and name search index
+
+Indexes the columns the patients list filters and sorts on next to
+doctor_id, and builds the trigram name index: an FTS5 table kept in sync by
+triggers on SQLite, a pg_trgm GIN index on PostgreSQL.
+
+Revision ID: f2c7a4e8b1d6
+Revises: e5f0a3c7d912
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7a4e8b1d6'
+down_revision = 'e5f0a3c7d912'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_patients_doctor_id_cancer_type', ['doctor_id', 'cancer_type']),
+    ('ix_patients_doctor_id_stage', ['doctor_id', 'stage']),
+    ('ix_patients_doctor_id_status', ['doctor_id', 'status']),
+    ('ix_patients_doctor_id_age', ['doctor_id', 'age']),
+    ('ix_patients_doctor_id_name', ['doctor_id', 'name']),
+]
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5("
+    "name, content='patients', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_ai AFTER INSERT ON patients BEGIN "
+    "INSERT INTO patients_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_ad AFTER DELETE ON patients BEGIN "
+    "INSERT INTO patients_fts(patients_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_au AFTER UPDATE OF name ON patients BEGIN "
+    "INSERT INTO patients_fts(patients_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO patients_fts(rowid, name) VALUES (new.id, new.name); END",
+    "INSERT INTO patients_fts(patients_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS patients_fts_au",
+    "DROP TRIGGER IF EXISTS patients_fts_ad",
+    "DROP TRIGGER IF EXISTS patients_fts_ai",
+    "DROP TABLE IF EXISTS patients_fts",
+]
+
+
+def upgrade():
+    for name, columns in INDEXES:
+        op.create_index(name, 'patients', columns, unique=False, if_not_exists=True)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_patients_name_trgm ON patients USING gin (name gin_trgm_ops)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_patients_name_trgm")
+
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='patients', if_exists=True)
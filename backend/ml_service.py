@@ -1,17 +1,37 @@
 import os
 
+import hashlib
+
+import json
+
+import threading
+
+import time
+
+from collections import OrderedDict
+
+from contextlib import contextmanager
+
+from datetime import datetime
+
 import joblib
 
+import numpy as np
+
 import pandas as pd
 
 import shap
 
 
 
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
 
+from drift_monitor import DriftMonitor, TRAINING_HISTOGRAMS_FILE
+
+from shadow_model import ShadowEvaluator
+
 # Load environment variables
 load_dotenv()
 
@@ -28,12 +48,42 @@ except ImportError:
         HAS_LANGCHAIN = False
         OpenAI = None
 
+try:
+    import onnxruntime as ort
+    HAS_ONNXRUNTIME = True
+except ImportError:
+    HAS_ONNXRUNTIME = False
+    ort = None
+
 
 
 
 
 CALIBRATION_THRESHOLD = 0.4
 
+# Only use treatments that were in the training data
+# Update this list if you retrain the model with additional treatment types
+TREATMENTS = ["chemo", "targeted", "immuno"]
+
+# Cohort-level SHAP summary (global explanation) settings
+SHAP_SUMMARY_SAMPLE_SIZE = int(os.getenv("SHAP_SUMMARY_SAMPLE_SIZE", "200"))
+SHAP_SUMMARY_TTL_SECONDS = int(os.getenv("SHAP_SUMMARY_TTL_SECONDS", "600"))
+SHAP_SUMMARY_MAX_ENTRIES = int(os.getenv("SHAP_SUMMARY_MAX_ENTRIES", "256"))
+
+# Shadow (candidate) model: scored in the background, never returned to clients
+SHADOW_MODEL_FILE = "model_shadow.pkl"
+SHADOW_MODEL_PATH = os.getenv("SHADOW_MODEL_PATH")
+# Inference backend for response probabilities: "sklearn" (joblib pickle) or
+# "onnx" (models/model_calibrated.onnx via onnxruntime, see export_onnx.py)
+ML_INFERENCE_BACKEND = os.getenv("ML_INFERENCE_BACKEND", "sklearn").lower()
+ONNX_MODEL_FILE = "model_calibrated.onnx"
+ONNX_NUMERIC_INPUTS = ["age", "cancer_stage", "targetable_mutation", "comorbidity_score"]
+
+SHADOW_LOG_PATH = os.getenv(
+    "SHADOW_LOG_PATH",
+    os.path.join(os.path.dirname(__file__), "instance", "shadow_predictions.jsonl")
+)
+
 
 
 
@@ -53,11 +103,31 @@ class MLService:
     def __init__(self):
 
         self.models_path = os.path.join(os.path.dirname(__file__), "models")
+        self.model_version = None
+        self.drift_monitor = None
+        self.shadow = None
     
     def is_available(self) -> bool:
         """Check if ML service is available"""
         return False
     
+    def get_global_shap_summary(self, patients: List[Dict]) -> Dict:
+        """Cohort-level feature importance - override in subclass"""
+        return {"features": [], "sample_size": 0, "model_version": self.model_version,
+                "note": "ML service not available"}
+    
+    def get_drift_report(self) -> Dict:
+        """Drift of scored inputs vs. the training distribution (counted in _rank_treatments)"""
+        if self.drift_monitor is None:
+            return {"available": False, "note": "Training histograms not found next to the model artifact"}
+        return {**self.drift_monitor.report(), "model_version": self.model_version}
+    
+    def get_shadow_stats(self) -> Dict:
+        """Agreement / calibration of the shadow model vs. production"""
+        if self.shadow is None:
+            return {"available": False, "note": f"No shadow model loaded ({SHADOW_MODEL_FILE} or SHADOW_MODEL_PATH)"}
+        return self.shadow.stats()
+    
     def generate_treatment_recommendations(self, patient_data: Dict) -> Dict:
         """Generate treatment recommendations - override in subclass"""
         return {"treatments": [], "note": "ML service not available"}
@@ -66,6 +136,10 @@ class MLService:
         """Calculate risk score - override in subclass"""
         return 50.0
     
+    def risk_score_from_recommendations(self, recommendations: Dict) -> float:
+        """Risk score from generate_treatment_recommendations() output - override in subclass"""
+        return 50.0
+    
     def _predict_side_effects(self, patient_data: Dict, treatment: str, response_prob: float) -> Dict:
         """Predict side effects - override in subclass"""
         # Return empty side effects if service not available
@@ -105,7 +179,7 @@ class OncoAIMLAdapter(MLService):
 
 
 
-    def __init__(self):
+    def __init__(self, model_path: Optional[str] = None, inference_backend: Optional[str] = None):
 
         super().__init__()
 
@@ -117,7 +191,7 @@ class OncoAIMLAdapter(MLService):
 
         # -----------------------------
 
-        model_path = os.path.join(self.models_path, "model_calibrated.pkl")
+        model_path = model_path or os.path.join(self.models_path, "model_calibrated.pkl")
 
         if not os.path.exists(model_path):
 
@@ -127,6 +201,44 @@ class OncoAIMLAdapter(MLService):
 
         self.calibrated_model = joblib.load(model_path)
 
+        self.model_version = _file_digest(model_path)
+
+
+
+        # Drift monitor (optional - needs histograms saved at training time)
+
+        histograms_path = os.path.join(os.path.dirname(model_path), TRAINING_HISTOGRAMS_FILE)
+
+        if os.path.exists(histograms_path):
+
+            self.drift_monitor = DriftMonitor.from_file(histograms_path)
+
+
+
+        # Shadow model (optional - candidate scored off the request path)
+
+        shadow_path = SHADOW_MODEL_PATH or os.path.join(os.path.dirname(model_path), SHADOW_MODEL_FILE)
+
+        if os.path.exists(shadow_path) and os.path.abspath(shadow_path) != os.path.abspath(model_path):
+
+            self.shadow = ShadowEvaluator(
+
+                joblib.load(shadow_path),
+
+                model_version=_file_digest(shadow_path),
+
+                primary_version=self.model_version,
+
+                build_inputs=self._build_treatment_inputs,
+
+                treatments=TREATMENTS,
+
+                threshold=CALIBRATION_THRESHOLD,
+
+                log_path=SHADOW_LOG_PATH
+
+            )
+
 
 
         # Extract pipeline components
@@ -139,24 +251,76 @@ class OncoAIMLAdapter(MLService):
 
 
 
-        # SHAP explainer (loaded once)
+        # Inference backend (SHAP explanations always use the sklearn forest)
+
+        self.inference_backend = "sklearn"
+
+        self.onnx_session = None
+
+        if (inference_backend or ML_INFERENCE_BACKEND) == "onnx":
+
+            onnx_path = os.path.join(os.path.dirname(model_path), ONNX_MODEL_FILE)
+
+            if HAS_ONNXRUNTIME and os.path.exists(onnx_path):
 
-        self.shap_explainer = shap.TreeExplainer(self.rf_model)
+                self.onnx_session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
 
+                self.inference_backend = "onnx"
 
+            else:
+
+                print(f"Warning: ONNX backend requested but onnxruntime or {ONNX_MODEL_FILE} is missing; using sklearn")
+
+
+
+        # Thread safety: everything above is read-only after __init__. The SHAP
+        # explainer and the LLM client are not documented as thread-safe. The
+        # server starts a thread per request, so explainers (costly to build) are
+        # checked out of a shared pool, one per concurrent caller, and reused;
+        # the LLM client is per thread. Drift monitor, shadow evaluator and the
+        # SHAP summary cache hold their own locks.
+        self._explainers = []
+        self._explainers_lock = threading.Lock()
+        self._local = threading.local()
 
         # LLM (text-only, explanation only) - optional
-        self.llm = None
-        self.llm_disabled = False  # Track if LLM was disabled due to errors
-        if HAS_LANGCHAIN:
-            openai_key = os.getenv('OPENAI_API_KEY')
-            if openai_key:
-                try:
-                    self.llm = OpenAI(temperature=0.2, openai_api_key=openai_key)
-                except Exception as e:
-                    # Silently disable LLM if initialization fails
-                    self.llm = None
-                    self.llm_disabled = True
+        self._openai_key = os.getenv('OPENAI_API_KEY') if HAS_LANGCHAIN else None
+        self._llm_disabled = threading.Event()  # Set once if the LLM fails (quota, init errors)
+        if self._openai_key is None:
+            self._llm_disabled.set()
+
+    @contextmanager
+    def shap_explainer(self):
+        """A SHAP TreeExplainer over the shared forest, held by this caller until the block exits"""
+        with self._explainers_lock:
+            explainer = self._explainers.pop() if self._explainers else None
+        if explainer is None:
+            explainer = shap.TreeExplainer(self.rf_model)
+        try:
+            yield explainer
+        finally:
+            with self._explainers_lock:
+                self._explainers.append(explainer)
+
+    @property
+    def llm_disabled(self) -> bool:
+        return self._llm_disabled.is_set()
+
+    @property
+    def llm(self):
+        """Per-thread LLM client, or None when unavailable or disabled"""
+        if self._llm_disabled.is_set():
+            return None
+        client = getattr(self._local, "llm", None)
+        if client is None:
+            try:
+                client = OpenAI(temperature=0.2, openai_api_key=self._openai_key)
+            except Exception as e:
+                # Silently disable LLM if initialization fails
+                self._llm_disabled.set()
+                return None
+            self._local.llm = client
+        return client
 
 
 
@@ -208,33 +372,72 @@ class OncoAIMLAdapter(MLService):
 
 
 
+    def _build_treatment_inputs(self, patient_data: Dict) -> pd.DataFrame:
+
+        """One input row per treatment in TREATMENTS order"""
+
+        return pd.concat(
+
+            [self._build_input_df(patient_data, t) for t in TREATMENTS],
+
+            ignore_index=True
+
+        )
+
+
+
     # --------------------------------------------------
 
-    # SHAP explanation (ground truth reasoning)
+    # Response probabilities (batched)
 
     # --------------------------------------------------
 
-    def _get_shap_explanation(self, input_df: pd.DataFrame, top_k: int = 4) -> Dict:
+    def _predict_positive_proba(self, input_df: pd.DataFrame) -> np.ndarray:
 
-        X_trans = self.preprocessor.transform(input_df)
+        """Calibrated probability of favorable response for every row of input_df"""
+
+        if self.onnx_session is not None:
+
+            feed = {c: input_df[[c]].to_numpy(dtype=np.float64) for c in ONNX_NUMERIC_INPUTS}
+
+            feed["treatment_type"] = input_df[["treatment_type"]].to_numpy(dtype=object)
+
+            return self.onnx_session.run(["probabilities"], feed)[0][:, 1]
+
+        return self.calibrated_model.predict_proba(input_df)[:, 1]
+
+
+
+    # --------------------------------------------------
+
+    # SHAP explanation (ground truth reasoning)
+
+    # --------------------------------------------------
 
-        shap_values = self.shap_explainer.shap_values(X_trans)
+    def _positive_class_shap(self, X_trans):
 
+        """SHAP values for the positive class, shape (n_rows, n_features)"""
 
+        with self.shap_explainer() as explainer:
+            shap_values = explainer.shap_values(X_trans)
 
         # Normalize SHAP output across versions
 
         if isinstance(shap_values, list):
 
-            shap_vals = shap_values[1][0]
+            return shap_values[1]
+
+        if shap_values.ndim == 3:
+
+            return shap_values[:, :, 1]
 
-        else:
+        return shap_values
 
-            shap_vals = shap_values[0]
+    def _get_shap_explanation(self, input_df: pd.DataFrame, top_k: int = 4) -> Dict:
 
-            if shap_vals.ndim == 2:
+        X_trans = self.preprocessor.transform(input_df)
 
-                shap_vals = shap_vals[:, 1]
+        shap_vals = self._positive_class_shap(X_trans)[0]
 
 
 
@@ -358,15 +561,16 @@ Output:
 
 
 
-        if self.llm is not None and not self.llm_disabled:
+        llm = self.llm
+        if llm is not None:
             try:
-                return self.llm(prompt)
+                return llm(prompt)
             except Exception as e:
                 # Silently disable LLM after first failure (e.g., quota exceeded)
                 # This prevents repeated error messages
                 error_msg = str(e).lower()
                 if 'quota' in error_msg or 'rate limit' in error_msg or 'billing' in error_msg:
-                    self.llm_disabled = True
+                    self._llm_disabled.set()
                 # Fall through to fallback (no error printed - it's optional functionality)
         
         # Fallback explanation if LLM is not available
@@ -809,13 +1013,15 @@ Output:
 
     # --------------------------------------------------
 
-    def _predict_for_treatment(self, patient_data: Dict, treatment: str) -> Dict:
+    def _predict_for_treatment(self, patient_data: Dict, treatment: str, prob: Optional[float] = None) -> Dict:
 
         input_df = self._build_input_df(patient_data, treatment)
 
 
 
-        prob = float(self.calibrated_model.predict_proba(input_df)[0][1])
+        if prob is None:
+
+            prob = float(self._predict_positive_proba(input_df)[0])
 
         shap_data = self._get_shap_explanation(input_df)
 
@@ -869,17 +1075,61 @@ Output:
 
     def generate_treatment_recommendations(self, patient_data: Dict) -> Dict:
 
-        # Only use treatments that were in the training data
-        # Update this list if you retrain the model with additional treatment types
-        treatments = ["chemo", "targeted", "immuno"]
+        recs = self._rank_treatments(patient_data)
+
+        if self.shadow is not None:
+
+            # Enqueue only; the shadow model scores on its own worker thread
 
+            self.shadow.submit(
 
+                patient_data,
+
+                {t["treatment"]: t["response_probability"] for t in recs["treatments"]}
+
+            )
+
+        return recs
+
+
+
+    def _drift_features(self, patient_data: Dict) -> Dict:
+
+        return {
+
+            "age": patient_data["age"],
+
+            "cancer_stage": self._convert_stage_to_int(patient_data.get("stage", "II")),
+
+            "targetable_mutation": int(patient_data.get("targetable_mutation", False)),
+
+            "comorbidity_score": patient_data.get("comorbidity_score", 0.3)
+
+        }
+
+
+
+    def _rank_treatments(self, patient_data: Dict) -> Dict:
+
+        # The single scoring entry point, so the drift monitor sees every scored input once
+        if self.drift_monitor is not None:
+
+            self.drift_monitor.observe(self._drift_features(patient_data))
+
+        return self._score_treatments(patient_data)
+
+
+
+    def _score_treatments(self, patient_data: Dict) -> Dict:
+
+        # One batched model call for all treatments
+        probs = self._predict_positive_proba(self._build_treatment_inputs(patient_data))
 
         results = [
 
-            self._predict_for_treatment(patient_data, t)
+            self._predict_for_treatment(patient_data, t, float(p))
 
-            for t in treatments
+            for t, p in zip(TREATMENTS, probs)
 
         ]
 
@@ -915,9 +1165,14 @@ Output:
 
     def calculate_risk_score(self, patient_data: Dict) -> float:
 
-        recs = self.generate_treatment_recommendations(patient_data)
+        return self.risk_score_from_recommendations(self._rank_treatments(patient_data))
+
+
+
+    def risk_score_from_recommendations(self, recommendations: Dict) -> float:
 
-        best_prob = recs["treatments"][0]["response_probability"]
+        # Reuses a ranking that was already computed (and observed) for the input
+        best_prob = recommendations["treatments"][0]["response_probability"]
 
 
 
@@ -926,6 +1181,130 @@ Output:
         return round((1 - best_prob) * 100, 2)
 
 
+
+    # --------------------------------------------------
+
+    # Public API: cohort-level (global) explanation
+
+    # --------------------------------------------------
+
+    def get_global_shap_summary(self, patients: List[Dict]) -> Dict:
+
+        """
+        Mean |SHAP| per feature over a cohort sample.
+
+        Every patient is scored against every treatment and the whole batch is
+        explained with a single TreeSHAP call instead of one call per row.
+        """
+
+        if not patients:
+            return {"features": [], "sample_size": 0, "model_version": self.model_version,
+                    "generated_at": datetime.utcnow().isoformat()}
+
+        input_df = pd.concat(
+            [self._build_input_df(p, t) for p in patients for t in TREATMENTS],
+            ignore_index=True
+        )
+
+        X_trans = self.preprocessor.transform(input_df)
+        mean_abs = pd.Series(
+            abs(self._positive_class_shap(X_trans)).mean(axis=0),
+            index=self.preprocessor.get_feature_names_out()
+        ).sort_values(ascending=False)
+
+        return {
+            "features": [
+                {"feature": name, "mean_abs_shap": round(float(value), 4)}
+                for name, value in mean_abs.items()
+            ],
+            "sample_size": len(patients),
+            "model_version": self.model_version,
+            "generated_at": datetime.utcnow().isoformat()
+        }
+
+
+def recommendation_fingerprint(patient_data: Dict) -> str:
+    """Hash of the model inputs; stored recommendations are reused while it is unchanged"""
+    features = [
+        patient_data.get("age"),
+        patient_data.get("stage") or "II",
+        bool(patient_data.get("targetable_mutation", False)),
+        float(patient_data.get("comorbidity_score", 0.3)),
+    ]
+    return hashlib.sha256(json.dumps(features).encode()).hexdigest()[:16]
+
+
+def _file_digest(path: str) -> str:
+    """Short content hash used as the model version identifier"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class ShapSummaryCache:
+
+    """
+    TTL cache for cohort SHAP summaries keyed by (doctor_id, model_version, ...).
+
+    Stale entries keep being served while a single background thread
+    recomputes them, so only the very first view pays for the SHAP batch.
+    The key includes the client's sample_size, so the cache is an LRU
+    capped at max_entries.
+    """
+
+    def __init__(self, ttl_seconds: int = SHAP_SUMMARY_TTL_SECONDS,
+                 max_entries: int = SHAP_SUMMARY_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (summary, is_stale); summary is None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, True
+            self._entries.move_to_end(key)
+        stored_at, summary = entry
+        return summary, (time.monotonic() - stored_at) > self.ttl_seconds
+
+    def set(self, key, summary: Dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), summary)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def refresh_async(self, key, compute) -> bool:
+        """Recompute ``key`` on a daemon thread unless a refresh is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+
+        def _run():
+            try:
+                self.set(key, compute())
+            except Exception as e:
+                print(f"[ML] Background SHAP summary refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_run, daemon=True).start()
+        return True
+
+
+shap_summary_cache = ShapSummaryCache()
+
+
 # For backward compatibility, try to use OncoAIMLAdapter, fallback to base MLService
 try:
     ml_service = OncoAIMLAdapter()
@@ -0,0 +1,227 @@
+"""
+Streaming bulk export of a doctor's patients (GET /api/patients/export)
+
+Rows are read with yield_per, so the database driver hands them over in
+batches (a server-side cursor on Postgres) and only one batch is held at a
+time; each batch is encoded and yielded to the response before the next is
+fetched. Columns are selected directly (no ORM objects, so nothing collects
+in the session's identity map) and memory stays flat however large the
+panel is.
+
+Every format has the same fixed columns: the patient's own fields plus
+clinical_data flattened into clinical_* columns (genomics normalised like
+the side tables in genomics.py, lists joined with ';'). A fixed schema is
+what lets CSV write its header and Parquet its schema before the first row.
+Values of the wrong type in clinical_data export as empty. In CSV, text
+that a spreadsheet would run as a formula (starting with = + - @, tab or
+CR) is prefixed with a single quote.
+
+Formats:
+    ndjson   one JSON object per line
+    csv      header row, then one row per patient
+    parquet  one row group per batch; needs the pyarrow package
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from genomics import extract_genomics
+from json_provider import HAS_ORJSON
+
+if HAS_ORJSON:
+    import orjson
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+BATCH_SIZE = 1000
+
+INT, FLOAT, TEXT, BOOL, DATE, TIMESTAMP = 'int', 'float', 'text', 'bool', 'date', 'timestamp'
+
+# Patient columns exported as-is, in output order
+PATIENT_COLUMNS = (
+    ('id', INT), ('name', TEXT), ('age', INT), ('gender', TEXT), ('email', TEXT), ('phone', TEXT),
+    ('address', TEXT), ('status', TEXT), ('cancer_type', TEXT), ('cancer_subtype', TEXT), ('stage', TEXT),
+    ('diagnosis_date', DATE), ('risk_score', FLOAT), ('risk_level', TEXT),
+    ('created_at', TIMESTAMP), ('updated_at', TIMESTAMP),
+)
+
+# clinical_data keys (see clinical_data_helpers.generate_clinical_data) -> flat columns
+CLINICAL_PATHS = (
+    ('clinical_targetable_mutation', ('targetable_mutation',), BOOL),
+    ('clinical_comorbidity_score', ('comorbidity_score',), FLOAT),
+    ('clinical_grade', ('histopathology', 'grade'), TEXT),
+    ('clinical_ki67', ('histopathology', 'ki67'), FLOAT),
+    ('clinical_tumor_size_cm', ('histopathology', 'tumor_size_cm'), FLOAT),
+    ('clinical_lymph_nodes_involved', ('histopathology', 'lymph_nodes_involved'), INT),
+    ('clinical_height_cm', ('height_cm',), FLOAT),
+    ('clinical_weight_kg', ('weight_kg',), FLOAT),
+    ('clinical_smoker', ('smoker',), BOOL),
+    ('clinical_comorbidities', ('comorbidities',), TEXT),
+)
+GENOMIC_COLUMNS = (
+    ('clinical_mutations', TEXT), ('clinical_pd_l1', FLOAT), ('clinical_tmb', FLOAT), ('clinical_msi_status', TEXT),
+)
+
+COLUMNS = PATIENT_COLUMNS + tuple((name, kind) for name, _, kind in CLINICAL_PATHS) + GENOMIC_COLUMNS
+
+# format -> (mimetype, file extension)
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class ExportFormatError(ValueError):
+    pass
+
+
+def check_format(fmt):
+    if fmt not in FORMATS:
+        raise ExportFormatError(f"format must be one of: {', '.join(FORMATS)}")
+    if fmt == 'parquet' and not HAS_PYARROW:
+        raise ExportFormatError('parquet export needs the pyarrow package')
+    return fmt
+
+
+def _coerce(kind, value):
+    if value is None:
+        return None
+    if kind == TEXT:
+        if isinstance(value, list):
+            return ';'.join(str(v) for v in value if isinstance(v, (str, int, float)))
+        return value if isinstance(value, str) else None
+    if kind == BOOL:
+        return value if isinstance(value, bool) else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return int(value) if kind == INT else float(value)
+
+
+def _lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def flatten(row):
+    """Export record for a (patient columns..., clinical_data) row"""
+    record = dict(zip((name for name, _ in PATIENT_COLUMNS), row[:-1]))
+    clinical_data = row[-1] if isinstance(row[-1], dict) else {}
+    for name, path, kind in CLINICAL_PATHS:
+        record[name] = _coerce(kind, _lookup(clinical_data, path))
+    genes, markers = extract_genomics(clinical_data)
+    markers = markers or {}
+    record['clinical_mutations'] = ';'.join(genes) or None
+    record['clinical_pd_l1'] = markers.get('pd_l1')
+    record['clinical_tmb'] = markers.get('tmb')
+    record['clinical_msi_status'] = markers.get('msi_status')
+    return record
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _ndjson(batches):
+    for records in batches:
+        if HAS_ORJSON:
+            yield b''.join(orjson.dumps(r, default=_json_default) + b'\n' for r in records)
+        else:
+            yield ''.join(json.dumps(r, default=_json_default) + '\n' for r in records).encode()
+
+
+# Leading characters that make a spreadsheet treat a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv(batches):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow([name for name, _ in COLUMNS])
+    for records in batches:
+        writer.writerows([_csv_cell(r[name]) for name, _ in COLUMNS] for r in records)
+        yield out.getvalue().encode()
+        out.seek(0)
+        out.truncate()
+    if out.tell():
+        yield out.getvalue().encode()
+
+
+class _Drain:
+    """Write-only file for ParquetWriter whose contents are taken after each row group"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def _arrow_schema():
+    types = {INT: pa.int64(), FLOAT: pa.float64(), TEXT: pa.string(), BOOL: pa.bool_(),
+             DATE: pa.date32(), TIMESTAMP: pa.timestamp('us')}
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+def _parquet(batches):
+    schema = _arrow_schema()
+    sink = _Drain()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='snappy')
+    try:
+        for records in batches:
+            columns = {name: [r[name] for r in records] for name, _ in COLUMNS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def stream_export(fmt, result):
+    """Encoded chunks of ``result`` (a yield_per result of patient columns + clinical_data) in ``fmt``"""
+    batches = ([flatten(row) for row in rows] for rows in result.partitions())
+    encoder = {'ndjson': _ndjson, 'csv': _csv, 'parquet': _parquet}[fmt]
+    try:
+        yield from encoder(batches)
+    except Exception:
+        # Headers are already sent, so the client just sees a truncated file
+        import traceback
+        print(f"Error exporting patients: {traceback.format_exc()}")
+        raise
+    finally:
+        result.close()
@@ -0,0 +1,92 @@
+"""
+Name search index for the patients list (?q=)
+
+SQLite: an FTS5 table with the trigram tokenizer (patients_fts), stored as an
+external-content index over patients.name and kept current by triggers, so
+bulk writes and raw SQL are covered too. A LIKE '%term%' against it is
+answered from the trigram index instead of scanning names.
+
+PostgreSQL: a pg_trgm GIN index on patients.name, used by ILIKE '%term%'.
+
+Both give the same semantics as the old client-side filter: a
+case-insensitive substring match on the name. Terms shorter than a trigram,
+or containing LIKE wildcards, fall back to a plain LIKE on the doctor's
+patients (already narrowed by the doctor_id indexes).
+
+ensure_search_index() is idempotent and runs at startup next to
+db.create_all(); the migration creates the same objects on existing databases.
+"""
+
+from sqlalchemy import column, select, table, text
+
+FTS_TABLE = "patients_fts"
+TRGM_INDEX = "ix_patients_name_trgm"
+MIN_INDEXED_LENGTH = 3
+
+_SQLITE_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, content='patients', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS patients_fts_ai AFTER INSERT ON patients BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS patients_fts_ad AFTER DELETE ON patients BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS patients_fts_au AFTER UPDATE OF name ON patients BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+)
+
+_POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {TRGM_INDEX} ON patients USING gin (name gin_trgm_ops)",
+)
+
+_fts = table(FTS_TABLE, column("rowid"), column("name"))
+
+# dialect name -> whether the trigram index exists (set by ensure_search_index)
+_enabled = {}
+
+
+def is_search_object(name) -> bool:
+    """Schema objects managed here (kept out of alembic autogenerate)"""
+    return bool(name) and (name.startswith(FTS_TABLE) or name == TRGM_INDEX)
+
+
+def ensure_search_index(engine) -> bool:
+    """Create the name search index if missing; returns False if the database cannot build one"""
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as connection:
+            if dialect == "sqlite":
+                created = not connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+                ).first()
+                for statement in _SQLITE_DDL:
+                    connection.execute(text(statement))
+                if created:
+                    # Index the patients that existed before the table
+                    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            elif dialect == "postgresql":
+                for statement in _POSTGRES_DDL:
+                    connection.execute(text(statement))
+            else:
+                return False
+    except Exception as e:
+        print(f"Warning: name search index unavailable ({e}); ?q= falls back to a LIKE scan")
+        _enabled[dialect] = False
+        return False
+    _enabled[dialect] = True
+    return True
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def name_matches(model, term: str, dialect: str):
+    """Filter clause: ``model.name`` contains ``term`` (case-insensitive)"""
+    plain = not any(c in term for c in "%_\\")
+    if dialect == "sqlite" and _enabled.get(dialect) and plain and len(term) >= MIN_INDEXED_LENGTH:
+        # LIKE without ESCAPE is what the trigram tokenizer can answer from its index
+        return model.id.in_(select(_fts.c.rowid).where(_fts.c.name.like(f"%{term}%")))
+    return model.name.ilike(_like_pattern(term), escape="\\")
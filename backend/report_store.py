@@ -0,0 +1,166 @@
+"""
+Compressed, deduplicated storage of report bodies
+
+Report.report_data used to be a JSON column holding a full patient snapshot
+and recommendations per report, so the reports table grew with every
+generated report and the list endpoint shipped every body. Bodies now live
+in report_blobs:
+
+    content_hash  SHA-256 of the canonical JSON (sorted keys, no whitespace)
+    encoding      'zlib' or 'zstd'
+    size          uncompressed bytes
+    data          compressed JSON
+
+and reports.report_hash points at one. Reports with identical content (say,
+regenerated for an unchanged patient) share one row. Report.report_data is a
+property: setting it stages the blob on the instance, and a before_flush
+listener inserts it (if that hash is not stored yet) on the same connection
+as the report, so both commit or roll back together. Reading it fetches and
+decompresses the one blob, so only code that asks for a body pays for it.
+
+REPORT_COMPRESSION picks the codec for new blobs: zlib (default) or zstd,
+which needs the zstandard package. Either can be read back regardless.
+Blobs are not removed with their reports; `flask prune-report-blobs` drops
+the ones nothing references.
+"""
+
+import hashlib
+import json
+import zlib
+
+from sqlalchemy import event, exists, select
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+db = None
+Report = None
+ReportBlob = None
+compression = 'zlib'
+
+
+def init_report_store(db_instance, Report_model, ReportBlob_model, codec='zlib'):
+    """Register the blob-writing listener on the app's scoped session"""
+    global db, Report, ReportBlob, compression
+    db = db_instance
+    Report = Report_model
+    ReportBlob = ReportBlob_model
+    compression = _codec(codec)
+    event.listen(db.session, "before_flush", _before_flush)
+    event.listen(db.session, "after_commit", _after_commit)
+    event.listen(db.session, "after_rollback", _after_rollback)
+
+
+def _codec(codec):
+    if codec == 'zstd' and not HAS_ZSTD:
+        print("Warning: REPORT_COMPRESSION=zstd but zstandard is not installed; using zlib")
+        return 'zlib'
+    if codec not in ('zlib', 'zstd'):
+        print(f"Warning: Unknown REPORT_COMPRESSION '{codec}'; using zlib")
+        return 'zlib'
+    return codec
+
+
+def encode(data):
+    """Canonical JSON bytes of a report body and their SHA-256"""
+    raw = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+    return raw, hashlib.sha256(raw).hexdigest()
+
+
+def compress(raw, codec=None):
+    """(encoding, compressed bytes)"""
+    codec = codec or compression
+    if codec == 'zstd':
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return 'zlib', zlib.compress(raw, ZLIB_LEVEL)
+
+
+def decompress(encoding, data):
+    if encoding == 'zstd':
+        if not HAS_ZSTD:
+            raise RuntimeError('Report body is zstd-compressed but zstandard is not installed')
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def insert_blob(connection, content_hash, raw):
+    """Store a compressed body unless one with this hash already exists"""
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    encoding, data = compress(raw)
+    connection.execute(
+        insert(ReportBlob.__table__)
+        .values(content_hash=content_hash, encoding=encoding, size=len(raw), data=data)
+        .on_conflict_do_nothing(index_elements=['content_hash'])
+    )
+
+
+def set_body(report, data):
+    """Point ``report`` at the blob for ``data`` (written when the report is flushed)"""
+    if not data:
+        report.report_hash = None
+        report._report_body = (None, None)
+        report._pending_blob = None
+        return
+    raw, content_hash = encode(data)
+    report.report_hash = content_hash
+    report._report_body = (content_hash, data)
+    report._pending_blob = (content_hash, raw)
+
+
+def get_body(report):
+    """Decoded body of ``report`` (None if it has none); fetched once per instance"""
+    content_hash = report.report_hash
+    cached = getattr(report, '_report_body', None)
+    if cached is not None and cached[0] == content_hash:
+        return cached[1]
+    if content_hash is None:
+        return None
+    row = db.session.execute(
+        select(ReportBlob.encoding, ReportBlob.data).where(ReportBlob.content_hash == content_hash)
+    ).one_or_none()
+    body = json.loads(decompress(*row)) if row else None
+    report._report_body = (content_hash, body)
+    return body
+
+
+def _before_flush(session, flush_context, instances):
+    # Before the report rows, so their foreign key to report_blobs is satisfied
+    pending = [obj for obj in list(session.new) + list(session.dirty)
+               if isinstance(obj, Report) and getattr(obj, '_pending_blob', None)]
+    if not pending:
+        return
+    connection = session.connection()
+    for obj in pending:
+        insert_blob(connection, *obj._pending_blob)
+    # Kept staged until commit: after a rollback the report may be added and flushed again
+    session.info.setdefault("report_store_written", []).extend(pending)
+
+
+def _after_commit(session):
+    for obj in session.info.pop("report_store_written", ()):
+        obj._pending_blob = None
+
+
+def _after_rollback(session):
+    session.info.pop("report_store_written", None)
+
+
+def prune_report_blobs() -> int:
+    """Delete blobs no report points at; returns rows removed"""
+    result = db.session.execute(
+        ReportBlob.__table__.delete().where(
+            ~exists().where(Report.report_hash == ReportBlob.content_hash)
+        )
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,310 @@
+"""
+Per-doctor response cache with write-driven invalidation
+
+Every doctor has a change version that is bumped when a session commits a
+Patient/Report/Appointment write for that doctor. Cached responses are keyed
+by (namespace, version, doctor_id, *request params), so a bump makes all of
+that doctor's older entries unreachable without tracking which keys it
+touched. Entries also expire after a TTL because responses such as the
+dashboard timeline are relative to "now".
+
+The same version drives ETag/Last-Modified validators for polled GET
+endpoints (conditional_get), so an unchanged collection is answered with
+304 Not Modified before any query for it runs.
+
+Bulk Query.update()/delete() on those models do not say which doctors they
+touched, so they bump a global generation that is part of every version.
+
+Backends (CACHE_BACKEND):
+    memory - in-process LRU, one per worker (default)
+    redis  - shared by all workers; CACHE_REDIS_URL, needs the redis package
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import make_response, request
+from sqlalchemy import event, inspect
+from werkzeug.http import is_resource_modified
+
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 1024
+
+cache = None
+
+# models whose writes invalidate the owning doctor's cached responses
+_TRACKED = ()
+
+
+class MemoryBackend:
+
+    """In-process LRU with per-entry expiry and per-doctor version counters"""
+
+    # Other workers' writes are not seen here, so validators also expire with the TTL
+    shared = False
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._changed_at = {}
+        self._generation = 0
+        # Counters restart with the process; the start time keeps old versions from matching
+        self._started = time.time()
+        self._generation_at = self._started
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stamp(self, doctor_id):
+        """(version, last change as a unix time)"""
+        with self._lock:
+            version = f"{int(self._started)}.{self._generation}.{self._versions.get(doctor_id, 0)}"
+            return version, max(self._changed_at.get(doctor_id, self._started), self._generation_at)
+
+    def bump(self, doctor_ids=(), everyone: bool = False):
+        now = time.time()
+        with self._lock:
+            for doctor_id in doctor_ids:
+                self._versions[doctor_id] = self._versions.get(doctor_id, 0) + 1
+                self._changed_at[doctor_id] = now
+            if everyone:
+                self._generation += 1
+                self._generation_at = now
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+
+    """Shared backend: values as JSON with SETEX, versions as INCR counters"""
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "oncoai:cache"):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, key) -> str:
+        return f"{self.prefix}:{':'.join(str(part) for part in key)}"
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl_seconds: int):
+        self.client.setex(self._key(key), ttl_seconds, json.dumps(value))
+
+    def stamp(self, doctor_id):
+        """(version, last change as a unix time or None if no change was recorded)"""
+        generation, version, generation_at, changed_at = self.client.mget(
+            f"{self.prefix}:generation", f"{self.prefix}:version:{doctor_id}",
+            f"{self.prefix}:generation_at", f"{self.prefix}:changed_at:{doctor_id}",
+        )
+        times = [float(t) for t in (generation_at, changed_at) if t is not None]
+        return f"{int(generation or 0)}.{int(version or 0)}", max(times) if times else None
+
+    def bump(self, doctor_ids=(), everyone: bool = False):
+        now = time.time()
+        pipe = self.client.pipeline()
+        for doctor_id in doctor_ids:
+            pipe.incr(f"{self.prefix}:version:{doctor_id}")
+            pipe.set(f"{self.prefix}:changed_at:{doctor_id}", now)
+        if everyone:
+            pipe.incr(f"{self.prefix}:generation")
+            pipe.set(f"{self.prefix}:generation_at", now)
+        pipe.execute()
+
+
+class ResponseCache:
+
+    """
+    Versioned cache front end. Backend errors are logged and treated as a
+    miss so an unavailable shared store never fails a request.
+    """
+
+    def __init__(self, backend, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    def _stamp(self, doctor_id):
+        try:
+            return self.backend.stamp(doctor_id)
+        except Exception as e:
+            print(f"[Cache] Version lookup failed: {e}")
+            return None, None
+
+    def version(self, doctor_id):
+        """Current change version for ``doctor_id`` (None if the backend is unavailable)"""
+        return self._stamp(doctor_id)[0]
+
+    def validators(self, doctor_id, *parts):
+        """(etag, last_modified) for a response derived from ``doctor_id``'s data, or None"""
+        version, changed_at = self._stamp(doctor_id)
+        if version is None:
+            return None
+        if not self.backend.shared:
+            parts = (*parts, int(time.time() // max(self.ttl_seconds, 1)))
+        raw = ":".join(str(part) for part in (version, doctor_id, *parts))
+        etag = hashlib.sha1(raw.encode()).hexdigest()[:20]
+        last_modified = datetime.fromtimestamp(changed_at, timezone.utc) if changed_at else None
+        return etag, last_modified
+
+    def key(self, namespace: str, doctor_id, *params):
+        """
+        Cache key for a response; read it before computing the response so a
+        write that lands meanwhile leaves the stored entry unreachable.
+        """
+        version = self.version(doctor_id)
+        if version is None:
+            return None
+        return (namespace, version, doctor_id, *params)
+
+    def get(self, key):
+        if key is None:
+            return None
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            print(f"[Cache] Get failed: {e}")
+            return None
+
+    def set(self, key, value):
+        if key is None:
+            return
+        try:
+            self.backend.set(key, value, self.ttl_seconds)
+        except Exception as e:
+            print(f"[Cache] Set failed: {e}")
+
+    def invalidate(self, doctor_ids=(), everyone: bool = False):
+        try:
+            self.backend.bump(doctor_ids, everyone)
+        except Exception as e:
+            print(f"[Cache] Invalidation failed: {e}")
+
+
+def not_modified_response(validators):
+    """A 304 response if the request's If-None-Match/If-Modified-Since match ``validators``"""
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return add_validators(make_response("", 304), validators)
+
+
+def add_validators(response, validators):
+    """Attach ETag/Last-Modified to a 200/304 response; clients must revalidate before reuse"""
+    if validators is not None and response.status_code in (200, 304):
+        etag, last_modified = validators
+        response.set_etag(etag, weak=True)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional_get(f=None, *, extra=None):
+    """
+    Conditional GET for views taking ``current_user`` (place under the auth
+    decorator). Validators come from the doctor's change version and the
+    request path + query, so a matching request gets 304 without running the view.
+    ``extra()`` adds state the response depends on beyond the doctor's rows,
+    e.g. ``@conditional_get(extra=lambda: (ml_service.model_version,))``.
+    """
+    if f is None:
+        return lambda view: conditional_get(view, extra=extra)
+
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        parts = (request.full_path, *(extra() if extra else ()))
+        validators = cache.validators(current_user.id, *parts) if cache is not None else None
+        not_modified = not_modified_response(validators)
+        if not_modified is not None:
+            return not_modified
+        return add_validators(make_response(f(current_user, *args, **kwargs)), validators)
+    return decorated
+
+
+def _changed_doctors(session):
+    return session.info.setdefault("response_cache_doctors", set())
+
+
+def _after_flush(session, flush_context):
+    changed = _changed_doctors(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, _TRACKED):
+            changed.add(obj.doctor_id)
+            # A reassigned row invalidates the previous owner too
+            changed.update(inspect(obj).attrs.doctor_id.history.deleted or ())
+
+
+def _do_orm_execute(state):
+    if (state.is_update or state.is_delete) and state.bind_mapper is not None \
+            and issubclass(state.bind_mapper.class_, _TRACKED):
+        state.session.info["response_cache_everyone"] = True
+
+
+def _after_commit(session):
+    changed = session.info.pop("response_cache_doctors", set())
+    everyone = session.info.pop("response_cache_everyone", False)
+    changed.discard(None)
+    if cache is not None and (changed or everyone):
+        cache.invalidate(changed, everyone)
+
+
+def _after_rollback(session):
+    session.info.pop("response_cache_doctors", None)
+    session.info.pop("response_cache_everyone", None)
+
+
+def init_response_cache(app, db_instance, tracked_models) -> ResponseCache:
+    """Build the backend named by app.config['CACHE_BACKEND'] and hook invalidation into db.session"""
+    global cache, _TRACKED
+    backend_name = app.config.get("CACHE_BACKEND", "memory")
+    backend = None
+    if backend_name == "redis":
+        if HAS_REDIS:
+            backend = RedisBackend(app.config.get("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+        else:
+            print("Warning: CACHE_BACKEND=redis but redis is not installed; using the in-process cache")
+    if backend is None:
+        backend = MemoryBackend(int(app.config.get("CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)))
+
+    cache = ResponseCache(backend, int(app.config.get("DASHBOARD_CACHE_TTL", DEFAULT_TTL_SECONDS)))
+    _TRACKED = tuple(tracked_models)
+    event.listen(db_instance.session, "after_flush", _after_flush)
+    event.listen(db_instance.session, "do_orm_execute", _do_orm_execute)
+    event.listen(db_instance.session, "after_commit", _after_commit)
+    event.listen(db_instance.session, "after_rollback", _after_rollback)
+    return cache
@@ -0,0 +1,185 @@
+"""
+Per-doctor, per-day dashboard rollups
+
+DoctorDailyStats holds one row per (doctor, day) with the counts the dashboard
+charts need: patients by diagnosis date (and how many of them are high risk)
+and reports by generation date. A before_flush listener on db.session turns
+every Patient/Report insert, update and delete into +/-1 deltas and applies
+them with an upsert on the same connection, so the rollup commits (or rolls
+back) together with the write that caused it.
+
+Bulk Query.update()/delete() bypass the listener; run `flask backfill-rollups`
+after those (or after importing data) to rebuild the table from the source rows.
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import case, event, func, inspect, literal, select, union_all
+
+COUNT_COLUMNS = ("new_patients", "high_risk_patients", "reports_generated")
+
+db = None
+Patient = None
+Report = None
+DoctorDailyStats = None
+
+# model -> columns whose values decide which rollup row(s) an instance counts towards
+_TRACKED = {}
+
+
+def init_rollups(db_instance, Patient_model, Report_model, DoctorDailyStats_model):
+    """Register the rollup maintenance listener on the app's scoped session"""
+    global db, Patient, Report, DoctorDailyStats
+    db = db_instance
+    Patient = Patient_model
+    Report = Report_model
+    DoctorDailyStats = DoctorDailyStats_model
+
+    _TRACKED.clear()
+    _TRACKED[Patient] = ("doctor_id", "diagnosis_date", "risk_level")
+    _TRACKED[Report] = ("doctor_id", "generated_at")
+    event.listen(db.session, "before_flush", _before_flush)
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def _contribution(model, values):
+    """Rollup key and counts one row of `model` contributes (None if it counts nowhere)"""
+    if model is Patient:
+        doctor_id, diagnosis_date, risk_level = values
+        if doctor_id is None or diagnosis_date is None:
+            return None
+        return (doctor_id, _as_date(diagnosis_date)), {
+            "new_patients": 1,
+            "high_risk_patients": int(risk_level == "high"),
+        }
+    doctor_id, generated_at = values
+    if doctor_id is None or generated_at is None:
+        return None
+    return (doctor_id, _as_date(generated_at)), {"reports_generated": 1}
+
+
+def _add(deltas, model, values, sign):
+    contribution = _contribution(model, values)
+    if contribution:
+        key, counts = contribution
+        for column, n in counts.items():
+            deltas[key][column] += sign * n
+
+
+def _before_flush(session, flush_context, instances):
+    deltas = defaultdict(Counter)
+    previous = defaultdict(list)  # model -> persistent instances whose stored contribution must be removed
+
+    for obj in session.new:
+        model = type(obj)
+        if model not in _TRACKED:
+            continue
+        if model is Report and obj.generated_at is None:
+            # Apply the column default now so the rollup day matches the stored row
+            obj.generated_at = datetime.utcnow()
+        _add(deltas, model, [getattr(obj, c) for c in _TRACKED[model]], +1)
+
+    for obj in session.dirty:
+        model = type(obj)
+        if model not in _TRACKED:
+            continue
+        state = inspect(obj)
+        if any(state.attrs[c].history.has_changes() for c in _TRACKED[model]):
+            previous[model].append(obj)
+            _add(deltas, model, [getattr(obj, c) for c in _TRACKED[model]], +1)
+
+    for obj in session.deleted:
+        if type(obj) in _TRACKED:
+            previous[type(obj)].append(obj)
+
+    # Stored values are read back from the database: in-memory history does not
+    # always hold the old value (e.g. attributes expired by a commit and then set)
+    with session.no_autoflush:
+        connection = session.connection()
+        for model, objs in previous.items():
+            columns = [getattr(model, c) for c in _TRACKED[model]]
+            rows = connection.execute(select(*columns).where(model.id.in_([o.id for o in objs])))
+            for row in rows:
+                _add(deltas, model, list(row), -1)
+
+        for (doctor_id, day), counts in deltas.items():
+            if any(counts.values()):
+                _upsert(connection, doctor_id, day, counts)
+
+
+def _upsert(connection, doctor_id, day, counts):
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = DoctorDailyStats.__table__
+    stmt = insert(table).values(
+        doctor_id=doctor_id, day=day, **{c: counts.get(c, 0) for c in COUNT_COLUMNS}
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["doctor_id", "day"],
+        set_={c: table.c[c] + stmt.excluded[c] for c in COUNT_COLUMNS},
+    )
+    connection.execute(stmt)
+
+
+def _source_counts(doctor_id=None):
+    """(doctor_id, day, new_patients, high_risk_patients, reports_generated) recomputed from the source tables"""
+    patients = select(
+        Patient.doctor_id.label("doctor_id"),
+        Patient.diagnosis_date.label("day"),
+        literal(1).label("new_patients"),
+        case((Patient.risk_level == "high", 1), else_=0).label("high_risk_patients"),
+        literal(0).label("reports_generated"),
+    ).where(Patient.diagnosis_date.isnot(None))
+    reports = select(
+        Report.doctor_id.label("doctor_id"),
+        func.date(Report.generated_at).label("day"),
+        literal(0).label("new_patients"),
+        literal(0).label("high_risk_patients"),
+        literal(1).label("reports_generated"),
+    ).where(Report.generated_at.isnot(None))
+    if doctor_id is not None:
+        patients = patients.where(Patient.doctor_id == doctor_id)
+        reports = reports.where(Report.doctor_id == doctor_id)
+
+    source = union_all(patients, reports).subquery()
+    return select(
+        source.c.doctor_id,
+        source.c.day,
+        func.sum(source.c.new_patients),
+        func.sum(source.c.high_risk_patients),
+        func.sum(source.c.reports_generated),
+    ).group_by(source.c.doctor_id, source.c.day)
+
+
+def backfill_rollups(doctor_id=None) -> int:
+    """Rebuild DoctorDailyStats (for one doctor or everyone); returns the number of rows written"""
+    rows = [
+        {
+            "doctor_id": row[0],
+            "day": _as_date(row[1]),
+            "new_patients": row[2],
+            "high_risk_patients": row[3],
+            "reports_generated": row[4],
+        }
+        for row in db.session.execute(_source_counts(doctor_id))
+    ]
+
+    delete = DoctorDailyStats.__table__.delete()
+    if doctor_id is not None:
+        delete = delete.where(DoctorDailyStats.doctor_id == doctor_id)
+    db.session.execute(delete)
+    if rows:
+        db.session.execute(DoctorDailyStats.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
@@ -1,11 +1,28 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, send_file, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from ml_service import ml_service
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload, load_only
+from ml_service import ml_service, shap_summary_cache, recommendation_fingerprint, SHAP_SUMMARY_SAMPLE_SIZE
+from response_cache import conditional_get
+import delta_sync
+import events
+from events import publish
+from delta_sync import InvalidSinceError, SyncExpiredError
+import patient_search
+import genomics
+import cohort_query
+from cohort_query import CohortQueryError
+import avatar_store
+from avatar_store import AvatarError
+import patient_export
+from patient_export import ExportFormatError
 import json
+import math
 from datetime import datetime, timedelta
 from functools import wraps
 import jwt
 import os
+import base64
 
 # These will be imported from app after it's initialized
 # We use a function to get them to avoid circular imports
@@ -25,6 +42,253 @@ def init_routes(db_instance, User_model, Patient_model, Appointment_model, Repor
     Report = Report_model
     Outcome = Outcome_model
 
+def _model_input(age, stage, clinical_data):
+    """Map stored patient fields to the ML model's expected input format.
+
+    The model expects: age, stage, targetable_mutation, comorbidity_score
+    """
+    if not isinstance(clinical_data, dict):
+        clinical_data = {}
+    return {
+        'age': age,
+        'stage': stage or 'II',  # Default to stage II if not set
+        'targetable_mutation': clinical_data.get('targetable_mutation', False),
+        'comorbidity_score': _comorbidity_score(clinical_data.get('comorbidity_score'))
+    }
+
+def _comorbidity_score(value, default=0.3):
+    """Stored comorbidity score as a float; null or non-numeric values get the default"""
+    if isinstance(value, bool):
+        return default
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return default
+    return score if math.isfinite(score) else default
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def _encode_cursor(*key):
+    """Opaque keyset cursor for the row after which the next page starts"""
+    return base64.urlsafe_b64encode(json.dumps(list(key), default=str).encode()).decode().rstrip('=')
+
+class InvalidCursorError(ValueError):
+    pass
+
+def _decode_cursor(cursor, column=None):
+    """[last_id], or [sort value, last_id] when ordered by `column`"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if column is None:
+            last_id, = key
+            return int(last_id)
+        value, last_id = key
+        if value is not None:
+            python_type = column.type.python_type
+            value = python_type.fromisoformat(value) if hasattr(python_type, 'fromisoformat') else python_type(value)
+        return value, int(last_id)
+    except (ValueError, TypeError):
+        raise InvalidCursorError('Invalid cursor')
+
+class InvalidFilterError(ValueError):
+    pass
+
+def _parse_sort(model, sort, allowed):
+    """'<column>' / '-<column>' (descending) into (column, descending); None when not given"""
+    if not sort:
+        return None
+    if not isinstance(sort, str):
+        raise InvalidFilterError('sort must be a column name')
+    name = sort[1:] if sort.startswith('-') else sort
+    if name not in allowed:
+        raise InvalidFilterError(f"Unknown sort key: {sort} (use one of {', '.join(allowed)})")
+    return getattr(model, name), sort.startswith('-')
+
+def _sort_param(model, allowed):
+    """Parse ?sort=<column> / ?sort=-<column> into (column, descending), or None"""
+    return _parse_sort(model, request.args.get('sort'), allowed)
+
+def _sort_order(model, column, descending):
+    """ORDER BY for a keyset on (column, id); NULLs sort last either way"""
+    direction = (lambda c: c.desc()) if descending else (lambda c: c.asc())
+    order = [direction(column), direction(model.id)]
+    if model.__table__.c[column.key].nullable:
+        order.insert(0, column.is_(None))
+    return order
+
+def _after_key(model, column, descending, key):
+    """Rows that sort after `key` = (value, id) under _sort_order"""
+    value, last_id = key
+    later = (lambda c, v: c < v) if descending else (lambda c, v: c > v)
+    if value is None:
+        return and_(column.is_(None), later(model.id, last_id))
+    condition = or_(later(column, value), and_(column == value, later(model.id, last_id)))
+    if model.__table__.c[column.key].nullable:
+        condition = or_(column.is_(None), condition)
+    return condition
+
+def _paginate(query, model, sort=None):
+    """Apply ?limit=&cursor= keyset pagination (ordered by id, or by `sort`).
+
+    `sort` is (column, descending) from _sort_param; the cursor then holds
+    the sort value as well as the id. Returns (rows, next_cursor, paginated).
+    Without ?limit= or ?cursor= the full result is returned so existing
+    clients keep working.
+    """
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is None and not cursor:
+        if sort is not None:
+            query = query.order_by(*_order_for(model, sort))
+        return query.all(), None, False
+    rows, next_cursor = _keyset_page(query, model, sort, limit, cursor)
+    return rows, next_cursor, True
+
+def _order_for(model, sort):
+    column, descending = sort
+    if column is model.id:
+        return [model.id.desc() if descending else model.id]
+    return _sort_order(model, column, descending)
+
+def _keyset_page(query, model, sort, limit, cursor):
+    """One page of `query` in `sort` order (id by default) after `cursor`; returns (rows, next_cursor)"""
+    column, descending = sort or (model.id, False)
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    query = query.order_by(*_order_for(model, (column, descending)))
+    if cursor and column is model.id:
+        last_id = _decode_cursor(cursor)
+        query = query.filter(model.id < last_id if descending else model.id > last_id)
+    elif cursor:
+        query = query.filter(_after_key(model, column, descending, _decode_cursor(cursor, column)))
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = _encode_cursor(last.id) if column is model.id else _encode_cursor(getattr(last, column.key), last.id)
+    return rows[:limit], next_cursor
+
+class InvalidFieldsError(ValueError):
+    pass
+
+def _requested_fields(model):
+    """Parse ?fields=a,b or ?view=summary into a tuple of model.FIELDS (None = everything)"""
+    if request.args.get('view') == 'summary':
+        return model.SUMMARY_FIELDS
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return _parse_fields(model, fields.split(','))
+
+def _parse_fields(model, names):
+    """Validate field names (a list, or a comma-separated string as in ?fields=) against model.FIELDS"""
+    if isinstance(names, str):
+        names = names.split(',')
+    if not isinstance(names, list) or not all(isinstance(f, str) for f in names):
+        raise InvalidFieldsError('fields must be field names')
+    requested = tuple(dict.fromkeys(f.strip() for f in names if f.strip()))
+    unknown = [f for f in requested if f not in model.FIELDS]
+    if unknown or not requested:
+        raise InvalidFieldsError(f"Unknown fields: {', '.join(unknown) or ','.join(names)}")
+    return requested
+
+def _project(query, model, fields):
+    """Load only the columns behind `fields` (the primary key is always loaded)"""
+    if fields is None:
+        return query
+    return query.options(load_only(*[getattr(model, f) for f in fields]))
+
+def _page_response(key, rows, next_cursor, paginated, fields=None):
+    body = {key: [r.to_dict(fields) if fields else r.to_dict() for r in rows]}
+    if paginated:
+        body['next_cursor'] = next_cursor
+    return body
+
+PATIENT_SORT_KEYS = ('id', 'name', 'age', 'risk_score', 'diagnosis_date', 'updated_at')
+PATIENT_FILTERS = ('risk_level', 'cancer_type', 'stage', 'status')
+# Answered from the indexed genomics tables (genomics.py) instead of clinical_data
+GENOMIC_FILTERS = {
+    'mutation': genomics.patients_with_mutation,
+    'msi_status': genomics.patients_with_msi_status,
+}
+
+def _patient_filters():
+    """True if the request narrows the patients list (?q=, ?min_age=, or a PATIENT_FILTERS param)"""
+    return any(request.args.get(name) for name in PATIENT_FILTERS + tuple(GENOMIC_FILTERS) + ('min_age', 'max_age', 'q'))
+
+def _age_param(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidFilterError(f"{name} must be an integer")
+
+def _list_param(name):
+    return [v.strip() for v in request.args.get(name, '').split(',') if v.strip()]
+
+def _filter_patients(query, doctor_id):
+    """Apply the patients list filters in SQL.
+
+    ?risk_level=, ?cancer_type=, ?stage=, ?status= match exactly (a
+    comma-separated list matches any of its values), ?min_age=/?max_age= are
+    inclusive and ?q= matches names containing the text, ignoring case.
+    ?mutation=EGFR,ALK and ?msi_status=MSI-H match genomics, ignoring case.
+    """
+    for name in PATIENT_FILTERS:
+        values = _list_param(name)
+        if name == 'risk_level':
+            values = [v.lower() for v in values]
+        if values:
+            column = getattr(Patient, name)
+            query = query.filter(column == values[0] if len(values) == 1 else column.in_(values))
+    for name, matching in GENOMIC_FILTERS.items():
+        values = _list_param(name)
+        if values:
+            query = query.filter(Patient.id.in_(matching(doctor_id, values)))
+    min_age, max_age = _age_param('min_age'), _age_param('max_age')
+    if min_age is not None:
+        query = query.filter(Patient.age >= min_age)
+    if max_age is not None:
+        query = query.filter(Patient.age <= max_age)
+    term = request.args.get('q', '').strip()
+    if term:
+        query = query.filter(patient_search.name_matches(Patient, term, db.engine.dialect.name))
+    return query
+
+def _recommendations_current(stored, fingerprint):
+    """Stored recommendations were computed from these inputs by the loaded model"""
+    return bool(
+        stored.get('treatments')
+        and stored.get('input_fingerprint') == fingerprint
+        and stored.get('model_version') == ml_service.model_version
+    )
+
+def _sync_window():
+    """(since, sync_token) for ?since= delta sync; since is None for a full list"""
+    token = delta_sync.sync_token()
+    return delta_sync.parse_since(request.args.get('since')), token
+
+def _sync_query(query, model, since):
+    """Only rows created or updated after `since` (everything when it is None)"""
+    return query if since is None else delta_sync.changed_since(query, model, since)
+
+def _with_sync(body, rows, model, doctor_id, since, token, patient_id=None):
+    """Add sync_token, and on the first page of a delta the ids deleted since `since`"""
+    body['sync_token'] = token
+    if since is not None and not request.args.get('cursor'):
+        # An id can be deleted and reused (SQLite); the live row wins. Ids come from
+        # the rows, since a ?fields= projection may leave them out of the body.
+        changed = {row.id for row in rows}
+        deleted = delta_sync.deleted_since(model.__tablename__, doctor_id, since, patient_id)
+        body['deleted'] = [record_id for record_id in deleted if record_id not in changed]
+    return body
+
+def _sync_error(e):
+    return jsonify({'message': str(e)}), 410 if isinstance(e, SyncExpiredError) else 400
+
 # Authentication decorator
 def token_required(f):
     @wraps(f)
@@ -109,6 +373,38 @@ def optional_auth(f):
         return f(current_user, *args, **kwargs)
     return decorated
 
+# Stream tokens carry this audience: the session decoders reject them, and the
+# stream decoder rejects session tokens (they have no audience)
+EVENTS_TOKEN_AUDIENCE = 'events'
+EVENTS_TOKEN_SECONDS = 120
+
+def stream_auth(f):
+    """Auth for EventSource streams, which cannot set headers
+
+    Browsers pass ?stream_token= from POST /api/events/token, a short-lived JWT
+    valid only for the stream, so the session JWT never goes in a URL (and
+    into access logs or history). Without one this is optional_auth.
+    """
+    optional = optional_auth(f)
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if 'access_token' in request.args:
+            return jsonify({'message': 'Session tokens are not accepted in the URL; use POST /api/events/token'}), 400
+        token = request.args.get('stream_token')
+        if token is None:
+            return optional(*args, **kwargs)
+        try:
+            data = jwt.decode(token, current_app.config.get('SECRET_KEY', os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')), algorithms=['HS256'], audience=EVENTS_TOKEN_AUDIENCE)
+            current_user = User.query.get(data['user_id'])
+        except jwt.InvalidTokenError:
+            current_user = None
+        if not current_user:
+            # EventSource closes on a non-200 response; the client then asks for a new token
+            return jsonify({'message': 'Stream token is invalid or expired'}), 401
+        return f(current_user, *args, **kwargs)
+    return decorated
+
 # Auth Blueprint
 auth_bp = Blueprint('auth', __name__)
 
@@ -229,16 +525,71 @@ patients_bp = Blueprint('patients', __name__)
 
 @patients_bp.route('', methods=['GET'])
 @optional_auth
+@conditional_get
 def get_patients(current_user):
-    """Get all patients for the current user"""
+    """Get patients for the current user (all, or one page with ?limit=&cursor=)
+
+    ?fields=id,name,... or ?view=summary selects only those columns in SQL and
+    skips decoding the JSON columns that were not asked for. ?since=<sync_token>
+    returns only patients changed since then plus `deleted` ids.
+
+    Filtering (see _filter_patients) and ?sort=name|-risk_score|... run in SQL,
+    so a filtered page never loads the rest of the panel; ?count=true adds the
+    number of matching patients as `total`.
+    """
     try:
-        patients = Patient.query.filter_by(doctor_id=current_user.id).all()
-        return jsonify({
-            'patients': [p.to_dict() for p in patients]
-        }), 200
+        fields = _requested_fields(Patient)
+        sort = _sort_param(Patient, PATIENT_SORT_KEYS)
+        since, token = _sync_window()
+        if since is not None and _patient_filters():
+            # A row edited out of the filter would be neither changed nor deleted
+            raise InvalidFilterError('since cannot be combined with filters')
+        query = _filter_patients(Patient.query.filter_by(doctor_id=current_user.id), current_user.id)
+        total = query.count() if request.args.get('count') == 'true' else None
+        query = _sync_query(query, Patient, since)
+        # The sort column is needed for the next cursor even when not requested
+        loaded = fields + (sort[0].key,) if fields and sort else fields
+        query = _project(query, Patient, loaded)
+        patients, next_cursor, paginated = _paginate(query, Patient, sort)
+        body = _page_response('patients', patients, next_cursor, paginated, fields)
+        if total is not None:
+            body['total'] = total
+        return jsonify(_with_sync(body, patients, Patient, current_user.id, since, token)), 200
+    except (InvalidCursorError, InvalidFieldsError, InvalidFilterError) as e:
+        return jsonify({'message': str(e)}), 400
+    except (InvalidSinceError, SyncExpiredError) as e:
+        return _sync_error(e)
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+@patients_bp.route('/export', methods=['GET'])
+@optional_auth
+def export_patients(current_user):
+    """Stream the current doctor's patients as ?format=ndjson|csv|parquet
+
+    Takes the same filters as the list (see _filter_patients). Rows are
+    fetched in batches and written out as they come, in id order, with
+    clinical_data flattened into clinical_* columns (see patient_export).
+    """
+    try:
+        fmt = patient_export.check_format(request.args.get('format', 'ndjson'))
+        query = _filter_patients(Patient.query.filter_by(doctor_id=current_user.id), current_user.id)
+        columns = [getattr(Patient, name) for name, _ in patient_export.PATIENT_COLUMNS] + [Patient.clinical_data]
+        statement = query.with_entities(*columns).order_by(Patient.id).statement
+        result = db.session.execute(statement.execution_options(yield_per=patient_export.BATCH_SIZE))
+    except (ExportFormatError, InvalidFilterError) as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+    mimetype, extension = patient_export.FORMATS[fmt]
+    filename = f"patients-{datetime.utcnow():%Y%m%d}.{extension}"
+    return Response(stream_with_context(patient_export.stream_export(fmt, result)), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',  # no proxy buffering (nginx)
+    })
+
 @patients_bp.route('/<int:patient_id>', methods=['GET'])
 @optional_auth
 def get_patient(current_user, patient_id):
@@ -251,6 +602,50 @@ def get_patient(current_user, patient_id):
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+@patients_bp.route('/<int:patient_id>/bundle', methods=['GET'])
+@optional_auth
+def get_patient_bundle(current_user, patient_id):
+    """Everything the patient detail view shows, in one response
+
+    Three queries after auth: the patient, their appointments and their
+    outcomes (comparisons are derived from the outcomes). Recommendations are
+    the stored copy; `recommendations_stale` says whether GET
+    /api/recommendations/patient/<id> would recompute them.
+    """
+    try:
+        patient = Patient.query.filter_by(id=patient_id, doctor_id=current_user.id).first()
+        if not patient:
+            return jsonify({'message': 'Patient not found'}), 404
+        
+        # patient_name in to_dict() resolves from the identity map, no extra query
+        appointments = (
+            Appointment.query
+            .filter_by(patient_id=patient_id, doctor_id=current_user.id)
+            .order_by(Appointment.appointment_date)
+            .all()
+        )
+        outcomes = Outcome.query.filter_by(patient_id=patient_id).order_by(Outcome.created_at.desc()).all()
+        
+        recommendations = patient.get_ml_recommendations()
+        patient_data = _model_input(patient.age, patient.stage, patient.get_clinical_data())
+        # Only a hint for the client; a bad optional field must not fail the patient payload
+        try:
+            stale = not _recommendations_current(recommendations, recommendation_fingerprint(patient_data))
+        except Exception as e:
+            print(f"Could not check recommendations for patient {patient_id}: {e}")
+            stale = True
+        
+        return jsonify({
+            'patient': patient.to_dict(),
+            'appointments': [a.to_dict() for a in appointments],
+            'outcomes': [o.to_dict() for o in outcomes],
+            'comparisons': [_outcome_comparison(o) for o in outcomes],
+            'recommendations': recommendations,
+            'recommendations_stale': stale,
+        }), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
 @patients_bp.route('', methods=['POST'])
 @optional_auth
 def create_patient(current_user):
@@ -269,13 +664,7 @@ def create_patient(current_user):
             return jsonify({'message': 'Stage is required'}), 400
         
         # Calculate risk score using ML service
-        patient_data = {
-            'age': data.get('age', 50),
-            'gender': data.get('gender', ''),
-            'cancer_type': data.get('cancer_type', ''),
-            'stage': data.get('stage', ''),
-            'clinical_data': data.get('clinical_data', {})
-        }
+        patient_data = _model_input(data.get('age', 50), data.get('stage'), data.get('clinical_data'))
         
         risk_score = ml_service.calculate_risk_score(patient_data)
         
@@ -303,17 +692,22 @@ def create_patient(current_user):
             diagnosis_date=diagnosis_date,
             doctor_id=current_user.id,
             risk_score=risk_score,
-            clinical_data=json.dumps(data.get('clinical_data', {})) if data.get('clinical_data') is not None else None
+            clinical_data=data.get('clinical_data'),
+            avatar_url=avatar_store.normalize_avatar_url(data.get('avatar_url'))
         )
         patient.calculate_risk_level()
         
         db.session.add(patient)
         db.session.commit()
+        publish(current_user.id, 'patient.created', id=patient.id)
         
         return jsonify({
             'message': 'Patient created successfully',
             'patient': patient.to_dict()
         }), 201
+    except AvatarError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
     except ValueError as e:
         db.session.rollback()
         return jsonify({'message': f'Invalid data format: {str(e)}'}), 400
@@ -345,7 +739,7 @@ def update_patient(current_user, patient_id):
         if 'cancer_subtype' in data: patient.cancer_subtype = data['cancer_subtype']
         if 'stage' in data: patient.stage = data['stage']
         if 'status' in data: patient.status = data['status']
-        if 'avatar_url' in data: patient.avatar_url = data['avatar_url']
+        if 'avatar_url' in data: patient.avatar_url = avatar_store.normalize_avatar_url(data['avatar_url'])
         
         if 'diagnosis_date' in data:
             if data['diagnosis_date']:
@@ -362,28 +756,52 @@ def update_patient(current_user, patient_id):
         # Recalculate risk score if core attributes changed
         trigger_fields = ['age', 'gender', 'cancer_type', 'stage', 'clinical_data']
         if any(field in data for field in trigger_fields):
-            patient_data = {
-                'age': patient.age,
-                'gender': patient.gender,
-                'cancer_type': patient.cancer_type,
-                'stage': patient.stage,
-                'clinical_data': patient.get_clinical_data()
-            }
+            patient_data = _model_input(patient.age, patient.stage, patient.get_clinical_data())
             patient.risk_score = ml_service.calculate_risk_score(patient_data)
             patient.calculate_risk_level()
         
         db.session.commit()
+        publish(current_user.id, 'patient.updated', id=patient.id)
         
         return jsonify({
             'message': 'Patient updated successfully',
             'patient': patient.to_dict()
         }), 200
+    except AvatarError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         import traceback
         print(f"Error updating patient: {traceback.format_exc()}")
         return jsonify({'message': str(e)}), 500
 
+@patients_bp.route('/<int:patient_id>/avatar', methods=['POST'])
+@optional_auth
+def upload_patient_avatar(current_user, patient_id):
+    """Set a patient's avatar from an uploaded image (multipart field "avatar")"""
+    try:
+        patient = Patient.query.filter_by(id=patient_id, doctor_id=current_user.id).first()
+        if not patient:
+            return jsonify({'message': 'Patient not found'}), 404
+
+        upload = request.files.get('avatar')
+        if upload is None:
+            return jsonify({'message': 'No avatar file uploaded'}), 400
+        data = upload.read(avatar_store.MAX_AVATAR_BYTES + 1)
+        patient.avatar_url = avatar_store.save_avatar(data)
+
+        db.session.commit()
+        publish(current_user.id, 'patient.updated', id=patient.id)
+
+        return jsonify({'avatar_url': patient.avatar_url}), 200
+    except AvatarError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
 @patients_bp.route('/<int:patient_id>', methods=['DELETE'])
 @token_required
 def delete_patient(current_user, patient_id):
@@ -395,6 +813,7 @@ def delete_patient(current_user, patient_id):
         
         db.session.delete(patient)
         db.session.commit()
+        publish(current_user.id, 'patient.deleted', id=patient_id)
         
         return jsonify({'message': 'Patient deleted successfully'}), 200
     except Exception as e:
@@ -406,6 +825,7 @@ recommendations_bp = Blueprint('recommendations', __name__)
 
 @recommendations_bp.route('', methods=['GET'])
 @optional_auth
+@conditional_get
 def list_recommendations(current_user):
     """List AI recommendations for all patients of the current (or demo) doctor"""
     try:
@@ -447,33 +867,41 @@ def list_recommendations(current_user):
 
 @recommendations_bp.route('/patient/<int:patient_id>', methods=['GET'])
 @optional_auth
+@conditional_get(extra=lambda: (ml_service.model_version,))
 def get_recommendations(current_user, patient_id):
-    """Get AI recommendations for a patient"""
+    """Get AI recommendations for a patient
+
+    The stored copy is served while the model inputs and model version are
+    unchanged, so the response is validated by the doctor's change version
+    plus the model version (ETag / 304).
+    """
     try:
         patient = Patient.query.filter_by(id=patient_id, doctor_id=current_user.id).first()
         if not patient:
             return jsonify({'message': 'Patient not found'}), 404
         
-        # Extract clinical data for ML model
-        clinical_data = patient.get_clinical_data()
+        patient_data = _model_input(patient.age, patient.stage, patient.get_clinical_data())
+        fingerprint = recommendation_fingerprint(patient_data)
         
-        # Map patient data to ML model expected format
-        # The new model expects: age, stage, targetable_mutation, comorbidity_score
-        patient_data = {
-            'age': patient.age,
-            'stage': patient.stage or 'II',  # Default to stage II if not set
-            'targetable_mutation': clinical_data.get('targetable_mutation', False),
-            'comorbidity_score': clinical_data.get('comorbidity_score', 0.3)
-        }
+        # Serve the stored copy (no model call, no write) while inputs and model are unchanged
+        stored = patient.get_ml_recommendations()
+        if _recommendations_current(stored, fingerprint):
+            return jsonify({
+                'patient_id': patient_id,
+                'recommendations': stored
+            }), 200
         
         recommendations = ml_service.generate_treatment_recommendations(patient_data)
+        recommendations['input_fingerprint'] = fingerprint
+        recommendations['model_version'] = ml_service.model_version
         
         # Save recommendations to patient
         patient.set_ml_recommendations(recommendations)
-        # Update risk score based on ML model output
-        patient.risk_score = ml_service.calculate_risk_score(patient_data)
+        # Update risk score from the same ranking (scored and drift-counted once)
+        patient.risk_score = ml_service.risk_score_from_recommendations(recommendations)
         patient.calculate_risk_level()
         db.session.commit()
+        publish(current_user.id, 'recommendation.ready', patient_id=patient_id)
         
         return jsonify({
             'patient_id': patient_id,
@@ -484,18 +912,86 @@ def get_recommendations(current_user, patient_id):
         print(f"Error generating recommendations: {traceback.format_exc()}")
         return jsonify({'message': str(e)}), 500
 
+def _sample_cohort_inputs(doctor_id, sample_size):
+    """Random sample (in SQL) of a doctor's patients as ML model inputs"""
+    from sqlalchemy import func
+    rows = (
+        db.session.query(Patient.age, Patient.stage, Patient.clinical_data)
+        .filter(Patient.doctor_id == doctor_id)
+        .order_by(func.random())
+        .limit(sample_size)
+        .all()
+    )
+    return [
+        _model_input(age, stage, clinical_data)
+        for age, stage, clinical_data in rows
+    ]
+
+@recommendations_bp.route('/global-explanation', methods=['GET'])
+@optional_auth
+def get_global_explanation(current_user):
+    """Cohort-level explanation: mean |SHAP| per feature over the doctor's patients"""
+    try:
+        sample_size = request.args.get('sample_size', SHAP_SUMMARY_SAMPLE_SIZE, type=int)
+        sample_size = max(1, min(sample_size, 5000))
+        key = (current_user.id, ml_service.model_version, sample_size)
+        
+        summary, stale = shap_summary_cache.get(key)
+        served_stale = summary is not None and stale
+        if summary is None:
+            # First view for this doctor/model: compute inline once
+            summary = ml_service.get_global_shap_summary(_sample_cohort_inputs(current_user.id, sample_size))
+            shap_summary_cache.set(key, summary)
+        elif stale:
+            # Serve the cached copy; the cohort sample and SHAP both run on the refresh thread
+            app, doctor_id = current_app._get_current_object(), current_user.id
+
+            def refresh():
+                with app.app_context():
+                    return ml_service.get_global_shap_summary(_sample_cohort_inputs(doctor_id, sample_size))
+
+            shap_summary_cache.refresh_async(key, refresh)
+        
+        return jsonify({**summary, 'stale': served_stale}), 200
+    except Exception as e:
+        import traceback
+        print(f"Error computing global explanation: {traceback.format_exc()}")
+        return jsonify({'message': str(e)}), 500
+
 # Reports Blueprint
 reports_bp = Blueprint('reports', __name__)
 
 @reports_bp.route('', methods=['GET'])
 @token_required
+@conditional_get
 def get_reports(current_user):
-    """Get all reports for the current user"""
+    """Get report metadata for the current user (all, or one page with ?limit=&cursor=; ?since= for a delta)"""
     try:
-        reports = Report.query.filter_by(doctor_id=current_user.id).all()
-        return jsonify({
-            'reports': [r.to_dict() for r in reports]
-        }), 200
+        since, token = _sync_window()
+        query = Report.query.options(joinedload(Report.patient).load_only(Patient.name)).filter_by(doctor_id=current_user.id)
+        reports, next_cursor, paginated = _paginate(_sync_query(query, Report, since), Report)
+        # Metadata only: bodies are fetched one at a time from GET /api/reports/<id>
+        body = {'reports': [r.to_dict(include_data=False) for r in reports]}
+        if paginated:
+            body['next_cursor'] = next_cursor
+        return jsonify(_with_sync(body, reports, Report, current_user.id, since, token)), 200
+    except InvalidCursorError as e:
+        return jsonify({'message': str(e)}), 400
+    except (InvalidSinceError, SyncExpiredError) as e:
+        return _sync_error(e)
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@reports_bp.route('/<int:report_id>', methods=['GET'])
+@token_required
+@conditional_get
+def get_report(current_user, report_id):
+    """Get one report with its (decompressed) body"""
+    try:
+        report = Report.query.filter_by(id=report_id, doctor_id=current_user.id).first()
+        if not report:
+            return jsonify({'message': 'Report not found'}), 404
+        return jsonify(report.to_dict()), 200
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -515,9 +1011,9 @@ def generate_report(current_user, patient_id):
                 'level': patient.risk_level
             },
             'recommendations': patient.get_ml_recommendations(),
-            'generated_at': datetime.utcnow().isoformat()
         }
-        
+        # No timestamp in the body (the row has generated_at), so reports for an
+        # unchanged patient share one stored body
         report = Report(
             patient_id=patient_id,
             doctor_id=current_user.id,
@@ -527,6 +1023,7 @@ def generate_report(current_user, patient_id):
         
         db.session.add(report)
         db.session.commit()
+        publish(current_user.id, 'report.generated', id=report.id, patient_id=patient_id)
         
         return jsonify({
             'message': 'Report generated successfully',
@@ -549,14 +1046,7 @@ def download_patient_report(current_user, patient_id):
         recommendations = patient.get_ml_recommendations()
         if not recommendations or not recommendations.get('treatments'):
             # Generate recommendations if not available
-            from ml_service import ml_service
-            clinical_data = patient.get_clinical_data()
-            patient_data = {
-                'age': patient.age,
-                'stage': patient.stage or 'II',
-                'targetable_mutation': clinical_data.get('targetable_mutation', False),
-                'comorbidity_score': clinical_data.get('comorbidity_score', 0.3)
-            }
+            patient_data = _model_input(patient.age, patient.stage, patient.get_clinical_data())
             recommendations = ml_service.generate_treatment_recommendations(patient_data)
         
         report_data = {
@@ -593,13 +1083,23 @@ appointments_bp = Blueprint('appointments', __name__)
 
 @appointments_bp.route('', methods=['GET'])
 @optional_auth
+@conditional_get
 def get_appointments(current_user):
-    """Get all appointments for the current (or demo) doctor"""
+    """Get appointments for the current (or demo) doctor (all, or one page with ?limit=&cursor=; ?since= for a delta)"""
     try:
-        appointments = Appointment.query.filter_by(doctor_id=current_user.id).all()
-        return jsonify({
-            'appointments': [a.to_dict() for a in appointments]
-        }), 200
+        since, token = _sync_window()
+        query = (
+            Appointment.query
+            .options(joinedload(Appointment.patient).load_only(Patient.name))
+            .filter_by(doctor_id=current_user.id)
+        )
+        appointments, next_cursor, paginated = _paginate(_sync_query(query, Appointment, since), Appointment)
+        body = _page_response('appointments', appointments, next_cursor, paginated)
+        return jsonify(_with_sync(body, appointments, Appointment, current_user.id, since, token)), 200
+    except InvalidCursorError as e:
+        return jsonify({'message': str(e)}), 400
+    except (InvalidSinceError, SyncExpiredError) as e:
+        return _sync_error(e)
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -621,6 +1121,7 @@ def create_appointment(current_user):
         
         db.session.add(appointment)
         db.session.commit()
+        publish(current_user.id, 'appointment.created', id=appointment.id, patient_id=appointment.patient_id)
         
         return jsonify({
             'message': 'Appointment created successfully',
@@ -651,6 +1152,7 @@ def update_appointment(current_user, appointment_id):
             appointment.appointment_type = data['appointment_type']
         
         db.session.commit()
+        publish(appointment.doctor_id, 'appointment.updated', id=appointment.id, patient_id=appointment.patient_id)
         
         return jsonify({
             'message': 'Appointment updated successfully',
@@ -669,8 +1171,10 @@ def delete_appointment(current_user, appointment_id):
         if not appointment:
             return jsonify({'message': 'Appointment not found'}), 404
         
+        doctor_id, patient_id = appointment.doctor_id, appointment.patient_id
         db.session.delete(appointment)
         db.session.commit()
+        publish(doctor_id, 'appointment.deleted', id=appointment_id, patient_id=patient_id)
         
         return jsonify({'message': 'Appointment deleted successfully'}), 200
     except Exception as e:
@@ -683,18 +1187,23 @@ outcomes_bp = Blueprint('outcomes', __name__)
 @outcomes_bp.route('/patient/<int:patient_id>', methods=['GET'])
 @token_required
 def get_patient_outcomes(current_user, patient_id):
-    """Get all outcomes for a patient"""
+    """Get all outcomes for a patient (?since=<sync_token> for changes only)"""
     try:
+        since, token = _sync_window()
         patient = Patient.query.filter_by(id=patient_id, doctor_id=current_user.id).first()
         if not patient:
             return jsonify({'message': 'Patient not found'}), 404
         
-        outcomes = Outcome.query.filter_by(patient_id=patient_id).order_by(Outcome.created_at.desc()).all()
+        query = _sync_query(Outcome.query.filter_by(patient_id=patient_id), Outcome, since)
+        outcomes = query.order_by(Outcome.created_at.desc()).all()
         
-        return jsonify({
+        body = {
             'patient_id': patient_id,
             'outcomes': [o.to_dict() for o in outcomes]
-        }), 200
+        }
+        return jsonify(_with_sync(body, outcomes, Outcome, current_user.id, since, token, patient_id)), 200
+    except (InvalidSinceError, SyncExpiredError) as e:
+        return _sync_error(e)
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -764,6 +1273,7 @@ def create_outcome(current_user, patient_id):
             outcome.set_outcome_data(data['outcome_data'])
         
         db.session.commit()
+        publish(current_user.id, 'outcome.saved', id=outcome.id, patient_id=patient_id)
         
         return jsonify({
             'message': 'Outcome saved successfully',
@@ -803,6 +1313,7 @@ def update_outcome(current_user, outcome_id):
                     setattr(outcome, key, value)
         
         db.session.commit()
+        publish(current_user.id, 'outcome.saved', id=outcome.id, patient_id=outcome.patient_id)
         
         return jsonify({
             'message': 'Outcome updated successfully',
@@ -812,6 +1323,30 @@ def update_outcome(current_user, outcome_id):
         db.session.rollback()
         return jsonify({'message': str(e)}), 500
 
+def _outcome_comparison(outcome):
+    """Predicted vs actual outcome for one treatment"""
+    return {
+        'treatment_type': outcome.treatment_type,
+        'predicted': {
+            'response_probability': outcome.predicted_response_probability,
+            'survival_1yr': outcome.predicted_survival_1yr,
+            'survival_3yr': outcome.predicted_survival_3yr,
+            'survival_5yr': outcome.predicted_survival_5yr,
+            'response_rate': outcome.predicted_response_rate,
+            'remission_probability': outcome.predicted_remission_probability,
+        },
+        'actual': {
+            'response': outcome.actual_response,
+            'survival_status': outcome.actual_survival_status,
+            'survival_months': outcome.actual_survival_months,
+            'remission_status': outcome.actual_remission_status,
+        },
+        'treatment_dates': {
+            'start': outcome.treatment_start_date.isoformat() if outcome.treatment_start_date else None,
+            'end': outcome.treatment_end_date.isoformat() if outcome.treatment_end_date else None,
+        }
+    }
+
 @outcomes_bp.route('/comparison/patient/<int:patient_id>', methods=['GET'])
 @token_required
 def get_outcome_comparison(current_user, patient_id):
@@ -823,35 +1358,160 @@ def get_outcome_comparison(current_user, patient_id):
         
         outcomes = Outcome.query.filter_by(patient_id=patient_id).all()
         
-        comparisons = []
-        for outcome in outcomes:
-            comparison = {
-                'treatment_type': outcome.treatment_type,
-                'predicted': {
-                    'response_probability': outcome.predicted_response_probability,
-                    'survival_1yr': outcome.predicted_survival_1yr,
-                    'survival_3yr': outcome.predicted_survival_3yr,
-                    'survival_5yr': outcome.predicted_survival_5yr,
-                    'response_rate': outcome.predicted_response_rate,
-                    'remission_probability': outcome.predicted_remission_probability,
-                },
-                'actual': {
-                    'response': outcome.actual_response,
-                    'survival_status': outcome.actual_survival_status,
-                    'survival_months': outcome.actual_survival_months,
-                    'remission_status': outcome.actual_remission_status,
-                },
-                'treatment_dates': {
-                    'start': outcome.treatment_start_date.isoformat() if outcome.treatment_start_date else None,
-                    'end': outcome.treatment_end_date.isoformat() if outcome.treatment_end_date else None,
-                }
-            }
-            comparisons.append(comparison)
-        
         return jsonify({
             'patient_id': patient_id,
-            'comparisons': comparisons
+            'comparisons': [_outcome_comparison(outcome) for outcome in outcomes]
         }), 200
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+# ML Monitoring Blueprint
+ml_bp = Blueprint('ml', __name__)
+
+@ml_bp.route('/drift', methods=['GET'])
+@optional_auth
+def get_feature_drift(current_user):
+    """PSI / KS drift of scored inputs against the training distribution
+
+    Counts each input when the model scores it (patient create/update and
+    recommendation recomputes), not each view of stored recommendations.
+    """
+    try:
+        return jsonify(ml_service.get_drift_report()), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@ml_bp.route('/shadow', methods=['GET'])
+@optional_auth
+def get_shadow_stats(current_user):
+    """Agreement and calibration of the shadow model against production predictions"""
+    try:
+        return jsonify(ml_service.get_shadow_stats()), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+# Cohorts Blueprint
+cohorts_bp = Blueprint('cohorts', __name__)
+
+@cohorts_bp.route('/query', methods=['POST'])
+@optional_auth
+def query_cohort(current_user):
+    """Patients matching a cohort filter, compiled to one SQL query (see cohort_query)
+
+    Body: {"filter": {...}, "sort": "-risk_score", "limit": 50, "cursor": "...",
+    "fields": [...] or "a,b", "count": true}. Returns one keyset page of patients
+    (summary fields unless `fields` is given) with next_cursor, and `total`
+    (counted on the first page unless "count" says otherwise).
+    """
+    try:
+        data = request.get_json(silent=True)
+        if data is None and request.get_data():
+            raise CohortQueryError('Body must be a JSON object')
+        if data is None:
+            data = {}
+        if not isinstance(data, dict):
+            raise CohortQueryError('Body must be a JSON object')
+        fields = _parse_fields(Patient, data['fields']) if data.get('fields') else Patient.SUMMARY_FIELDS
+        sort = _parse_sort(Patient, data.get('sort'), PATIENT_SORT_KEYS)
+        limit = data.get('limit')
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int)):
+            raise CohortQueryError('limit must be an integer')
+        cursor = data.get('cursor')
+
+        query = Patient.query.filter(
+            Patient.doctor_id == current_user.id,
+            cohort_query.compile_filter(data.get('filter'), current_user.id),
+        )
+        total = query.count() if data.get('count', not cursor) else None
+        loaded = fields + (sort[0].key,) if sort else fields
+        patients, next_cursor = _keyset_page(_project(query, Patient, loaded), Patient, sort, limit, cursor)
+
+        body = {'patients': [p.to_dict(fields) for p in patients], 'next_cursor': next_cursor}
+        if total is not None:
+            body['total'] = total
+        return jsonify(body), 200
+    except (CohortQueryError, InvalidCursorError, InvalidFieldsError, InvalidFilterError) as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+# Avatars Blueprint
+avatars_bp = Blueprint('avatars', __name__)
+
+# Stored images never change under their name
+AVATAR_MAX_AGE = 365 * 24 * 3600
+
+@avatars_bp.route('/<name>', methods=['GET'])
+def get_avatar(name):
+    """A stored avatar image, or its ?size= px thumbnail (64, 128 or 256)
+
+    Not behind auth so <img> tags can load it; the name is the image's SHA-256,
+    so it cannot be guessed. Marked private so shared caches do not keep it.
+    """
+    try:
+        size = request.args.get('size')
+        if size is not None:
+            if size not in {str(s) for s in avatar_store.THUMBNAIL_SIZES}:
+                return jsonify({'message': f'size must be one of {list(avatar_store.THUMBNAIL_SIZES)}'}), 400
+            size = int(size)
+        path = avatar_store.image_path(name, size)
+        if path is None:
+            return jsonify({'message': 'Avatar not found'}), 404
+
+        response = send_file(path, mimetype=avatar_store.mimetype(name), conditional=True,
+                             etag=f'{name}-{size or 0}', max_age=AVATAR_MAX_AGE)
+        response.cache_control.private = True
+        response.cache_control.public = False
+        response.cache_control.immutable = True
+        return response
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+# Events Blueprint
+events_bp = Blueprint('events', __name__)
+
+# EventSource waits this long before reconnecting (sent as the stream's retry field)
+EVENTS_RETRY_MS = 3000
+
+def _sse(event):
+    event_id, event_type, data = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+@events_bp.route('/token', methods=['POST'])
+@optional_auth
+def create_stream_token(current_user):
+    """Short-lived token for opening GET /api/events?stream_token= (EventSource can't send headers)"""
+    token = jwt.encode({
+        'user_id': current_user.id,
+        'aud': EVENTS_TOKEN_AUDIENCE,
+        'exp': datetime.utcnow() + timedelta(seconds=EVENTS_TOKEN_SECONDS)
+    }, current_app.config.get('SECRET_KEY', os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')), algorithm='HS256')
+    return jsonify({'token': token, 'expires_in': EVENTS_TOKEN_SECONDS}), 200
+
+@events_bp.route('', methods=['GET'])
+@stream_auth
+def stream_events(current_user):
+    """Server-sent change events for the current doctor
+
+    Replays missed events after Last-Event-ID (header, or ?lastEventId= for a
+    new EventSource) and sends a heartbeat comment while idle. The stream does
+    not touch the database after it starts.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    subscription, replay = events.broker.subscribe(current_user.id, last_event_id)
+
+    def stream():
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n"
+            for event in replay:
+                yield _sse(event)
+            while True:
+                event = subscription.get(timeout=events.HEARTBEAT_SECONDS)
+                yield _sse(event) if event else ": heartbeat\n\n"
+        finally:
+            subscription.close()
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # no proxy buffering (nginx)
+    })
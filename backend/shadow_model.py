@@ -0,0 +1,169 @@
+"""
+Shadow model evaluation
+
+A candidate (retrained) model scores the same inputs as the production model
+on a background worker thread. The request thread only enqueues the input and
+the production probabilities, so the primary response path does no extra
+scoring. Both predictions are appended to a compact JSON-lines log for offline
+comparison, and running agreement/calibration aggregates are kept in memory.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Bins over the production probability used for the shadow reliability table
+CALIBRATION_BINS = 10
+
+
+class ShadowEvaluator:
+
+    def __init__(
+        self,
+        model,
+        model_version: str,
+        primary_version: str,
+        build_inputs: Callable,
+        treatments: List[str],
+        threshold: float,
+        log_path: Optional[str] = None,
+        max_queue: int = 1000,
+    ):
+        self.model = model
+        self.model_version = model_version
+        self.primary_version = primary_version
+        self.build_inputs = build_inputs
+        self.treatments = list(treatments)
+        self.threshold = threshold
+        self.log_path = log_path
+        self.dropped = 0
+        self.errors = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+        if log_path:
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+        self._worker = threading.Thread(target=self._run, name="shadow-model", daemon=True)
+        self._worker.start()
+
+    # --------------------------------------------------
+    # Request path (must stay O(1) and non-blocking)
+    # --------------------------------------------------
+
+    def submit(self, patient_data: Dict, primary_probs: Dict[str, float]) -> bool:
+        """Queue one scored input; drops it instead of blocking if the worker is behind"""
+        try:
+            self._queue.put_nowait((time.time(), dict(patient_data), dict(primary_probs)))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def join(self) -> None:
+        """Block until every queued input has been scored (tests / benchmarks)"""
+        self._queue.join()
+
+    # --------------------------------------------------
+    # Worker
+    # --------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            submitted_at, patient_data, primary_probs = self._queue.get()
+            try:
+                self._score(submitted_at, patient_data, primary_probs)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"[Shadow] Scoring failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _score(self, submitted_at: float, patient_data: Dict, primary_probs: Dict[str, float]) -> None:
+        input_df = self.build_inputs(patient_data)
+        shadow = [round(float(p), 3) for p in self.model.predict_proba(input_df)[:, 1]]
+        primary = [float(primary_probs[t]) for t in self.treatments]
+
+        self._update_stats(primary, shadow)
+
+        if self.log_path:
+            record = {
+                "t": round(submitted_at, 3),
+                "v": self.primary_version,
+                "sv": self.model_version,
+                "x": [patient_data.get("age"), patient_data.get("stage"),
+                      int(bool(patient_data.get("targetable_mutation", False))),
+                      patient_data.get("comorbidity_score")],
+                "p": primary,
+                "s": shadow,
+            }
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    # --------------------------------------------------
+    # Aggregates
+    # --------------------------------------------------
+
+    def _reset_stats(self) -> None:
+        self.scored = 0
+        self._pairs = 0
+        self._label_agree = 0
+        self._top_agree = 0
+        self._abs_diff = 0.0
+        self._primary_sum = 0.0
+        self._shadow_sum = 0.0
+        self._bins = [[0, 0.0, 0.0] for _ in range(CALIBRATION_BINS)]
+
+    def _update_stats(self, primary: List[float], shadow: List[float]) -> None:
+        with self._lock:
+            self.scored += 1
+            if primary.index(max(primary)) == shadow.index(max(shadow)):
+                self._top_agree += 1
+            for p, s in zip(primary, shadow):
+                self._pairs += 1
+                self._label_agree += int((p >= self.threshold) == (s >= self.threshold))
+                self._abs_diff += abs(p - s)
+                self._primary_sum += p
+                self._shadow_sum += s
+                b = self._bins[min(CALIBRATION_BINS - 1, int(p * CALIBRATION_BINS))]
+                b[0] += 1
+                b[1] += p
+                b[2] += s
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pairs = self._pairs or 1
+            scored = self.scored or 1
+            return {
+                "available": True,
+                "primary_version": self.primary_version,
+                "shadow_version": self.model_version,
+                "scored": self.scored,
+                "pending": self._queue.qsize(),
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "log_path": self.log_path,
+                "label_agreement": round(self._label_agree / pairs, 4),
+                "top_treatment_agreement": round(self._top_agree / scored, 4),
+                "mean_abs_probability_diff": round(self._abs_diff / pairs, 4),
+                "calibration": {
+                    "primary_mean_probability": round(self._primary_sum / pairs, 4),
+                    "shadow_mean_probability": round(self._shadow_sum / pairs, 4),
+                    "bins": [
+                        {
+                            "range": [i / CALIBRATION_BINS, (i + 1) / CALIBRATION_BINS],
+                            "n": n,
+                            "primary_mean": round(p_sum / n, 4),
+                            "shadow_mean": round(s_sum / n, 4),
+                        }
+                        for i, (n, p_sum, s_sum) in enumerate(self._bins) if n
+                    ],
+                },
+            }
@@ -0,0 +1,84 @@
+"""
+Shared pytest fixtures: the app on a scratch database, doctors and their auth headers
+
+app.py creates its tables when it is first imported, so DATABASE_URL is
+pointed at a temporary SQLite file here, before any test module imports
+the app (set TEST_DATABASE_URL to run the suite against another database,
+e.g. a scratch Postgres). Every table is
+emptied after each test that uses the app fixture.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = os.getenv('TEST_DATABASE_URL', f"sqlite:///{os.path.join(_tmp.name, 'test.db')}")
+os.environ['AVATAR_STORAGE_DIR'] = os.path.join(_tmp.name, 'avatars')
+
+from app import app as flask_app, db, User, dashboard_cache  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    """The Flask app inside an app context; all rows are deleted afterwards"""
+    with flask_app.app_context():
+        yield flask_app
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        # SQLite hands out the same ids again, so nothing cached for them may survive
+        dashboard_cache.invalidate(everyone=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_doctor(app):
+    """make_doctor(email) -> a committed doctor account"""
+    def make(email='doctor@oncoai.com', name='Test Doctor'):
+        doctor = User(email=email, name=name, role='doctor')
+        doctor.set_password('test123')
+        db.session.add(doctor)
+        db.session.commit()
+        return doctor
+    return make
+
+
+@pytest.fixture
+def doctor(make_doctor):
+    return make_doctor('doctor@oncoai.com')
+
+
+@pytest.fixture
+def other_doctor(make_doctor):
+    return make_doctor('other-doctor@oncoai.com', 'Other Doctor')
+
+
+@pytest.fixture
+def auth_token(app):
+    """auth_token(user) -> a JWT for the user, valid for an hour"""
+    def token(user):
+        return jwt.encode({
+            'user_id': user.id,
+            'email': user.email,
+            'exp': datetime.utcnow() + timedelta(hours=1)
+        }, app.config['SECRET_KEY'], algorithm='HS256')
+    return token
+
+
+@pytest.fixture
+def auth_headers(auth_token):
+    """auth_headers(user) -> Authorization header for the user"""
+    def headers(user):
+        return {'Authorization': f'Bearer {auth_token(user)}'}
+    return headers
@@ -0,0 +1,111 @@
+"""
+Test avatar storage: uploads, data URL conversion and the image-serving route
+"""
+import os
+
+from app import db, Patient
+import avatar_store
+import base64
+import io
+import pytest
+
+
+@pytest.fixture
+def avatar_dir(tmp_path, monkeypatch):
+    """Avatars go to a temporary directory for the test"""
+    monkeypatch.setattr(avatar_store, 'storage_dir', avatar_store.storage_dir)
+    avatar_store.init_avatar_store(str(tmp_path))
+    return str(tmp_path)
+
+
+def _png(width=300, height=200, color=(200, 30, 30)):
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(out, format='PNG')
+    return out.getvalue()
+
+
+def test_avatar_store(avatar_dir):
+    """Images are stored once under their hash and non-images are rejected"""
+    if not avatar_store.HAS_PIL:
+        print("- Pillow is not installed, skipped")
+        return
+    data = _png()
+    url = avatar_store.save_avatar(data)
+    assert url.startswith('/api/avatars/') and url.endswith('.png')
+    assert avatar_store.save_data_url('data:image/png;base64,' + base64.b64encode(data).decode()) == url
+    assert avatar_store.normalize_avatar_url('https://example.com/a.png') == 'https://example.com/a.png'
+    assert avatar_store.normalize_avatar_url('') is None
+    files = [f for _, _, names in os.walk(avatar_dir) for f in names]
+    assert files == [url.rsplit('/', 1)[1]]
+
+    for bad in (b'', b'not an image', b'\x89PNG\r\n\x1a\n truncated', b'x' * (avatar_store.MAX_AVATAR_BYTES + 1)):
+        try:
+            avatar_store.save_avatar(bad)
+            assert False, bad[:20]
+        except avatar_store.AvatarError:
+            pass
+    for bad in ('data:image/png;base64,***', 'data:text/html,<b>hi</b>'):
+        try:
+            avatar_store.normalize_avatar_url(bad)
+            assert False, bad
+        except avatar_store.AvatarError:
+            pass
+    assert avatar_store.image_path('../../etc/passwd') is None
+    print("✓ Avatars are content-addressed and validated")
+
+
+def test_avatar_api(client, doctor, auth_headers, avatar_dir):
+    """Upload, data URL conversion on update, thumbnails and cache headers"""
+    if not avatar_store.HAS_PIL:
+        print("- Pillow is not installed, skipped")
+        return
+    headers = auth_headers(doctor)
+
+    patient = Patient(name='Avatar Patient', age=58, gender='female', cancer_type='Breast Cancer',
+                      stage='II', doctor_id=doctor.id)
+    db.session.add(patient)
+    db.session.commit()
+    patient_id = patient.id
+
+    response = client.post(f'/api/patients/{patient_id}/avatar', headers=headers,
+                           data={'avatar': (io.BytesIO(_png()), 'me.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_json()
+    url = response.get_json()['avatar_url']
+    assert url.startswith('/api/avatars/')
+    bad = client.post(f'/api/patients/{patient_id}/avatar', headers=headers,
+                      data={'avatar': (io.BytesIO(b'<svg/>'), 'me.svg')},
+                      content_type='multipart/form-data')
+    assert bad.status_code == 400
+    print("✓ POST /api/patients/<id>/avatar stores the upload")
+
+    # Clients that still send data URLs get them moved to storage
+    data_url = 'data:image/png;base64,' + base64.b64encode(_png(color=(0, 90, 200))).decode()
+    response = client.put(f'/api/patients/{patient_id}', json={'avatar_url': data_url}, headers=headers)
+    assert response.status_code == 200
+    url = response.get_json()['patient']['avatar_url']
+    assert url.startswith('/api/avatars/') and len(url) < 100
+    summary = client.get('/api/patients?view=summary', headers=headers).get_json()['patients'][0]
+    assert summary['avatar_url'] == url
+    assert client.put(f'/api/patients/{patient_id}', json={'avatar_url': 'data:image/png;base64,@@'},
+                      headers=headers).status_code == 400
+    print(f"✓ Data URLs become {len(url)}-char avatar URLs ({len(data_url)} chars before)")
+
+    image = client.get(url)
+    assert image.status_code == 200 and image.mimetype == 'image/png'
+    assert image.data == _png(color=(0, 90, 200))
+    assert 'max-age=31536000' in image.headers['Cache-Control']
+    assert 'immutable' in image.headers['Cache-Control'] and 'private' in image.headers['Cache-Control']
+    etag = image.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    from PIL import Image
+    thumb = client.get(url + '?size=64')
+    assert thumb.status_code == 200
+    assert Image.open(io.BytesIO(thumb.data)).size == (64, 43)
+    assert thumb.headers['ETag'] != etag
+    assert client.get(url + '?size=65').status_code == 400
+    assert client.get('/api/avatars/' + '0' * 64 + '.png').status_code == 404
+    print(f"✓ Served with year-long cache headers; 64px thumbnail is {len(thumb.data)} bytes "
+          f"vs {len(image.data)}")
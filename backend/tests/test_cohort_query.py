@@ -0,0 +1,162 @@
+"""
+Test POST /api/cohorts/query and the cohort filter compiler
+"""
+from app import db, Patient, Outcome
+import cohort_query
+from tests.query_counter import count_queries
+from datetime import date
+import json
+
+# name, age, stage, cancer_type, risk_score, mutations, PD-L1, TMB, MSI, outcome response
+PATIENTS = [
+    ('Cohort EGFR IV', 66, 'IV', 'Lung Cancer', 82.0, ['EGFR'], 60, 4.0, 'MSS', 'partial'),
+    ('Cohort ALK III', 52, 'III', 'Lung Cancer', 55.0, ['ALK'], 10, 12.0, 'MSS', 'progression'),
+    ('Cohort KRAS IV', 71, 'IV', 'Colon Cancer', 90.0, ['KRAS', 'TP53'], 5, 22.0, 'MSI-H', None),
+    ('Cohort BRCA II', 44, 'II', 'Breast Cancer', 35.0, ['BRCA1'], 1, 2.0, 'MSS', 'complete'),
+    ('Cohort None IV', 80, 'IV', 'Lung Cancer', 70.0, [], None, None, None, None),
+]
+
+
+def _add_patients(doctor_id):
+    for name, age, stage, cancer_type, risk, genes, pd_l1, tmb, msi, response in PATIENTS:
+        clinical_data = {'genomics': {'mutations': genes}}
+        if pd_l1 is not None:
+            clinical_data['genomics']['biomarkers'] = {'PD-L1': pd_l1, 'TMB': tmb, 'MSI_Status': msi}
+        patient = Patient(name=name, age=age, gender='female', stage=stage, cancer_type=cancer_type,
+                          risk_score=risk, diagnosis_date=date(2024, 1, age % 28 + 1),
+                          clinical_data=clinical_data, doctor_id=doctor_id)
+        patient.calculate_risk_level()
+        db.session.add(patient)
+        db.session.flush()
+        if response:
+            db.session.add(Outcome(patient_id=patient.id, doctor_id=doctor_id, treatment_type='targeted',
+                                   actual_response=response))
+    db.session.commit()
+
+
+def _names(client, headers, body):
+    response = client.post('/api/cohorts/query', json=body, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return sorted(p['name'] for p in response.get_json()['patients'])
+
+
+def test_cohort_query_api(client, doctor, other_doctor, auth_headers):
+    """Filters over patient columns, genomics and outcomes, combined with and/or/not"""
+    ids = [doctor.id, other_doctor.id]
+    headers, other_headers = auth_headers(doctor), auth_headers(other_doctor)
+
+    _add_patients(ids[0])
+    _add_patients(ids[1])
+
+    egfr_stage_iv = {'and': [
+        {'field': 'mutation', 'op': '=', 'value': 'egfr'},
+        {'field': 'stage', 'op': '=', 'value': 'IV'},
+    ]}
+    assert _names(client, headers, {'filter': egfr_stage_iv}) == ['Cohort EGFR IV']
+    assert _names(client, headers, {'filter': {'or': [
+        {'field': 'tmb', 'op': '>=', 'value': 10},
+        {'field': 'pd_l1', 'op': '>', 'value': 50},
+    ]}}) == ['Cohort ALK III', 'Cohort EGFR IV', 'Cohort KRAS IV']
+    assert _names(client, headers, {'filter': {'and': [
+        {'field': 'age', 'op': 'between', 'value': [50, 75]},
+        {'field': 'msi_status', 'op': 'in', 'value': ['mss']},
+    ]}}) == ['Cohort ALK III', 'Cohort EGFR IV']
+    assert _names(client, headers, {'filter': {'field': 'outcome.actual_response', 'op': 'in',
+                                               'value': ['complete', 'partial']}}) == \
+        ['Cohort BRCA II', 'Cohort EGFR IV']
+    assert _names(client, headers, {'filter': {'and': [
+        {'field': 'cancer_type', 'op': '=', 'value': 'Lung Cancer'},
+        {'not': {'field': 'mutation', 'op': 'in', 'value': ['EGFR', 'ALK']}},
+    ]}}) == ['Cohort None IV']
+    assert _names(client, headers, {'filter': {'field': 'mutation', 'op': 'not_in', 'value': ['TP53']},
+                                    'limit': 10}) == \
+        ['Cohort ALK III', 'Cohort BRCA II', 'Cohort EGFR IV', 'Cohort None IV']
+    assert _names(client, headers, {'filter': {'field': 'diagnosis_date', 'op': '<',
+                                               'value': '2024-01-15'}}) == ['Cohort EGFR IV']
+    print("✓ Column, biomarker, mutation and outcome conditions combine with and/or/not")
+
+    # Another doctor's identical patients never leak in
+    response = client.post('/api/cohorts/query', json={'filter': egfr_stage_iv}, headers=other_headers)
+    assert [p['name'] for p in response.get_json()['patients']] == ['Cohort EGFR IV']
+    assert all(p['id'] != response.get_json()['patients'][0]['id']
+               for p in client.post('/api/cohorts/query', json={'filter': egfr_stage_iv},
+                                    headers=headers).get_json()['patients'])
+    print("✓ Every condition is scoped to the requesting doctor")
+
+    # Keyset pages in sort order, with the total on the first page
+    names, cursor, pages = [], None, 0
+    while True:
+        body = {'filter': {'field': 'stage', 'op': 'in', 'value': ['III', 'IV']},
+                'sort': '-risk_score', 'limit': 2, 'fields': ['id', 'name', 'risk_score']}
+        if cursor:
+            body['cursor'] = cursor
+        page = client.post('/api/cohorts/query', json=body, headers=headers).get_json()
+        assert ('total' in page) == (pages == 0)
+        if pages == 0:
+            assert page['total'] == 4
+        names += [p['name'] for p in page['patients']]
+        assert set(page['patients'][0]) == {'id', 'name', 'risk_score'}
+        cursor, pages = page['next_cursor'], pages + 1
+        if not cursor:
+            break
+    assert names == ['Cohort KRAS IV', 'Cohort EGFR IV', 'Cohort None IV', 'Cohort ALK III']
+    print("✓ Results page by keyset cursor in sort order with a first-page total")
+
+    # One query for the page and one for the count, whatever the filter
+    big_filter = {'and': [egfr_stage_iv, {'or': [
+        {'field': 'tmb', 'op': '<', 'value': 30},
+        {'field': 'outcome.actual_response', 'op': '=', 'value': 'partial'},
+    ]}]}
+    client.post('/api/cohorts/query', json={'filter': big_filter}, headers=headers)
+    db.session.expunge_all()
+    with count_queries(db.engine) as counter:
+        response = client.post('/api/cohorts/query', json={'filter': big_filter}, headers=headers)
+    assert response.get_json()['total'] == 1
+    # + the user lookup by the auth decorator
+    assert counter.count <= 3, counter.statements
+    print(f"✓ Compiled into {counter.count} queries including auth")
+
+
+def test_cohort_query_rejects_bad_filters(client, doctor, auth_headers):
+    """Malformed filters are a 400 with a message, never a 500 or raw SQL"""
+    headers = auth_headers(doctor)
+    deep = {'field': 'age', 'op': '>', 'value': 1}
+    for _ in range(cohort_query.MAX_DEPTH):
+        deep = {'not': deep}
+    bad = [
+        {'filter': {'field': 'password_hash', 'op': '=', 'value': 'x'}},
+        {'filter': {'field': 'age', 'op': '>', 'value': '65; DROP TABLE patients'}},
+        {'filter': {'field': 'stage', 'op': '>', 'value': 'II'}},
+        {'filter': {'field': 'mutation', 'op': '!=', 'value': 'EGFR'}},
+        {'filter': {'field': 'age', 'op': 'between', 'value': [1]}},
+        {'filter': {'and': []}},
+        {'filter': {'and': [deep]}},
+        {'filter': {'or': [{'field': 'age', 'op': '>', 'value': i} for i in range(cohort_query.MAX_CONDITIONS + 1)]}},
+        {'filter': {'field': 'age', 'op': '>', 'value': 1, 'extra': True}},
+        {'filter': {'field': ['age'], 'op': '>', 'value': 1}},
+        {'filter': {'field': 'age', 'op': ['>'], 'value': 1}},
+        {'filter': {'field': {'age': 1}, 'op': '>', 'value': 1}},
+        {'filter': {'field': 'age', 'op': '>', 'value': 2 ** 63}},
+        {'filter': {'field': 'tmb', 'op': 'in', 'value': [1, 2 ** 63]}},
+        {'filter': {'field': 'risk_score', 'op': '>', 'value': float('inf')}},
+        {'sort': 'password_hash'},
+        {'fields': ['name', 'password_hash']},
+        {'fields': {'name': True}},
+        {'fields': 'name,password_hash'},
+        {'limit': 'all'},
+        {'cursor': 'bm90LWpzb24'},
+        ['not', 'an', 'object'],
+    ]
+    for body in bad:
+        # Sent as text: the app's JSON provider won't encode integers past 64 bits
+        response = client.post('/api/cohorts/query', data=json.dumps(body), content_type='application/json',
+                               headers=headers)
+        assert response.status_code == 400, (body, response.get_json())
+        assert response.get_json()['message']
+    assert client.post('/api/cohorts/query', data='{"filter":', content_type='application/json',
+                       headers=headers).status_code == 400
+    print("✓ Unknown fields/operators, bad values, oversized filters and malformed bodies get 400")
+
+    # fields may also be given comma-separated, as in ?fields=
+    response = client.post('/api/cohorts/query', json={'fields': 'id, name'}, headers=headers)
+    assert response.status_code == 200, response.get_json()
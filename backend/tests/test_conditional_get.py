@@ -0,0 +1,68 @@
+"""
+Test ETag / Last-Modified conditional GETs on the polled endpoints
+"""
+from app import db, Patient, Appointment, Report
+from tests.query_counter import count_queries
+from datetime import datetime
+
+POLLED = [
+    '/api/patients',
+    '/api/patients?view=summary',
+    '/api/recommendations',
+    '/api/reports',
+    '/api/appointments',
+    '/api/dashboard/summary?range=month',
+]
+
+COLLECTION_TABLES = ('patients', 'appointments', 'reports', 'doctor_daily_stats')
+
+
+def test_conditional_get_on_polled_endpoints(client, doctor, other_doctor, auth_headers):
+    """Unchanged collections answer 304 without querying them; a write changes the ETag"""
+    ids = [doctor.id, other_doctor.id]
+    headers, other_headers = auth_headers(doctor), auth_headers(other_doctor)
+
+    patient = Patient(name='Conditional Patient', age=60, gender='female', cancer_type='Lung Cancer',
+                      stage='II', doctor_id=ids[0], risk_level='high', risk_score=80.0,
+                      diagnosis_date=datetime.utcnow().date())
+    patient.set_ml_recommendations({'treatments': [], 'summary': 'Plan'})
+    db.session.add(patient)
+    db.session.flush()
+    db.session.add(Appointment(patient_id=patient.id, doctor_id=ids[0], appointment_date=datetime.utcnow()))
+    db.session.add(Report(patient_id=patient.id, doctor_id=ids[0], report_type='comprehensive'))
+    db.session.commit()
+    patient_id = patient.id
+
+    etags = {}
+    for url in POLLED:
+        first = client.get(url, headers=headers)
+        assert first.status_code == 200, (url, first.get_json())
+        etag = first.headers['ETag']
+        assert first.headers['Cache-Control'] == 'private, no-cache'
+        assert first.headers.get('Last-Modified'), url
+
+        with count_queries(db.engine) as counter:
+            again = client.get(url, headers={**headers, 'If-None-Match': etag})
+        assert again.status_code == 304, url
+        assert again.data == b''
+        assert again.headers['ETag'] == etag
+        touched = [s for s in counter.statements if any(f'FROM {t}' in s for t in COLLECTION_TABLES)]
+        assert not touched, (url, touched)
+
+        # Last-Modified alone also validates
+        since = client.get(url, headers={**headers, 'If-Modified-Since': first.headers['Last-Modified']})
+        assert since.status_code == 304, url
+
+        # Another doctor's request never matches this doctor's ETag
+        assert client.get(url, headers={**other_headers, 'If-None-Match': etag}).status_code == 200
+        etags[url] = etag
+    print(f"✓ {len(POLLED)} polled endpoints answer 304 without querying their collections")
+
+    # Any write for the doctor changes every validator
+    db.session.get(Patient, patient_id).risk_level = 'medium'
+    db.session.commit()
+    for url, etag in etags.items():
+        response = client.get(url, headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 200, url
+        assert response.headers['ETag'] != etag
+    print("✓ A committed write changes the ETag of every polled endpoint")
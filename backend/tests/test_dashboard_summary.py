@@ -0,0 +1,56 @@
+"""
+Test dashboard summary aggregates, the activity feed and its round-trip budget
+"""
+from app import db, Patient, Appointment, Report
+from tests.query_counter import count_queries
+from datetime import datetime, timedelta
+
+# user lookup, totals, daily rollup, top patients, activity feed
+MAX_ROUND_TRIPS = 5
+
+
+def test_dashboard_summary_aggregates_and_round_trips(client, doctor, auth_headers):
+    """Totals and feed match the data; the endpoint stays within a fixed number of statements"""
+    doctor_id = doctor.id
+    headers = auth_headers(doctor)
+
+    now = datetime.utcnow()
+    levels = ['high', 'high', 'medium', 'low', 'high']
+    for i, level in enumerate(levels):
+        patient = Patient(name=f'Dash Patient {i}', age=50 + i, gender='female', cancer_type='Lung Cancer',
+                          stage='II', doctor_id=doctor_id, risk_level=level, risk_score=90.0 - i * 10,
+                          diagnosis_date=(now - timedelta(days=i)).date())
+        if i % 2 == 0:
+            patient.set_treatment_protocol({'regimen': 'FOLFOX'})
+        if i < 3:
+            patient.set_ml_recommendations({'treatments': []})
+        db.session.add(patient)
+        db.session.flush()
+        db.session.add(Appointment(patient_id=patient.id, doctor_id=doctor_id, status='scheduled',
+                                   appointment_date=now - timedelta(hours=2 * i + 1),
+                                   created_at=now - timedelta(days=i)))
+        db.session.add(Report(patient_id=patient.id, doctor_id=doctor_id, report_type='comprehensive',
+                              generated_at=now - timedelta(hours=2 * i)))
+    db.session.commit()
+    db.session.expunge_all()
+
+    with count_queries(db.engine) as counter:
+        response = client.get('/api/dashboard/summary', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+
+    assert body['total_patients'] == 5
+    assert body['high_risk_patients'] == 3
+    assert body['active_treatments'] == 3
+    assert body['ai_recommendations'] == 3
+    assert [p['name'] for p in body['top_patients']] == [f'Dash Patient {i}' for i in range(5)]
+
+    # Newest six of reports (0h, 2h, 4h, ...) and appointments (1h, 3h, 5h, ...), interleaved
+    feed = body['recent_activities']
+    assert [a['type'] for a in feed] == ['report', 'appointment'] * 3
+    assert feed[0]['message'] == 'Report generated for Dash Patient 0'
+    assert feed[1]['message'] == 'Appointment scheduled for Dash Patient 0'
+    assert [a['time'] for a in feed] == sorted((a['time'] for a in feed), reverse=True)
+
+    assert counter.count <= MAX_ROUND_TRIPS, counter.statements
+    print(f"✓ Dashboard summary served in {counter.count} statements")
@@ -0,0 +1,102 @@
+"""
+Test ?since= delta sync on the patients, appointments, reports and outcomes lists
+"""
+from app import db, Patient, Appointment, Report, Outcome, Tombstone
+import delta_sync
+from datetime import datetime, timedelta
+
+
+def _patient(doctor_id, name):
+    return Patient(name=name, age=60, gender='female', cancer_type='Lung Cancer', stage='II', doctor_id=doctor_id)
+
+
+def test_delta_sync_returns_changes_and_tombstones(client, doctor, other_doctor, auth_headers, monkeypatch):
+    """A delta holds exactly the rows changed since the token and the ids deleted or moved away"""
+    monkeypatch.setattr(delta_sync, 'SYNC_OVERLAP_SECONDS', 0)
+    ids = [doctor.id, other_doctor.id]
+    headers = auth_headers(doctor)
+
+    patients = [_patient(ids[0], f'Delta Patient {i}') for i in range(4)]
+    db.session.add_all(patients)
+    db.session.flush()
+    for p in patients:
+        db.session.add(Appointment(patient_id=p.id, doctor_id=ids[0], appointment_date=datetime.utcnow()))
+        db.session.add(Report(patient_id=p.id, doctor_id=ids[0], report_type='comprehensive'))
+    outcome = Outcome(patient_id=patients[0].id, doctor_id=ids[0], treatment_type='chemo')
+    db.session.add(outcome)
+    db.session.commit()
+    pid = [p.id for p in patients]
+
+    urls = {
+        'patients': '/api/patients',
+        'appointments': '/api/appointments',
+        'reports': '/api/reports',
+        'outcomes': f'/api/outcomes/patient/{pid[0]}',
+    }
+    tokens = {}
+    for key, url in urls.items():
+        body = client.get(url, headers=headers).get_json()
+        assert 'deleted' not in body
+        tokens[key] = body['sync_token']
+
+    # Nothing changed yet: empty deltas
+    for key, url in urls.items():
+        body = client.get(url, query_string={'since': tokens[key]}, headers=headers).get_json()
+        assert body[key] == [] and body['deleted'] == [], (key, body)
+
+    # Update one patient, delete one (cascading to its appointment/report), move one away, add one
+    db.session.get(Patient, pid[0]).name = 'Delta Patient 0 (renamed)'
+    db.session.delete(db.session.get(Patient, pid[1]))
+    db.session.get(Patient, pid[2]).doctor_id = ids[1]
+    new_patient = _patient(ids[0], 'Delta Patient 4')
+    db.session.add(new_patient)
+    db.session.get(Outcome, outcome.id).actual_response = 'partial'
+    db.session.commit()
+
+    body = client.get('/api/patients', query_string={'since': tokens['patients']}, headers=headers).get_json()
+    assert sorted(p['id'] for p in body['patients']) == [pid[0], new_patient.id]
+    assert body['deleted'] == sorted([pid[1], pid[2]])
+    assert body['sync_token'] > tokens['patients']
+
+    for key in ('appointments', 'reports'):
+        body = client.get(urls[key], query_string={'since': tokens[key]}, headers=headers).get_json()
+        assert body[key] == [], key
+        assert len(body['deleted']) == 1, (key, body)
+
+    body = client.get(urls['outcomes'], query_string={'since': tokens['outcomes']}, headers=headers).get_json()
+    assert [o['actual_response'] for o in body['outcomes']] == ['partial']
+    assert body['deleted'] == []
+
+    # Deltas page like full lists; tombstones come with the first page only
+    first = client.get('/api/patients', query_string={'since': tokens['patients'], 'limit': 1},
+                       headers=headers).get_json()
+    assert len(first['patients']) == 1 and first['next_cursor'] and first['deleted']
+    rest = client.get('/api/patients', query_string={'since': tokens['patients'], 'limit': 1,
+                                                     'cursor': first['next_cursor']},
+                      headers=headers).get_json()
+    assert len(rest['patients']) == 1 and 'deleted' not in rest
+
+    # A projection without id still gets the deleted ids
+    body = client.get('/api/patients', query_string={'since': tokens['patients'], 'fields': 'name'},
+                      headers=headers)
+    assert body.status_code == 200, body.get_json()
+    assert sorted(p['name'] for p in body.get_json()['patients']) == ['Delta Patient 0 (renamed)', 'Delta Patient 4']
+    assert body.get_json()['deleted'] == sorted([pid[1], pid[2]])
+    print("✓ Deltas hold changed rows plus deleted and moved-away ids")
+
+    assert client.get('/api/patients?since=yesterday', headers=headers).status_code == 400
+    too_old = (datetime.utcnow() - timedelta(days=delta_sync.retention_days + 1)).isoformat()
+    assert client.get('/api/patients', query_string={'since': too_old}, headers=headers).status_code == 410
+    print("✓ Invalid tokens get 400, tokens older than the deletion log get 410")
+
+
+def test_prune_tombstones(app):
+    """Pruning drops only tombstones older than the retention window"""
+    old = Tombstone(entity='patients', record_id=1, doctor_id=-1,
+                    deleted_at=datetime.utcnow() - timedelta(days=delta_sync.retention_days + 1))
+    recent = Tombstone(entity='patients', record_id=2, doctor_id=-1)
+    db.session.add_all([old, recent])
+    db.session.commit()
+    assert delta_sync.prune_tombstones() >= 1
+    assert [t.record_id for t in Tombstone.query.filter_by(doctor_id=-1)] == [2]
+    print("✓ prune-tombstones keeps the retention window")
@@ -0,0 +1,95 @@
+"""
+Test the streaming feature drift monitor
+"""
+import sys
+import os
+import random
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pandas as pd
+from drift_monitor import DriftMonitor, build_training_histograms, psi, ks_statistic
+from ml_service import ml_service
+
+
+def _training_frame(n=2000, seed=0):
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        'age': [rng.randint(25, 90) for _ in range(n)],
+        'cancer_stage': [rng.randint(1, 4) for _ in range(n)],
+        'targetable_mutation': [rng.randint(0, 1) for _ in range(n)],
+        'comorbidity_score': [round(rng.random(), 2) for _ in range(n)],
+    })
+
+
+def test_histogram_bins():
+    """Discrete features get one bin per value, continuous ones get quantile bins"""
+    histograms = build_training_histograms(_training_frame())['features']
+    assert histograms['targetable_mutation']['edges'] == [0.5]
+    assert histograms['cancer_stage']['edges'] == [1.5, 2.5, 3.5]
+    assert len(histograms['age']['counts']) == len(histograms['age']['edges']) + 1
+    assert sum(histograms['comorbidity_score']['counts']) == 2000
+    print("✓ Training histograms built")
+
+
+def test_psi_and_ks():
+    assert psi([10, 20, 30], [10, 20, 30]) < 1e-9
+    assert ks_statistic([10, 20, 30], [1, 2, 3]) < 1e-9
+    assert psi([50, 50], [95, 5]) > 0.25
+    assert abs(ks_statistic([50, 50], [95, 5]) - 0.45) < 1e-9
+    print("✓ PSI / KS statistics")
+
+
+def test_monitor_detects_shift():
+    """Inputs from the training distribution are stable; an older, sicker cohort drifts"""
+    monitor = DriftMonitor(build_training_histograms(_training_frame()))
+    for row in _training_frame(n=1000, seed=1).to_dict('records'):
+        monitor.observe(row)
+    report = monitor.report()
+    assert report['observed'] == 1000
+    assert all(f['status'] == 'stable' for f in report['features'].values()), report['features']
+
+    monitor.reset()
+    for _ in range(500):
+        monitor.observe({'age': 85, 'cancer_stage': 4, 'targetable_mutation': 0, 'comorbidity_score': 0.9})
+    report = monitor.report()
+    assert report['features']['age']['status'] == 'significant'
+    assert report['features']['cancer_stage']['ks'] > 0.5
+    # Memory stays bounded by the number of bins, not the number of observations
+    assert sum(report['features']['age']['observed_counts']) == 500
+    print("✓ Drift monitor detects distribution shift")
+
+
+def test_every_scored_input_is_observed_once(client, doctor, auth_headers, monkeypatch):
+    """Create, recompute and update are each counted once; serving the stored copy is not"""
+    if not ml_service.is_available():
+        print("⚠ ML model not loaded. Run: python create_model_from_notebook.py --synthetic")
+        return
+    monitor = DriftMonitor(build_training_histograms(_training_frame()))
+    monkeypatch.setattr(ml_service, 'drift_monitor', monitor)
+    headers = auth_headers(doctor)
+
+    response = client.post('/api/patients', headers=headers, json={
+        'name': 'Drift Patient', 'age': 70, 'gender': 'female', 'cancer_type': 'Lung Cancer',
+        'stage': 'IV', 'clinical_data': {'comorbidity_score': 0.95, 'targetable_mutation': True}})
+    assert response.status_code == 201, response.get_json()
+    patient_id = response.get_json()['patient']['id']
+    report = monitor.report()
+    assert report['observed'] == 1
+    # The stored clinical data is what gets scored, not the 0.3 default
+    assert report['features']['comorbidity_score']['observed_counts'][-1] == 1
+
+    url = f'/api/recommendations/patient/{patient_id}'
+    assert client.get(url, headers=headers).status_code == 200
+    assert monitor.report()['observed'] == 2
+    assert client.get(url, headers=headers).status_code == 200
+    assert monitor.report()['observed'] == 2
+
+    client.put(f'/api/patients/{patient_id}', headers=headers, json={'age': 71})
+    assert monitor.report()['observed'] == 3
+    print("✓ Drift monitor counts each scored input once")
+
+
+if __name__ == '__main__':
+    test_histogram_bins()
+    test_psi_and_ks()
+    test_monitor_detects_shift()
@@ -0,0 +1,107 @@
+"""
+Test the per-doctor server-sent events stream and its pub/sub broker
+"""
+import json
+
+import events
+from events import EventBroker
+from datetime import datetime
+
+
+def _parse(chunk):
+    """(id, event, data) of one SSE message"""
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n'))
+    return fields.get('id'), fields.get('event'), json.loads(fields['data']) if 'data' in fields else None
+
+
+def test_broker_replay_and_resync():
+    """Missed events replay after Last-Event-ID; unknown or evicted ids get a resync"""
+    broker = EventBroker(buffer_size=3)
+    first = broker.publish(1, 'patient.created', {'id': 1})
+    broker.publish(2, 'patient.created', {'id': 9})  # another doctor
+    broker.publish(1, 'patient.updated', {'id': 1})
+
+    subscription, replay = broker.subscribe(1, first)
+    assert [e[1] for e in replay] == ['patient.updated']
+    broker.publish(1, 'report.generated', {'id': 5})
+    broker.publish(2, 'report.generated', {'id': 6})
+    assert subscription.get(timeout=0.1)[1] == 'report.generated'
+    assert subscription.get(timeout=0.01) is None
+    subscription.close()
+    assert broker.subscriber_count(1) == 0
+
+    assert [e[1] for e in broker.subscribe(1, 'old-epoch-3')[1]] == ['resync']
+    for i in range(3):
+        broker.publish(1, 'patient.updated', {'id': i})
+    # `first` has been pushed out of doctor 1's three-event buffer
+    assert [e[1] for e in broker.subscribe(1, first)[1]] == ['resync']
+    assert broker.subscribe(1, None)[1] == []
+    print("✓ Broker replays after Last-Event-ID and resyncs when it cannot")
+
+
+def test_event_stream_endpoint(client, doctor, auth_token, monkeypatch):
+    """Route handlers feed the stream; replay, live events and heartbeats arrive in order"""
+    monkeypatch.setattr(events, 'HEARTBEAT_SECONDS', 0.05)
+    doctor_id = doctor.id
+    token = auth_token(doctor)
+    headers = {'Authorization': f'Bearer {token}'}
+    stream = None
+
+    try:
+        marker = events.publish(doctor_id, 'patient.updated', id=0)
+        created = client.post('/api/patients', headers=headers, json={
+            'name': 'Events Patient', 'age': 61, 'gender': 'female',
+            'cancer_type': 'Lung Cancer', 'stage': 'II',
+        })
+        assert created.status_code == 201, created.get_json()
+        patient_id = created.get_json()['patient']['id']
+
+        # EventSource can't send headers: a stream-only token in the query, resume point in Last-Event-ID
+        stream_token = client.post('/api/events/token', headers=headers).get_json()['token']
+        stream = client.get(f'/api/events?stream_token={stream_token}', headers={'Last-Event-ID': marker},
+                            buffered=False)
+        assert stream.status_code == 200
+        assert stream.mimetype == 'text/event-stream'
+        assert stream.headers['Cache-Control'] == 'no-cache'
+        chunks = iter(stream.response)
+        assert next(chunks).startswith(b'retry: ')
+        _, event_type, data = _parse(next(chunks))
+        assert (event_type, data) == ('patient.created', {'id': patient_id})
+        assert events.broker.subscriber_count(doctor_id) == 1
+
+        assert next(chunks) == b': heartbeat\n\n'
+
+        client.post('/api/appointments', headers=headers, json={
+            'patient_id': patient_id, 'appointment_date': datetime.utcnow().isoformat(),
+        })
+        event_id, event_type, data = _parse(next(chunks))
+        assert event_type == 'appointment.created' and data['patient_id'] == patient_id
+        assert event_id.startswith(events.broker.epoch)
+
+        client.delete(f'/api/patients/{patient_id}', headers=headers)
+        assert _parse(next(chunks))[1:] == ('patient.deleted', {'id': patient_id})
+
+        stream.close()
+        stream = None
+        assert events.broker.subscriber_count(doctor_id) == 0
+        print("✓ Stream replays, delivers live events and heartbeats, and unsubscribes on close")
+    finally:
+        if stream is not None:
+            stream.close()
+
+
+def test_event_stream_tokens(client, doctor, auth_token):
+    """The session JWT is never accepted in the URL, and a stream token only opens the stream"""
+    token = auth_token(doctor)
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.post('/api/events/token', headers=headers)
+    assert response.status_code == 200
+    stream_token = response.get_json()['token']
+    assert response.get_json()['expires_in'] > 0
+
+    assert client.get(f'/api/events?access_token={token}').status_code == 400
+    assert client.get(f'/api/events?stream_token={token}').status_code == 401
+    assert client.get('/api/events?stream_token=not-a-jwt').status_code == 401
+    # Stream tokens are rejected as bearer tokens everywhere else
+    assert client.get('/api/reports', headers={'Authorization': f'Bearer {stream_token}'}).status_code == 401
+    print("✓ Stream tokens only open the stream; session tokens in the URL are refused")
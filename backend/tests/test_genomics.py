@@ -0,0 +1,111 @@
+"""
+Test the genomics side tables (patient_mutations, patient_biomarkers)
+"""
+from app import db, Patient, PatientMutation, PatientBiomarkers
+import genomics
+from sqlalchemy import select
+
+
+def _clinical_data(mutations, pd_l1=None, tmb=None, msi=None):
+    return {'genomics': {'mutations': mutations,
+                         'biomarkers': {'PD-L1': pd_l1, 'TMB': tmb, 'MSI_Status': msi}}}
+
+
+def _side_rows(doctor_ids):
+    mutations = sorted(db.session.execute(
+        select(PatientMutation.patient_id, PatientMutation.doctor_id, PatientMutation.gene)
+        .where(PatientMutation.doctor_id.in_(doctor_ids))
+    ).all())
+    biomarkers = sorted(db.session.execute(
+        select(PatientBiomarkers.patient_id, PatientBiomarkers.doctor_id, PatientBiomarkers.pd_l1,
+               PatientBiomarkers.tmb, PatientBiomarkers.msi_status)
+        .where(PatientBiomarkers.doctor_id.in_(doctor_ids))
+    ).all())
+    return mutations, biomarkers
+
+
+def test_extract_genomics():
+    """Genes are normalised and malformed values are skipped"""
+    genes, markers = genomics.extract_genomics(
+        _clinical_data(['egfr', {'gene': 'ALK'}, 'EGFR', '', 7], pd_l1='55', tmb=12.5, msi='msi-h'))
+    assert genes == ['ALK', 'EGFR']
+    assert markers == {'pd_l1': 55.0, 'tmb': 12.5, 'msi_status': 'MSI-H'}
+    assert genomics.extract_genomics(None) == ([], None)
+    assert genomics.extract_genomics({'genomics': {'EGFR': 'L858R'}}) == ([], None)
+    assert genomics.extract_genomics({'genomics': {'biomarkers': {'TMB': 'high'}}}) == ([], None)
+    print("✓ Genomics are extracted from clinical_data tolerantly")
+
+
+def test_side_tables_follow_patient_writes(client, doctor, other_doctor, auth_headers):
+    """Inserts, clinical_data edits, reassignment and deletes keep the side tables current"""
+    ids = [doctor.id, other_doctor.id]
+    headers = auth_headers(doctor)
+
+    egfr = Patient(name='EGFR IV', age=61, gender='male', cancer_type='Lung Cancer', stage='IV',
+                   doctor_id=ids[0], clinical_data=_clinical_data(['EGFR', 'TP53'], 80, 14.2, 'MSS'))
+    alk = Patient(name='ALK II', age=54, gender='female', cancer_type='Lung Cancer', stage='II',
+                  doctor_id=ids[0], clinical_data=_clinical_data(['ALK'], 5, 3.0, 'MSI-H'))
+    plain = Patient(name='No Genomics', age=70, gender='female', cancer_type='Lung Cancer', stage='IV',
+                    doctor_id=ids[0])
+    db.session.add_all([egfr, alk, plain])
+    db.session.commit()
+    pid = [egfr.id, alk.id, plain.id]
+
+    mutations, biomarkers = _side_rows(ids)
+    assert mutations == sorted([(pid[0], ids[0], 'EGFR'), (pid[0], ids[0], 'TP53'), (pid[1], ids[0], 'ALK')])
+    assert biomarkers == sorted([(pid[0], ids[0], 80.0, 14.2, 'MSS'), (pid[1], ids[0], 5.0, 3.0, 'MSI-H')])
+    print("✓ New patients get their mutation and biomarker rows")
+
+    response = client.get('/api/patients', query_string={'mutation': 'egfr', 'stage': 'IV', 'fields': 'id'},
+                          headers=headers)
+    assert [p['id'] for p in response.get_json()['patients']] == [pid[0]]
+    response = client.get('/api/patients', query_string={'msi_status': 'msi-h', 'fields': 'id'},
+                          headers=headers)
+    assert [p['id'] for p in response.get_json()['patients']] == [pid[1]]
+    print("✓ ?mutation= and ?msi_status= filter through the side tables")
+
+    # Edit genomics, add them to a patient without, move one patient, delete another
+    db.session.get(Patient, pid[0]).clinical_data = _clinical_data(['KRAS'], tmb=20.0)
+    db.session.get(Patient, pid[2]).set_clinical_data(_clinical_data(['EGFR']))
+    db.session.get(Patient, pid[1]).doctor_id = ids[1]
+    db.session.commit()
+    mutations, biomarkers = _side_rows(ids)
+    assert mutations == sorted([(pid[0], ids[0], 'KRAS'), (pid[1], ids[1], 'ALK'), (pid[2], ids[0], 'EGFR')])
+    assert biomarkers == sorted([(pid[0], ids[0], None, 20.0, None), (pid[1], ids[1], 5.0, 3.0, 'MSI-H')])
+
+    db.session.delete(db.session.get(Patient, pid[1]))
+    db.session.commit()
+    mutations, biomarkers = _side_rows(ids)
+    assert pid[1] not in {row[0] for row in mutations + biomarkers}
+    print("✓ Edits, reassignment and deletes are mirrored")
+
+    # A failed transaction leaves no side rows behind
+    db.session.add(Patient(name='Rolled Back', age=40, gender='male', cancer_type='Lung Cancer',
+                           doctor_id=ids[0], clinical_data=_clinical_data(['BRAF'])))
+    db.session.flush()
+    db.session.rollback()
+    assert ('BRAF',) not in db.session.execute(
+        select(PatientMutation.gene).where(PatientMutation.doctor_id == ids[0])).all()
+
+    # The backfill rebuilds the same rows from clinical_data
+    expected = _side_rows(ids)
+    db.session.execute(PatientMutation.__table__.delete().where(PatientMutation.doctor_id.in_(ids)))
+    db.session.commit()
+    assert genomics.backfill_genomics(batch_size=2) >= 2
+    assert _side_rows(ids) == expected
+    print("✓ backfill-genomics rebuilds the side tables")
+
+
+def test_mutation_query_uses_index(app):
+    """A per-doctor gene lookup is an index search, not a scan of patients' JSON"""
+    if db.engine.dialect.name != 'sqlite':
+        print("- Query plan check is SQLite-only, skipped")
+        return
+    sql = select(Patient.id).where(
+        Patient.doctor_id == 1, Patient.stage == 'IV',
+        Patient.id.in_(genomics.patients_with_mutation(1, ['EGFR'])),
+    ).compile(db.engine, compile_kwargs={'literal_binds': True})
+    plan = ' '.join(row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+    assert 'ix_patient_mutations_doctor_id_gene' in plan, plan
+    assert 'SCAN patients' not in plan, plan
+    print("✓ Mutation cohort query uses ix_patient_mutations_doctor_id_gene")
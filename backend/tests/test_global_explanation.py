@@ -0,0 +1,117 @@
+"""
+Test the cohort-level SHAP summary (global explanation) and its cache
+"""
+import threading
+import time
+
+from app import db, Patient
+from ml_service import ml_service, shap_summary_cache, ShapSummaryCache
+import routes
+from clinical_data_helpers import generate_clinical_data
+
+
+def test_shap_summary_cache_serves_stale_and_refreshes():
+    """Stale entries are returned immediately and refreshed in the background"""
+    cache = ShapSummaryCache(ttl_seconds=0)
+    key = (1, 'v1', 10)
+
+    summary, stale = cache.get(key)
+    assert summary is None and stale
+
+    cache.set(key, {'features': [], 'sample_size': 1})
+    time.sleep(0.01)
+    summary, stale = cache.get(key)
+    assert summary == {'features': [], 'sample_size': 1}
+    assert stale
+
+    assert cache.refresh_async(key, lambda: {'features': [], 'sample_size': 2})
+    for _ in range(100):
+        summary, _ = cache.get(key)
+        if summary['sample_size'] == 2:
+            break
+        time.sleep(0.01)
+    assert summary['sample_size'] == 2
+    print("✓ Cache serves stale entries and refreshes them in the background")
+
+
+def test_shap_summary_cache_is_bounded():
+    """Client-chosen sample sizes cannot grow the cache past max_entries"""
+    cache = ShapSummaryCache(max_entries=3)
+    for sample_size in range(1, 6):
+        cache.set((1, 'v1', sample_size), {'sample_size': sample_size})
+        if sample_size == 3:
+            cache.get((1, 'v1', 1))  # most recently used: kept
+    assert len(cache) == 3
+    assert cache.get((1, 'v1', 1))[0] == {'sample_size': 1}
+    assert cache.get((1, 'v1', 2))[0] is None and cache.get((1, 'v1', 3))[0] is None
+    print("✓ Cache evicts the least recently used summary past max_entries")
+
+
+def test_global_shap_summary_matches_per_row_explanations():
+    """Batched TreeSHAP gives the same mean |SHAP| as explaining each row"""
+    if not ml_service.is_available():
+        print("⚠ ML model not loaded. Run: python create_model_from_notebook.py --synthetic")
+        return
+
+    patients = [
+        {'age': 45, 'stage': 'I', 'targetable_mutation': True, 'comorbidity_score': 0.2},
+        {'age': 71, 'stage': 'IV', 'targetable_mutation': False, 'comorbidity_score': 0.8},
+    ]
+    summary = ml_service.get_global_shap_summary(patients)
+
+    assert summary['sample_size'] == 2
+    assert summary['model_version'] == ml_service.model_version
+    importances = [f['mean_abs_shap'] for f in summary['features']]
+    assert importances == sorted(importances, reverse=True)
+
+    from ml_service import TREATMENTS
+    rows = [ml_service._build_input_df(p, t) for p in patients for t in TREATMENTS]
+    per_row = [abs(ml_service._positive_class_shap(ml_service.preprocessor.transform(r))[0]) for r in rows]
+    expected = dict(zip(ml_service.preprocessor.get_feature_names_out(), sum(per_row) / len(per_row)))
+    for f in summary['features']:
+        assert abs(f['mean_abs_shap'] - expected[f['feature']]) < 1e-3
+    print(f"✓ Global summary over {len(rows)} rows matches per-row SHAP")
+
+
+def test_global_explanation_endpoint(client, doctor, auth_headers, monkeypatch):
+    """Endpoint returns a per-doctor summary and serves it from cache on repeat views"""
+    for i in range(5):
+        patient = Patient(name=f'SHAP Patient {i}', age=40 + i * 8, gender='female',
+                          cancer_type='Lung Cancer', stage=['I', 'II', 'III', 'IV', 'II'][i],
+                          doctor_id=doctor.id)
+        patient.set_clinical_data(generate_clinical_data('Lung Cancer', patient.stage, patient.age))
+        db.session.add(patient)
+    db.session.commit()
+
+    headers = auth_headers(doctor)
+    first = client.get('/api/recommendations/global-explanation?sample_size=3', headers=headers)
+    assert first.status_code == 200, first.get_json()
+    body = first.get_json()
+    assert body['stale'] is False
+
+    if ml_service.is_available():
+        assert body['sample_size'] == 3
+        assert body['features']
+
+    second = client.get('/api/recommendations/global-explanation?sample_size=3', headers=headers)
+    assert second.get_json()['generated_at'] == body.get('generated_at')
+    print("✓ Global explanation endpoint served from cache on repeat view")
+
+    # A stale hit is a pure cache read; sampling runs on the refresh thread
+    sampled_on = []
+    original = routes._sample_cohort_inputs
+
+    def sample(doctor_id, sample_size):
+        sampled_on.append(threading.get_ident())
+        return original(doctor_id, sample_size)
+
+    monkeypatch.setattr(routes, '_sample_cohort_inputs', sample)
+    monkeypatch.setattr(shap_summary_cache, 'ttl_seconds', 0)
+    stale = client.get('/api/recommendations/global-explanation?sample_size=3', headers=headers)
+    assert stale.get_json()['stale'] is True
+    for _ in range(200):
+        if sampled_on and not shap_summary_cache._refreshing:
+            break
+        time.sleep(0.01)
+    assert sampled_on and threading.get_ident() not in sampled_on
+    print("✓ Stale hits sample the cohort off the request thread")
@@ -0,0 +1,62 @@
+"""
+Test the JSON column types on Patient/Report/Outcome
+"""
+from app import db, Patient, Report, Outcome
+
+
+def test_json_columns_round_trip(doctor):
+    """Values round-trip, decode once per load, and empty values are SQL NULL"""
+    with_data = Patient(name='JSON Patient', age=55, gender='female', cancer_type='Lung Cancer',
+                        stage='II', doctor_id=doctor.id)
+    with_data.set_clinical_data({'genomics': {'EGFR': 'L858R'}, 'comorbidity_score': 0.25})
+    with_data.set_ml_recommendations({'treatments': [{'treatment': 'targeted'}]})
+    without_data = Patient(name='Empty JSON Patient', age=60, gender='male', cancer_type='Lung Cancer',
+                           stage='I', doctor_id=doctor.id)
+    without_data.set_ml_recommendations({})
+    db.session.add_all([with_data, without_data])
+    db.session.flush()
+    db.session.add(Report(patient_id=with_data.id, doctor_id=doctor.id, report_type='comprehensive',
+                          report_data={'risk_assessment': {'score': 42.0}}))
+    db.session.commit()
+
+    db.session.expire_all()
+    loaded = db.session.get(Patient, with_data.id)
+    assert loaded.get_clinical_data() == {'genomics': {'EGFR': 'L858R'}, 'comorbidity_score': 0.25}
+    assert loaded.get_clinical_data() is loaded.get_clinical_data()
+    assert loaded.get_treatment_protocol() == {}
+
+    with_recs = Patient.query.filter(
+        Patient.doctor_id == doctor.id, Patient.ml_recommendations.isnot(None)
+    ).all()
+    assert [p.id for p in with_recs] == [with_data.id]
+
+    report = Report.query.filter_by(patient_id=with_data.id).one()
+    assert report.to_dict()['report_data'] == {'risk_assessment': {'score': 42.0}}
+    print("✓ JSON columns round-trip and store empty values as NULL")
+
+
+def test_json_column_edits_are_saved(doctor):
+    """In-place edits through the getters, and nested edits written back via the setters, persist"""
+    patient = Patient(name='Mutable JSON Patient', age=55, gender='female', cancer_type='Lung Cancer',
+                      stage='II', doctor_id=doctor.id)
+    patient.set_clinical_data({'comorbidity_score': 0.2, 'genomics': {'mutations': ['EGFR']}})
+    db.session.add(patient)
+    db.session.flush()
+    outcome = Outcome(patient_id=patient.id, doctor_id=doctor.id, treatment_type='targeted')
+    outcome.set_outcome_data({'side_effects': []})
+    db.session.add(outcome)
+    db.session.commit()
+
+    patient.get_clinical_data()['comorbidity_score'] = 0.6
+    outcome.get_outcome_data()['quality_of_life'] = 7
+    db.session.commit()
+
+    clinical_data = patient.get_clinical_data()
+    clinical_data['genomics']['mutations'].append('ALK')
+    patient.set_clinical_data(clinical_data)
+    db.session.commit()
+
+    db.session.expire_all()
+    assert patient.get_clinical_data() == {'comorbidity_score': 0.6, 'genomics': {'mutations': ['EGFR', 'ALK']}}
+    assert outcome.get_outcome_data() == {'side_effects': [], 'quality_of_life': 7}
+    print("✓ Edits to JSON column values are persisted")
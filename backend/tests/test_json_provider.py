@@ -0,0 +1,57 @@
+"""
+Test the orjson JSON provider against Flask's default provider
+"""
+import sys
+import os
+import decimal
+from datetime import date, datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+from app import app
+from json_provider import HAS_ORJSON, OrjsonProvider
+
+
+def test_orjson_provider_matches_default():
+    """Same decoded output as the stdlib provider, plus numpy support"""
+    if not HAS_ORJSON:
+        print("⚠ orjson not installed. Run: pip install orjson")
+        return
+
+    orjson_provider = OrjsonProvider(app)
+    default_provider = DefaultJSONProvider(app)
+    payload = {
+        'patients': [{'id': 1, 'name': 'Zoë', 'risk_score': 42.5, 'diagnosis_date': date(2024, 3, 1)}],
+        'generated_at': datetime(2024, 3, 2, 10, 30),
+        'dose_mg': decimal.Decimal('12.50'),
+        'nested': {'b': [1, 2, None], 'a': True},
+    }
+    with app.app_context():
+        ours = orjson_provider.response(payload)
+        theirs = default_provider.response(payload)
+    assert ours.mimetype == 'application/json'
+    assert default_provider.loads(ours.get_data()) == default_provider.loads(theirs.get_data())
+    assert ours.get_data().endswith(b'\n')
+
+    numpy_payload = {'p': np.float32(0.25), 'n': np.int64(3), 'arr': np.array([0.5, 1.5])}
+    assert orjson_provider.loads(orjson_provider.dumps(numpy_payload)) == {'p': 0.25, 'n': 3, 'arr': [0.5, 1.5]}
+    print("✓ orjson provider output matches the default provider")
+
+
+def test_app_uses_configured_provider():
+    """JSON_PROVIDER=orjson (the default) installs the orjson provider"""
+    if not HAS_ORJSON:
+        print("⚠ orjson not installed. Run: pip install orjson")
+        return
+    if app.config['JSON_PROVIDER'] == 'orjson':
+        assert isinstance(app.json, OrjsonProvider)
+    response = app.test_client().get('/api/health')
+    assert response.status_code == 200 and response.get_json()
+    print(f"✓ App serves JSON with the {type(app.json).__name__}")
+
+
+if __name__ == '__main__':
+    test_orjson_provider_matches_default()
+    test_app_uses_configured_provider()
@@ -0,0 +1,48 @@
+"""
+Parity test: ONNX Runtime backend vs the calibrated sklearn model
+"""
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from create_model_from_notebook import create_model, generate_synthetic_dataset
+from ml_service import OncoAIMLAdapter, HAS_ONNXRUNTIME
+
+
+def test_onnx_matches_sklearn():
+    try:
+        from export_onnx import export_onnx
+    except ImportError:
+        print("⚠ skl2onnx not installed. Skipping ONNX parity test.")
+        return
+    if not HAS_ONNXRUNTIME:
+        print("⚠ onnxruntime not installed. Skipping ONNX parity test.")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        create_model(df=generate_synthetic_dataset(1500, random_state=11), models_dir=tmp)
+        model_path = os.path.join(tmp, "model_calibrated.pkl")
+        export_onnx(model_path)
+
+        sklearn_adapter = OncoAIMLAdapter(model_path=model_path, inference_backend="sklearn")
+        onnx_adapter = OncoAIMLAdapter(model_path=model_path, inference_backend="onnx")
+        assert onnx_adapter.inference_backend == "onnx"
+
+        data = generate_synthetic_dataset(3000, random_state=5).drop(columns=["treatment_response"])
+        expected = sklearn_adapter._predict_positive_proba(data)
+        actual = onnx_adapter._predict_positive_proba(data)
+        assert np.abs(expected - actual).max() < 1e-4, np.abs(expected - actual).max()
+
+        patient = {"age": 58, "stage": "III", "targetable_mutation": True, "comorbidity_score": 0.42}
+        sk_recs = sklearn_adapter.generate_treatment_recommendations(patient)
+        ox_recs = onnx_adapter.generate_treatment_recommendations(patient)
+        assert [t["treatment"] for t in sk_recs["treatments"]] == [t["treatment"] for t in ox_recs["treatments"]]
+        for a, b in zip(sk_recs["treatments"], ox_recs["treatments"]):
+            assert abs(a["response_probability"] - b["response_probability"]) <= 0.001
+        print(f"✓ ONNX backend matches sklearn on {len(data)} rows")
+
+
+if __name__ == '__main__':
+    test_onnx_matches_sklearn()
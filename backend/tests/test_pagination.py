@@ -0,0 +1,52 @@
+"""
+Test keyset pagination of the patients, appointments and reports lists
+"""
+from app import db, Patient, Appointment, Report
+from datetime import datetime, timedelta
+
+N_ROWS = 7
+
+
+def _walk(client, url, key, headers, limit):
+    """Follow next_cursor until exhausted; returns the ids in page order"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        query = f'?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url + query, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert len(body[key]) <= limit
+        ids.extend(row['id'] for row in body[key])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return ids, pages
+
+
+def test_keyset_pagination(client, doctor, auth_headers):
+    """Pages cover the full list exactly once; no params keeps the old response"""
+    for i in range(N_ROWS):
+        patient = Patient(name=f'Page Patient {i}', age=50 + i, gender='female',
+                          cancer_type='Breast Cancer', stage='II', doctor_id=doctor.id)
+        db.session.add(patient)
+        db.session.flush()
+        db.session.add(Appointment(patient_id=patient.id, doctor_id=doctor.id,
+                                   appointment_date=datetime.utcnow() + timedelta(days=i)))
+        db.session.add(Report(patient_id=patient.id, doctor_id=doctor.id, report_type='comprehensive'))
+    db.session.commit()
+
+    headers = auth_headers(doctor)
+    for url, key in [('/api/patients', 'patients'),
+                     ('/api/appointments', 'appointments'),
+                     ('/api/reports', 'reports')]:
+        full = client.get(url, headers=headers).get_json()
+        assert 'next_cursor' not in full
+        assert len(full[key]) == N_ROWS
+
+        ids, pages = _walk(client, url, key, headers, limit=3)
+        assert ids == sorted(r['id'] for r in full[key])
+        assert pages == 3
+
+        bad = client.get(f'{url}?cursor=not-a-cursor', headers=headers)
+        assert bad.status_code == 400
+        print(f"✓ {url}: {N_ROWS} rows in {pages} pages")
@@ -0,0 +1,91 @@
+"""
+Test GET /api/patients/<id>/bundle: contents and a fixed query budget
+"""
+from app import db, Patient, Appointment, Outcome
+from tests.query_counter import count_queries
+from datetime import datetime, timedelta
+
+# user lookup, patient, appointments, outcomes
+MAX_QUERIES = 4
+
+
+def _seed(doctor_id, patient_id, n):
+    now = datetime.utcnow()
+    for i in range(n):
+        db.session.add(Appointment(patient_id=patient_id, doctor_id=doctor_id,
+                                   appointment_date=now + timedelta(days=n - i)))
+        db.session.add(Outcome(patient_id=patient_id, doctor_id=doctor_id, treatment_type='chemo',
+                               predicted_response_probability=0.5, actual_response='partial'))
+    db.session.commit()
+
+
+def test_patient_bundle(client, doctor, other_doctor, auth_headers):
+    """One response with the patient's own rows, built with the same number of queries at any size"""
+    ids = [doctor.id, other_doctor.id]
+    headers, other_headers = auth_headers(doctor), auth_headers(other_doctor)
+
+    patients = [Patient(name=f'Bundle Patient {i}', age=55, gender='male', cancer_type='Lung Cancer',
+                        stage='III', doctor_id=ids[0]) for i in range(2)]
+    db.session.add_all(patients)
+    db.session.commit()
+    pid, neighbour = patients[0].id, patients[1].id
+    _seed(ids[0], neighbour, 3)  # the doctor's other patient: must not leak into the bundle
+
+    counts = []
+    for n in (2, 10):
+        _seed(ids[0], pid, n if not counts else n - 2)
+        db.session.expunge_all()
+        with count_queries(db.engine) as counter:
+            response = client.get(f'/api/patients/{pid}/bundle', headers=headers)
+        assert response.status_code == 200, response.get_json()
+        counts.append(counter.count)
+        body = response.get_json()
+        assert body['patient']['id'] == pid
+        assert len(body['appointments']) == n and len(body['outcomes']) == n
+        assert {a['patient_id'] for a in body['appointments']} == {pid}
+        assert all(a['patient_name'] == 'Bundle Patient 0' for a in body['appointments'])
+        assert [a['appointment_date'] for a in body['appointments']] == \
+            sorted(a['appointment_date'] for a in body['appointments'])
+        assert len(body['comparisons']) == n
+        assert body['comparisons'][0]['actual']['response'] == 'partial'
+    assert counts[0] == counts[1] <= MAX_QUERIES, counts
+    print(f"✓ Bundle built with {counts[1]} queries for 2 and 10 rows")
+
+    # The comparison endpoint and the bundle agree
+    comparison = client.get(f'/api/outcomes/comparison/patient/{pid}', headers=headers).get_json()
+    assert sorted(map(str, comparison['comparisons'])) == sorted(map(str, body['comparisons']))
+
+    # Stored recommendations and their freshness
+    assert body['recommendations'] == {} and body['recommendations_stale'] is True
+    computed = client.get(f'/api/recommendations/patient/{pid}', headers=headers).get_json()
+    body = client.get(f'/api/patients/{pid}/bundle', headers=headers).get_json()
+    assert body['recommendations'] == computed['recommendations']
+    assert body['recommendations_stale'] is False
+    print("✓ Bundle carries stored recommendations and a staleness flag")
+
+    assert client.get(f'/api/patients/{pid}/bundle', headers=other_headers).status_code == 404
+
+
+def test_patient_bundle_survives_bad_model_inputs(client, doctor, auth_headers, monkeypatch):
+    """Unusable optional inputs only mark recommendations stale; the bundle still loads"""
+    import routes
+    headers = auth_headers(doctor)
+    patient = Patient(name='Bundle Null Score', age=55, gender='male', cancer_type='Lung Cancer',
+                      stage='III', doctor_id=doctor.id)
+    patient.set_clinical_data({'comorbidity_score': None})
+    db.session.add(patient)
+    db.session.commit()
+    url = f'/api/patients/{patient.id}/bundle'
+
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['patient']['name'] == 'Bundle Null Score'
+
+    def broken(patient_data):
+        raise TypeError('bad model input')
+
+    monkeypatch.setattr(routes, 'recommendation_fingerprint', broken)
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['recommendations_stale'] is True
+    print("✓ Bundle loads with a null comorbidity score or a failing staleness check")
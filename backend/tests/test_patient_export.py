@@ -0,0 +1,106 @@
+"""
+Test GET /api/patients/export (streamed ndjson, csv and parquet)
+"""
+from app import db, Patient
+import patient_export
+from datetime import date
+import csv
+import io
+import json
+
+CLINICAL_DATA = {
+    'targetable_mutation': True,
+    'comorbidity_score': 0.45,
+    'genomics': {'mutations': ['egfr', {'gene': 'TP53'}],
+                 'biomarkers': {'PD-L1': 60, 'TMB': 12.5, 'MSI_Status': 'MSS'}},
+    'histopathology': {'grade': 'G2', 'ki67': 30, 'tumor_size_cm': 3.2, 'lymph_nodes_involved': 2},
+    'height_cm': 172, 'weight_kg': 70, 'smoker': False,
+    'comorbidities': ['hypertension', 'diabetes'],
+}
+
+
+def test_flatten():
+    """clinical_data is flattened into fixed columns; malformed values become empty"""
+    row = (1, 'Flat', 60, 'female', None, None, None, None, 'Lung Cancer', None, 'IV', date(2024, 3, 1),
+           80.0, 'high', None, None)
+    record = patient_export.flatten(row + (CLINICAL_DATA,))
+    assert list(record) == [name for name, _ in patient_export.COLUMNS]
+    assert record['clinical_mutations'] == 'EGFR;TP53'
+    assert record['clinical_pd_l1'] == 60.0 and record['clinical_msi_status'] == 'MSS'
+    assert record['clinical_grade'] == 'G2' and record['clinical_lymph_nodes_involved'] == 2
+    assert record['clinical_comorbidities'] == 'hypertension;diabetes'
+
+    bad = patient_export.flatten(row + ({'height_cm': 'tall', 'smoker': 'no', 'histopathology': [1]},))
+    assert bad['clinical_height_cm'] is None and bad['clinical_smoker'] is None and bad['clinical_grade'] is None
+    assert patient_export.flatten(row + (None,))['clinical_mutations'] is None
+    print("✓ clinical_data flattens into typed clinical_* columns")
+
+
+def test_export_formats(client, doctor, other_doctor, auth_headers):
+    """Every format streams the doctor's (filtered) panel with the same rows"""
+    ids = [doctor.id, other_doctor.id]
+    headers = auth_headers(doctor)
+
+    for i in range(5):
+        db.session.add(Patient(name=f'Export {i}', age=40 + i, gender='female', cancer_type='Lung Cancer',
+                               stage='IV' if i % 2 else 'II', doctor_id=ids[0],
+                               diagnosis_date=date(2024, 1, i + 1),
+                               clinical_data=CLINICAL_DATA if i else None))
+    db.session.add(Patient(name='Other Doctor', age=50, gender='male', cancer_type='Lung Cancer',
+                           doctor_id=ids[1]))
+    db.session.commit()
+
+    response = client.get('/api/patients/export?format=ndjson', headers=headers)
+    assert response.status_code == 200 and response.is_streamed
+    assert 'attachment' in response.headers['Content-Disposition']
+    records = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [r['name'] for r in records] == [f'Export {i}' for i in range(5)]
+    assert records[1]['clinical_mutations'] == 'EGFR;TP53' and records[1]['diagnosis_date'] == '2024-01-02'
+    assert records[0]['clinical_tmb'] is None
+
+    response = client.get('/api/patients/export?format=csv&stage=IV', headers=headers)
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert [r['name'] for r in rows] == ['Export 1', 'Export 3']
+    assert rows[0]['clinical_pd_l1'] == '60.0' and rows[0]['clinical_smoker'] == 'False'
+    print("✓ ndjson and csv stream the panel, and take the list filters")
+
+    if patient_export.HAS_PYARROW:
+        import pyarrow.parquet as pq
+        response = client.get('/api/patients/export?format=parquet', headers=headers)
+        table = pq.read_table(io.BytesIO(response.data))
+        assert table.column_names == [name for name, _ in patient_export.COLUMNS]
+        assert table.column('name').to_pylist() == [f'Export {i}' for i in range(5)]
+        assert table.column('clinical_ki67').to_pylist() == [None, 30.0, 30.0, 30.0, 30.0]
+        print("✓ parquet export has the typed schema")
+    else:
+        print("- pyarrow is not installed, parquet check skipped")
+
+    assert client.get('/api/patients/export?format=xlsx', headers=headers).status_code == 400
+    assert client.get('/api/patients/export?min_age=old', headers=headers).status_code == 400
+
+    # Text a spreadsheet would run as a formula is quoted in CSV only; numbers keep their sign
+    db.session.add(Patient(name='=HYPERLINK("http://example.com","x")', age=70, gender='male',
+                           cancer_type='-Lung Cancer', stage='I', doctor_id=ids[0], risk_score=-1.5,
+                           clinical_data={'comorbidities': ['@SUM(A1)', 'asthma'], 'smoker': False}))
+    db.session.commit()
+    response = client.get('/api/patients/export?format=csv&stage=I', headers=headers)
+    [row] = csv.DictReader(io.StringIO(response.data.decode()))
+    assert row['name'] == "'=HYPERLINK(\"http://example.com\",\"x\")"
+    assert row['cancer_type'] == "'-Lung Cancer" and row['clinical_comorbidities'] == "'@SUM(A1);asthma"
+    assert row['risk_score'] == '-1.5'
+    response = client.get('/api/patients/export?format=ndjson&stage=I', headers=headers)
+    assert json.loads(response.data)['name'] == '=HYPERLINK("http://example.com","x")'
+    print("✓ csv quotes formula-like text; other formats keep it as is")
+
+def test_export_streams_in_batches(client, doctor, auth_headers, monkeypatch):
+    """Rows are fetched and written batch by batch, not loaded up front"""
+    monkeypatch.setattr(patient_export, 'BATCH_SIZE', 2)
+    db.session.add_all([Patient(name=f'Batch {i}', age=50, gender='male', cancer_type='Colon Cancer',
+                                doctor_id=doctor.id) for i in range(5)])
+    db.session.commit()
+    response = client.get('/api/patients/export?format=ndjson', headers=auth_headers(doctor), buffered=False)
+    chunks = list(response.response)
+    response.close()
+    assert [len(chunk.splitlines()) for chunk in chunks] == [2, 2, 1]
+    print("✓ Export yields one chunk per fetched batch")
@@ -0,0 +1,53 @@
+"""
+Test sparse fieldsets (?fields=) and the summary view for the patient list
+"""
+from app import db, Patient
+from sqlalchemy import event
+
+
+def _patient_selects(client, url, headers):
+    """GET url and return (response, SQL of the statements that read the patients table)"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM patients' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    return response, statements
+
+
+def test_patient_list_projection(client, doctor, auth_headers):
+    """Summary view and fields= only select and serialize the requested columns"""
+    patient = Patient(name='Fields Patient', age=63, gender='male', cancer_type='Colon Cancer',
+                      stage='III', doctor_id=doctor.id, avatar_url='/api/avatars/' + 'a' * 64 + '.png')
+    patient.set_clinical_data({'comorbidity_score': 0.5})
+    patient.set_ml_recommendations({'treatments': []})
+    db.session.add(patient)
+    db.session.commit()
+
+    headers = auth_headers(doctor)
+
+    full = client.get('/api/patients', headers=headers).get_json()['patients'][0]
+    assert set(full) == set(Patient.FIELDS)
+    assert full['clinical_data'] == {'comorbidity_score': 0.5}
+
+    response, sql = _patient_selects(client, '/api/patients?view=summary', headers)
+    summary = response.get_json()['patients'][0]
+    assert set(summary) == set(Patient.SUMMARY_FIELDS)
+    assert all(summary[k] == full[k] for k in summary)
+    assert sql and not any(col in sql[0] for col in ('clinical_data', 'ml_recommendations', 'treatment_protocol'))
+
+    response, sql = _patient_selects(client, '/api/patients?fields=id,name,avatar_url&limit=5', headers)
+    body = response.get_json()
+    assert body['patients'] == [{'id': patient.id, 'name': 'Fields Patient', 'avatar_url': patient.avatar_url}]
+    assert 'next_cursor' in body
+    assert 'clinical_data' not in sql[0]
+
+    bad = client.get('/api/patients?fields=id,password_hash', headers=headers)
+    assert bad.status_code == 400
+    print(f"✓ Summary view is {len(str(summary))} chars vs {len(str(full))} for the full row")
@@ -0,0 +1,104 @@
+"""
+Test server-side filtering, sorting and name search on GET /api/patients
+"""
+from app import db, Patient
+import patient_search
+from datetime import date, datetime
+from sqlalchemy import select
+
+PATIENTS = [
+    # name, age, cancer_type, stage, status, risk_score, diagnosis_date
+    ('Alice Smithson', 45, 'Lung Cancer', 'II', 'active', 30.0, date(2024, 1, 5)),
+    ('Bob Smith', 67, 'Lung Cancer', 'IV', 'active', 88.0, None),
+    ('Carol Jones', 58, 'Breast Cancer', 'IV', 'remission', 62.0, date(2024, 3, 1)),
+    ('Dan Smythe', 72, 'Colon Cancer', 'III', 'active', 88.0, date(2023, 11, 20)),
+    ('Eve 50%_Off', 39, 'Breast Cancer', 'I', 'inactive', 12.0, None),
+]
+
+
+def _names(client, headers, **params):
+    response = client.get('/api/patients', query_string={'fields': 'id,name', **params}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return [p['name'] for p in response.get_json()['patients']]
+
+
+def _walk(client, headers, **params):
+    """Names over all pages of a paginated listing"""
+    names, cursor = [], None
+    while True:
+        query = {'fields': 'id,name', 'limit': 2, **params}
+        if cursor:
+            query['cursor'] = cursor
+        body = client.get('/api/patients', query_string=query, headers=headers).get_json()
+        names += [p['name'] for p in body['patients']]
+        cursor = body['next_cursor']
+        if not cursor:
+            return names
+
+
+def test_patient_filters_sort_and_search(client, doctor, auth_headers):
+    """Filters, sort keys and ?q= narrow and order the list in SQL, across keyset pages"""
+    doctor_id = doctor.id
+    headers = auth_headers(doctor)
+
+    for name, age, cancer_type, stage, status, risk_score, diagnosed in PATIENTS:
+        patient = Patient(name=name, age=age, gender='female', cancer_type=cancer_type, stage=stage,
+                          status=status, risk_score=risk_score, diagnosis_date=diagnosed,
+                          doctor_id=doctor_id)
+        patient.calculate_risk_level()
+        db.session.add(patient)
+    db.session.commit()
+
+    assert _names(client, headers, risk_level='high') == ['Bob Smith', 'Dan Smythe']
+    assert _names(client, headers, risk_level='High,low', sort='name') == \
+        ['Alice Smithson', 'Bob Smith', 'Dan Smythe', 'Eve 50%_Off']
+    assert _names(client, headers, cancer_type='Breast Cancer', stage='IV') == ['Carol Jones']
+    assert _names(client, headers, status='active', min_age=50, max_age=70) == ['Bob Smith']
+    print("✓ risk_level, cancer_type, stage, status and age range filter in SQL")
+
+    assert _names(client, headers, q='smith', sort='name') == ['Alice Smithson', 'Bob Smith']
+    assert _names(client, headers, q='SM', sort='name') == ['Alice Smithson', 'Bob Smith', 'Dan Smythe']
+    assert _names(client, headers, q='50%_') == ['Eve 50%_Off']
+    assert _names(client, headers, q='50%') == ['Eve 50%_Off']
+    # The FTS index follows renames through its update trigger
+    bob = Patient.query.filter_by(doctor_id=doctor_id, name='Bob Smith').one()
+    bob.name = 'Robert Smith'
+    db.session.commit()
+    assert _names(client, headers, q='bob') == []
+    assert _names(client, headers, q='robert') == ['Robert Smith']
+    print("✓ ?q= is a case-insensitive substring match kept current on rename")
+
+    body = client.get('/api/patients', query_string={'q': 'smi', 'count': 'true', 'limit': 1,
+                                                     'fields': 'id,name'},
+                      headers=headers).get_json()
+    assert body['total'] == 2 and len(body['patients']) == 1 and body['next_cursor']
+    print("✓ ?count=true reports the filtered total alongside one page")
+
+    # Ties are broken by id in the sort direction; NULL diagnosis dates come last either way
+    assert _walk(client, headers, sort='-risk_score') == \
+        ['Dan Smythe', 'Robert Smith', 'Carol Jones', 'Alice Smithson', 'Eve 50%_Off']
+    assert _walk(client, headers, sort='diagnosis_date') == \
+        ['Dan Smythe', 'Alice Smithson', 'Carol Jones', 'Robert Smith', 'Eve 50%_Off']
+    assert _walk(client, headers, sort='-diagnosis_date') == \
+        ['Carol Jones', 'Alice Smithson', 'Dan Smythe', 'Eve 50%_Off', 'Robert Smith']
+    assert _walk(client, headers, sort='-age', stage='IV,III') == ['Dan Smythe', 'Robert Smith', 'Carol Jones']
+    assert _walk(client, headers, sort='-id') == list(reversed(_walk(client, headers)))
+    print("✓ Sorted listings page through every match exactly once")
+
+    for params in ({'sort': 'password'}, {'min_age': 'old'}, {'sort': 'name', 'cursor': 'bm90LWpzb24'},
+                   {'risk_level': 'high', 'since': datetime.utcnow().isoformat()}):
+        assert client.get('/api/patients', query_string=params, headers=headers).status_code == 400, params
+    print("✓ Unknown sort keys, bad values and filtered deltas get 400")
+
+
+def test_name_search_uses_trigram_index(app):
+    """On SQLite, ?q= is answered from the FTS5 trigram table rather than a name scan"""
+    if db.engine.dialect.name != 'sqlite' or not patient_search._enabled.get('sqlite'):
+        print("- FTS5 not available, skipped")
+        return
+    clause = patient_search.name_matches(Patient, 'smith', 'sqlite')
+    sql = select(Patient.id).where(Patient.doctor_id == 1, clause).compile(
+        db.engine, compile_kwargs={'literal_binds': True})
+    plan = ' '.join(row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+    assert 'patients_fts VIRTUAL TABLE' in plan, plan
+    print("✓ Name search reads the trigram index")
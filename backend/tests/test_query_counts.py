@@ -0,0 +1,65 @@
+"""
+Test that list endpoints issue a constant number of SQL statements (no N+1)
+"""
+from app import db, Patient, Appointment, Report, Outcome
+from tests.query_counter import count_queries
+from datetime import datetime, timedelta
+
+# (url template, max statements) - the bound covers auth, the doctor lookup and the list itself
+LIST_ENDPOINTS = [
+    ('/api/patients', 4),
+    ('/api/appointments', 4),
+    ('/api/reports', 4),
+    ('/api/recommendations', 4),
+    ('/api/outcomes/patient/{patient_id}', 4),
+    ('/api/outcomes/comparison/patient/{patient_id}', 4),
+    ('/api/dashboard/summary', 5),
+]
+
+
+def _add_rows(doctor_id, anchor_patient_id, n):
+    for i in range(n):
+        patient = Patient(name=f'Count Patient {i}', age=40 + i, gender='female', cancer_type='Lung Cancer',
+                          stage='II', doctor_id=doctor_id, risk_score=60.0, diagnosis_date=datetime.utcnow().date())
+        patient.set_ml_recommendations({'title': 'Plan', 'treatments': []})
+        db.session.add(patient)
+        db.session.flush()
+        db.session.add(Appointment(patient_id=patient.id, doctor_id=doctor_id,
+                                   appointment_date=datetime.utcnow() + timedelta(days=i)))
+        db.session.add(Report(patient_id=patient.id, doctor_id=doctor_id, report_type='comprehensive'))
+        db.session.add(Outcome(patient_id=anchor_patient_id, doctor_id=doctor_id, treatment_type=f'treatment-{i}'))
+    db.session.commit()
+    # Start every measurement with an empty identity map
+    db.session.expunge_all()
+
+
+def _statement_counts(client, headers, patient_id):
+    counts = {}
+    for template, _ in LIST_ENDPOINTS:
+        url = template.format(patient_id=patient_id)
+        with count_queries(db.engine) as counter:
+            response = client.get(url, headers=headers)
+        assert response.status_code == 200, (url, response.get_json())
+        counts[template] = counter.count
+    return counts
+
+
+def test_list_endpoints_issue_constant_queries(client, doctor, auth_headers):
+    """Statement counts do not grow with the number of rows listed"""
+    anchor = Patient(name='Count Anchor', age=50, gender='male', cancer_type='Lung Cancer',
+                     stage='I', doctor_id=doctor.id)
+    db.session.add(anchor)
+    db.session.commit()
+    doctor_id, patient_id = doctor.id, anchor.id
+    headers = auth_headers(doctor)
+
+    _add_rows(doctor_id, patient_id, 2)
+    small = _statement_counts(client, headers, patient_id)
+
+    _add_rows(doctor_id, patient_id, 10)
+    large = _statement_counts(client, headers, patient_id)
+
+    for template, bound in LIST_ENDPOINTS:
+        assert large[template] == small[template], (template, small[template], large[template])
+        assert large[template] <= bound, (template, large[template])
+        print(f"✓ {template}: {large[template]} statements for 3 and 13 rows")
@@ -0,0 +1,141 @@
+"""
+Test that the per-doctor hot queries use the composite indexes at 100k rows
+
+A scratch SQLite database is created from the models, the indexes are dropped,
+100k rows are loaded per table, and the migration is applied. EXPLAIN QUERY
+PLAN must then show an index search for every hot query (no full table scan
+and no temporary sort for ORDER BY ... LIMIT).
+"""
+import sys
+import os
+import importlib.util
+import random
+import tempfile
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, select, func
+
+from app import db, Patient, Appointment, Report, Outcome
+
+N_ROWS = 100_000
+N_DOCTORS = 50
+MIGRATION = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)),
+    'migrations', 'versions', 'a3c1d9e2f4b7_per_doctor_composite_indexes.py'
+)
+
+
+def _load_migration():
+    spec = importlib.util.spec_from_file_location('per_doctor_composite_indexes', MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _populate(conn):
+    rng = random.Random(7)
+    start = datetime(2023, 1, 1)
+    users = [(i, f'doctor{i}@example.com', 'x', f'Doctor {i}', 'doctor') for i in range(1, N_DOCTORS + 1)]
+    conn.exec_driver_sql('INSERT INTO users (id, email, password_hash, name, role) VALUES (?, ?, ?, ?, ?)', users)
+
+    def stamp(i):
+        return (start + timedelta(minutes=i * 7)).strftime('%Y-%m-%d %H:%M:%S.000000')
+
+    conn.exec_driver_sql(
+        'INSERT INTO patients (id, name, age, gender, cancer_type, stage, diagnosis_date, '
+        'risk_score, risk_level, doctor_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        [
+            (i, f'Patient {i}', rng.randint(25, 90), 'female', 'Lung Cancer', 'II',
+             (start + timedelta(days=i % 900)).strftime('%Y-%m-%d'),
+             score, 'high' if score > 75 else 'medium' if score > 50 else 'low',
+             rng.randint(1, N_DOCTORS), stamp(i))
+            for i, score in ((i, rng.uniform(0, 100)) for i in range(1, N_ROWS + 1))
+        ]
+    )
+    conn.exec_driver_sql(
+        'INSERT INTO appointments (patient_id, doctor_id, appointment_date, created_at) VALUES (?, ?, ?, ?)',
+        [(rng.randint(1, N_ROWS), rng.randint(1, N_DOCTORS), stamp(i), stamp(i)) for i in range(N_ROWS)]
+    )
+    conn.exec_driver_sql(
+        'INSERT INTO reports (patient_id, doctor_id, report_type, generated_at) VALUES (?, ?, ?, ?)',
+        [(rng.randint(1, N_ROWS), rng.randint(1, N_DOCTORS), 'comprehensive', stamp(i)) for i in range(N_ROWS)]
+    )
+    conn.exec_driver_sql(
+        'INSERT INTO outcomes (patient_id, doctor_id, treatment_type, created_at) VALUES (?, ?, ?, ?)',
+        [(rng.randint(1, N_ROWS), rng.randint(1, N_DOCTORS), 'chemo', stamp(i)) for i in range(N_ROWS)]
+    )
+
+
+def _hot_queries():
+    since = datetime(2024, 1, 1)
+    return {
+        'top_risk_patients': (
+            select(Patient.id).where(Patient.doctor_id == 7).order_by(Patient.risk_score.desc()).limit(6),
+            'ix_patients_doctor_id_risk_score',
+        ),
+        'high_risk_count': (
+            select(func.count(Patient.id)).where(Patient.doctor_id == 7, Patient.risk_level == 'high'),
+            'ix_patients_doctor_id_risk_level',
+        ),
+        'patient_growth': (
+            select(func.count(Patient.id)).where(Patient.doctor_id == 7, Patient.diagnosis_date >= since.date()),
+            'ix_patients_doctor_id_diagnosis_date',
+        ),
+        'recent_appointments': (
+            select(Appointment.id).where(Appointment.doctor_id == 7)
+            .order_by(Appointment.created_at.desc()).limit(6),
+            'ix_appointments_doctor_id_created_at',
+        ),
+        'recent_reports': (
+            select(Report.id).where(Report.doctor_id == 7).order_by(Report.generated_at.desc()).limit(6),
+            'ix_reports_doctor_id_generated_at',
+        ),
+        'report_growth': (
+            select(func.count(Report.id)).where(Report.doctor_id == 7, Report.generated_at >= since),
+            'ix_reports_doctor_id_generated_at',
+        ),
+        'patient_outcomes': (
+            select(Outcome.id).where(Outcome.patient_id == 42).order_by(Outcome.created_at.desc()),
+            'ix_outcomes_patient_id_created_at',
+        ),
+    }
+
+
+def _query_plan(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True})
+    rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}').fetchall()
+    return [row[-1] for row in rows]
+
+
+def test_hot_queries_use_composite_indexes():
+    """Every hot per-doctor query is an index search after the migration"""
+    migration = _load_migration()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'indexes.db')}")
+        db.metadata.create_all(engine)
+
+        with engine.begin() as conn:
+            # Start from a pre-migration schema
+            for name, table, _ in migration.INDEXES:
+                conn.exec_driver_sql(f'DROP INDEX {name}')
+            _populate(conn)
+
+            with Operations.context(MigrationContext.configure(conn)):
+                migration.upgrade()
+            conn.exec_driver_sql('ANALYZE')
+
+            for label, (stmt, index) in _hot_queries().items():
+                plan = _query_plan(conn, stmt)
+                detail = ' | '.join(plan)
+                assert any(index in step for step in plan), f'{label}: {detail}'
+                assert not any(step.startswith('SCAN') and 'INDEX' not in step for step in plan), f'{label}: {detail}'
+                assert not any('TEMP B-TREE' in step for step in plan), f'{label}: {detail}'
+                print(f"✓ {label}: {detail}")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    test_hot_queries_use_composite_indexes()
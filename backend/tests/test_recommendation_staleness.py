@@ -0,0 +1,94 @@
+"""
+Test that stored recommendations are served until model inputs or model change
+"""
+from app import db, Patient
+from ml_service import ml_service, recommendation_fingerprint
+
+
+def test_fingerprint_tracks_model_inputs():
+    """Only model features affect the fingerprint"""
+    base = {'age': 60, 'stage': 'III', 'targetable_mutation': True, 'comorbidity_score': 0.4}
+    assert recommendation_fingerprint(base) == recommendation_fingerprint(dict(base))
+    assert recommendation_fingerprint(base) != recommendation_fingerprint({**base, 'age': 61})
+    assert recommendation_fingerprint(base) != recommendation_fingerprint({**base, 'comorbidity_score': 0.5})
+    print("✓ Fingerprint changes with model inputs only")
+
+
+def test_recommendations_recomputed_only_on_change(client, doctor, auth_headers, monkeypatch):
+    """Repeat views reuse the stored copy; changing clinical data recomputes"""
+    patient = Patient(name='Staleness Patient', age=58, gender='male',
+                      cancer_type='Lung Cancer', stage='III', doctor_id=doctor.id)
+    patient.set_clinical_data({'targetable_mutation': False, 'comorbidity_score': 0.4})
+    db.session.add(patient)
+    db.session.commit()
+
+    calls = []
+    original = ml_service.generate_treatment_recommendations
+
+    def counting(patient_data):
+        calls.append(patient_data)
+        return original(patient_data)
+
+    monkeypatch.setattr(ml_service, 'generate_treatment_recommendations', counting)
+    headers = auth_headers(doctor)
+    url = f'/api/recommendations/patient/{patient.id}'
+
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200, first.get_json()
+    recs = first.get_json()['recommendations']
+    assert recs['model_version'] == ml_service.model_version
+    assert len(calls) == 1
+
+    db.session.refresh(patient)
+    updated_at = patient.updated_at
+
+    second = client.get(url, headers=headers)
+    assert second.get_json()['recommendations'] == recs
+    db.session.refresh(patient)
+    if recs.get('treatments'):
+        assert len(calls) == 1
+        assert patient.updated_at == updated_at
+
+    patient.set_clinical_data({'targetable_mutation': True, 'comorbidity_score': 0.4})
+    db.session.commit()
+    third = client.get(url, headers=headers)
+    assert third.get_json()['recommendations']['input_fingerprint'] != recs['input_fingerprint']
+    print(f"✓ {len(calls)} model calls for 3 views (one input change)")
+
+
+def test_null_comorbidity_score_uses_default(client, doctor, auth_headers):
+    """An explicit null or non-numeric comorbidity_score is scored as the 0.3 default, not a 500"""
+    headers = auth_headers(doctor)
+    fingerprints = set()
+    for score in (None, 'high', 0.3):
+        patient = Patient(name=f'Score {score!r}', age=58, gender='male',
+                          cancer_type='Lung Cancer', stage='III', doctor_id=doctor.id)
+        patient.set_clinical_data({'targetable_mutation': False, 'comorbidity_score': score})
+        db.session.add(patient)
+        db.session.commit()
+        response = client.get(f'/api/recommendations/patient/{patient.id}', headers=headers)
+        assert response.status_code == 200, (score, response.get_json())
+        fingerprints.add(response.get_json()['recommendations']['input_fingerprint'])
+    assert len(fingerprints) == 1
+    print("✓ Null and non-numeric comorbidity scores fall back to the default")
+
+
+def test_recommendations_conditional_get(client, doctor, auth_headers, monkeypatch):
+    """The stored copy is revalidated by ETag until a write or a new model version"""
+    patient = Patient(name='ETag Patient', age=58, gender='male',
+                      cancer_type='Lung Cancer', stage='III', doctor_id=doctor.id)
+    db.session.add(patient)
+    db.session.commit()
+    headers = auth_headers(doctor)
+    url = f'/api/recommendations/patient/{patient.id}'
+
+    # The first view computes and stores, which is itself a write
+    client.get(url, headers=headers)
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert client.get(url, headers={**headers, 'If-None-Match': etag}).status_code == 304
+
+    monkeypatch.setattr(ml_service, 'model_version', 'retrained')
+    assert client.get(url, headers={**headers, 'If-None-Match': etag}).status_code == 200
+    print("✓ Recommendations answer 304 until the data or the model version changes")
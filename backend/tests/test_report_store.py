@@ -0,0 +1,78 @@
+"""
+Test compressed, deduplicated report bodies (report_blobs) and the reports API
+"""
+from app import db, Patient, Report, ReportBlob
+import report_store
+from tests.query_counter import count_queries
+from sqlalchemy import select
+
+
+def test_codecs_round_trip():
+    """Bodies hash canonically and every available codec decompresses back"""
+    raw, content_hash = report_store.encode({'b': [1, 2], 'a': 'é'})
+    assert (raw, content_hash) == report_store.encode({'a': 'é', 'b': [1, 2]})
+    codecs = ['zlib'] + (['zstd'] if report_store.HAS_ZSTD else [])
+    for codec in codecs:
+        encoding, data = report_store.compress(raw, codec)
+        assert encoding == codec and report_store.decompress(encoding, data) == raw
+    print(f"✓ Canonical JSON round-trips through {', '.join(codecs)}")
+
+
+def test_report_bodies_are_deduplicated(client, doctor, other_doctor, auth_headers):
+    """Identical reports share one compressed blob; the list ships metadata only"""
+    ids = [doctor.id, other_doctor.id]
+    headers, other_headers = auth_headers(doctor), auth_headers(other_doctor)
+
+    patient = Patient(name='Report Patient', age=64, gender='male', cancer_type='Lung Cancer',
+                      stage='III', doctor_id=ids[0], clinical_data={'notes': 'stable ' * 500})
+    patient.set_ml_recommendations({'treatments': [{'treatment': 'chemo', 'confidence': 0.7}] * 20})
+    db.session.add(patient)
+    db.session.commit()
+    patient_id = patient.id
+
+    created = [client.post(f'/api/reports/patient/{patient_id}', headers=headers) for _ in range(3)]
+    assert all(r.status_code == 201 for r in created)
+    report_ids = [r.get_json()['report']['id'] for r in created]
+    assert created[0].get_json()['report']['report_data']['patient_info']['name'] == 'Report Patient'
+
+    hashes = {h for h, in db.session.execute(select(Report.report_hash).where(Report.id.in_(report_ids)))}
+    assert len(hashes) == 1
+    size, stored = db.session.execute(
+        select(ReportBlob.size, db.func.length(ReportBlob.data)).where(ReportBlob.content_hash.in_(hashes))
+    ).one()
+    assert stored < size / 5, (stored, size)
+    print(f"✓ 3 reports share one blob: {size} bytes of JSON stored in {stored}")
+
+    db.session.expunge_all()
+    with count_queries(db.engine) as counter:
+        listed = client.get('/api/reports', headers=headers).get_json()['reports']
+    assert sorted(r['id'] for r in listed) == sorted(report_ids)
+    assert all('report_data' not in r for r in listed)
+    assert not any('report_blobs' in sql for sql in counter.statements), counter.statements
+
+    response = client.get(f'/api/reports/{report_ids[1]}', headers=headers)
+    assert response.status_code == 200
+    body = response.get_json()['report_data']
+    assert body['patient_info']['clinical_data'] == {'notes': 'stable ' * 500}
+    assert len(body['recommendations']['treatments']) == 20
+    assert client.get(f'/api/reports/{report_ids[1]}', headers=other_headers).status_code == 404
+    print("✓ GET /api/reports lists metadata; GET /api/reports/<id> decompresses the body")
+
+    # A new snapshot gets a new blob; a rolled-back one leaves nothing behind
+    db.session.get(Patient, patient_id).stage = 'IV'
+    db.session.commit()
+    client.post(f'/api/reports/patient/{patient_id}', headers=headers)
+    hashes = {h for h, in db.session.execute(select(Report.report_hash).where(Report.doctor_id == ids[0]))}
+    assert len(hashes) == 2
+    blobs = ReportBlob.query.count()
+    db.session.add(Report(patient_id=patient_id, doctor_id=ids[0], report_type='comprehensive',
+                          report_data={'draft': True}))
+    db.session.flush()
+    db.session.rollback()
+    assert ReportBlob.query.count() == blobs
+
+    Report.query.filter_by(doctor_id=ids[0]).delete()
+    db.session.commit()
+    assert report_store.prune_report_blobs() >= 2
+    assert ReportBlob.query.filter(ReportBlob.content_hash.in_(hashes)).count() == 0
+    print("✓ Changed snapshots get their own blob and prune-report-blobs drops orphans")
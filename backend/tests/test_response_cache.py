@@ -0,0 +1,92 @@
+"""
+Test the dashboard response cache: hits, write-driven invalidation, TTL and LRU eviction
+"""
+import time
+
+from app import db, Patient, Report, dashboard_cache
+from response_cache import MemoryBackend, ResponseCache
+from tests.query_counter import count_queries
+from datetime import datetime
+
+
+def _add_patient(doctor_id, name):
+    patient = Patient(name=name, age=60, gender='female', cancer_type='Lung Cancer', stage='II',
+                      doctor_id=doctor_id, risk_level='high', risk_score=80.0,
+                      diagnosis_date=datetime.utcnow().date())
+    db.session.add(patient)
+    db.session.commit()
+    return patient
+
+
+def test_dashboard_cache_hits_and_invalidation(client, doctor, other_doctor, auth_headers):
+    """Repeated requests are served from the cache until that doctor's data changes"""
+    ids = [doctor.id, other_doctor.id]
+    headers_a, headers_b = auth_headers(doctor), auth_headers(other_doctor)
+    url = '/api/dashboard/summary?range=month'
+
+    _add_patient(ids[0], 'Cache Patient 0')
+    first = client.get(url, headers=headers_a).get_json()
+    assert first['total_patients'] == 1
+    client.get(url, headers=headers_b)
+
+    # A hit only resolves the user
+    with count_queries(db.engine) as counter:
+        again = client.get(url, headers=headers_a).get_json()
+    assert again == first
+    assert counter.count <= 1, counter.statements
+    print(f"✓ Cache hit served in {counter.count} statement(s)")
+
+    # Different parameters are a different entry
+    with count_queries(db.engine) as counter:
+        client.get('/api/dashboard/summary?range=year', headers=headers_a)
+    assert counter.count > 1
+
+    # A committed write for doctor A invalidates A only
+    version_b = dashboard_cache.version(ids[1])
+    patient = _add_patient(ids[0], 'Cache Patient 1')
+    assert client.get(url, headers=headers_a).get_json()['total_patients'] == 2
+    assert dashboard_cache.version(ids[1]) == version_b
+    with count_queries(db.engine) as counter:
+        client.get(url, headers=headers_b)
+    assert counter.count <= 1, counter.statements
+
+    # Report writes and deletes invalidate too; a rollback does not
+    version_a = dashboard_cache.version(ids[0])
+    db.session.add(Report(patient_id=patient.id, doctor_id=ids[0], report_type='comprehensive'))
+    db.session.flush()
+    db.session.rollback()
+    assert dashboard_cache.version(ids[0]) == version_a
+    db.session.delete(db.session.get(Patient, patient.id))
+    db.session.commit()
+    assert dashboard_cache.version(ids[0]) != version_a
+    assert client.get(url, headers=headers_a).get_json()['total_patients'] == 1
+
+    # Bulk deletes can't name the doctor, so they invalidate everyone
+    version_b = dashboard_cache.version(ids[1])
+    Report.query.filter_by(doctor_id=-1).delete()
+    db.session.commit()
+    assert dashboard_cache.version(ids[1]) != version_b
+    print("✓ Writes invalidate only the owning doctor; rollbacks invalidate nothing")
+
+
+def test_memory_backend_ttl_and_lru():
+    """Entries expire after the TTL and the least recently used entry is evicted first"""
+    cache = ResponseCache(MemoryBackend(max_entries=2), ttl_seconds=60)
+    keys = [cache.key('dashboard', 1, r) for r in ('week', 'month', 'year')]
+    cache.set(keys[0], {'n': 0})
+    cache.set(keys[1], {'n': 1})
+    assert cache.get(keys[0]) == {'n': 0}  # now most recently used
+    cache.set(keys[2], {'n': 2})
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == {'n': 0} and cache.get(keys[2]) == {'n': 2}
+
+    cache.invalidate([1])
+    assert cache.get(cache.key('dashboard', 1, 'week')) is None
+
+    short = ResponseCache(MemoryBackend(), ttl_seconds=0.05)
+    key = short.key('dashboard', 1, 'week')
+    short.set(key, {'n': 0})
+    assert short.get(key) == {'n': 0}
+    time.sleep(0.06)
+    assert short.get(key) is None
+    print("✓ TTL expiry and LRU eviction")
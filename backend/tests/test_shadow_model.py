@@ -0,0 +1,80 @@
+"""
+Test shadow model evaluation off the request path
+"""
+import sys
+import os
+import json
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+from shadow_model import ShadowEvaluator
+
+TREATMENTS = ["chemo", "targeted", "immuno"]
+
+
+class SlowConstantModel:
+    """Stand-in candidate model: fixed probabilities, deliberately slow to score"""
+
+    def __init__(self, probs, delay=0.05):
+        self.probs = probs
+        self.delay = delay
+
+    def predict_proba(self, df):
+        time.sleep(self.delay)
+        p = np.array(self.probs[:len(df)])
+        return np.column_stack([1 - p, p])
+
+
+def _build_inputs(patient_data):
+    return pd.DataFrame([{**patient_data, "treatment_type": t} for t in TREATMENTS])
+
+
+def test_shadow_scoring_does_not_block_submit():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "shadow.jsonl")
+        shadow = ShadowEvaluator(
+            SlowConstantModel([0.3, 0.8, 0.5]), model_version="cand", primary_version="prod",
+            build_inputs=_build_inputs, treatments=TREATMENTS, threshold=0.4, log_path=log_path,
+        )
+
+        start = time.perf_counter()
+        for age in range(40, 50):
+            shadow.submit({"age": age, "stage": "II"}, {"chemo": 0.35, "targeted": 0.9, "immuno": 0.2})
+        submit_time = time.perf_counter() - start
+        # Ten inputs at 50ms each would take 0.5s if scored inline
+        assert submit_time < 0.05, submit_time
+
+        shadow.join()
+        stats = shadow.stats()
+        assert stats["scored"] == 10
+        assert stats["top_treatment_agreement"] == 1.0
+        # chemo agrees (<0.4 both), targeted agrees, immuno disagrees (0.2 vs 0.5)
+        assert abs(stats["label_agreement"] - 2 / 3) < 1e-3
+        assert abs(stats["mean_abs_probability_diff"] - (0.05 + 0.1 + 0.3) / 3) < 1e-3
+
+        with open(log_path) as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 10
+        assert records[0]["p"] == [0.35, 0.9, 0.2]
+        assert records[0]["s"] == [0.3, 0.8, 0.5]
+        print("✓ Shadow model scored in the background and logged both predictions")
+
+
+def test_full_queue_drops_instead_of_blocking():
+    shadow = ShadowEvaluator(
+        SlowConstantModel([0.5, 0.5, 0.5], delay=0.2), model_version="cand", primary_version="prod",
+        build_inputs=_build_inputs, treatments=TREATMENTS, threshold=0.4, max_queue=1,
+    )
+    results = [shadow.submit({"age": 50}, {"chemo": 0.5, "targeted": 0.5, "immuno": 0.5}) for _ in range(5)]
+    assert not all(results)
+    assert shadow.stats()["dropped"] >= 1
+    shadow.join()
+    print("✓ Shadow queue drops inputs when the worker falls behind")
+
+
+if __name__ == '__main__':
+    test_shadow_scoring_does_not_block_submit()
+    test_full_queue_drops_instead_of_blocking()
@@ -0,0 +1,63 @@
+"""
+Test that the ML adapter gives identical results when shared across threads
+"""
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from concurrent.futures import ThreadPoolExecutor
+from ml_service import ml_service
+
+PATIENTS = [
+    {'age': 45, 'stage': 'I', 'targetable_mutation': True, 'comorbidity_score': 0.2},
+    {'age': 71, 'stage': 'IV', 'targetable_mutation': False, 'comorbidity_score': 0.8},
+    {'age': 58, 'stage': 'II', 'targetable_mutation': False, 'comorbidity_score': 0.45},
+]
+
+
+def test_shap_explainers_are_pooled():
+    """Explainers outlive the request thread that built them; concurrent callers never share one"""
+    if not ml_service.is_available():
+        print("⚠ ML model not loaded. Run: python create_model_from_notebook.py --synthetic")
+        return
+
+    with ml_service.shap_explainer() as main_explainer:
+        with ml_service.shap_explainer() as nested:
+            assert nested is not main_explainer
+
+    seen = []
+
+    def checkout():
+        with ml_service.shap_explainer() as explainer:
+            seen.append(explainer)
+
+    for _ in range(2):
+        thread = threading.Thread(target=checkout)
+        thread.start()
+        thread.join()
+    assert seen[0] is seen[1] and seen[0] in (main_explainer, nested)
+    print("✓ SHAP explainers are reused across short-lived threads")
+
+
+def test_concurrent_recommendations_match_sequential():
+    """Recommendations from 8 threads match the single-threaded results"""
+    if not ml_service.is_available():
+        print("⚠ ML model not loaded. Run: python create_model_from_notebook.py --synthetic")
+        return
+
+    expected = [ml_service.generate_treatment_recommendations(p) for p in PATIENTS]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        batches = list(pool.map(
+            lambda _: [ml_service.generate_treatment_recommendations(p) for p in PATIENTS], range(8)
+        ))
+
+    for batch in batches:
+        assert batch == expected
+    print(f"✓ {len(batches)} threads returned identical recommendations")
+
+
+if __name__ == '__main__':
+    test_shap_explainers_are_pooled()
+    test_concurrent_recommendations_match_sequential()
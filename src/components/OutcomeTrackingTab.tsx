@@ -35,11 +35,14 @@ import { toast } from "sonner";
 interface OutcomeTrackingTabProps {
   patientId: number;
   patientData?: any;
+  // Comparisons already loaded by the parent (patient bundle); skips the first fetch
+  initialComparisons?: any[];
 }
 
 export function OutcomeTrackingTab({
   patientId,
   patientData,
+  initialComparisons,
 }: OutcomeTrackingTabProps) {
   const [comparisons, setComparisons] = useState<any[]>([]);
   const [loading, setLoading] = useState(false);
@@ -56,8 +59,12 @@ export function OutcomeTrackingTab({
   });
 
   useEffect(() => {
+    if (initialComparisons) {
+      setComparisons(initialComparisons);
+      return;
+    }
     loadComparisons();
-  }, [patientId]);
+  }, [patientId, initialComparisons]);
 
   const loadComparisons = async () => {
     try {
@@ -4,6 +4,7 @@ import { Card } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { motion } from "framer-motion";
 import { HoverCard } from "./HoverCard";
+import { avatarSrc } from "@/services/api";
 
 interface PatientCardProps {
   id: number;
@@ -61,7 +62,7 @@ export function PatientCard({
         <div className="relative flex-shrink-0">
           {avatarUrl ? (
             <img
-              src={avatarUrl}
+              src={avatarSrc(avatarUrl, 128)}
               alt={name}
               className="w-14 h-14 rounded-full object-cover border-2 border-border group-hover:border-primary/30 transition-colors"
             />
@@ -1,31 +1,81 @@
-import { useState, useMemo, useEffect, useCallback } from "react";
+import { useState, useEffect, useCallback, useRef } from "react";
 import { PatientCard } from "./PatientCard";
 import { SearchFilters } from "./SearchFilters";
 import { apiService } from "@/services/api";
 import { Button } from "@/components/ui/button";
 
+// SearchFilters labels -> GET /api/patients ?risk_level= values
+const RISK_LEVEL_PARAMS: Record<string, string> = {
+  "Low Risk": "low",
+  "Medium Risk": "medium",
+  "High Risk": "high",
+};
+const SEARCH_DEBOUNCE_MS = 300;
+
 export function PatientGrid() {
   const [searchQuery, setSearchQuery] = useState("");
+  const [debouncedQuery, setDebouncedQuery] = useState("");
   const [cancerType, setCancerType] = useState("All Types");
   const [riskLevel, setRiskLevel] = useState("All Levels");
 
   const [patients, setPatients] = useState<any[]>([]);
+  const [total, setTotal] = useState<number>(0);
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
 
+  // Pagination: the server pages with keyset cursors, cursors[i] starts page i
+  const [page, setPage] = useState<number>(0);
+  const [cursors, setCursors] = useState<(string | null)[]>([null]);
+  const pageSize = 8;
+
+  // Filters run on the server: a new filter starts again from the first page
+  const resetPaging = () => {
+    setPage(0);
+    setCursors([null]);
+  };
+
+  useEffect(() => {
+    const timer = window.setTimeout(() => {
+      if (searchQuery.trim() === debouncedQuery) return;
+      setDebouncedQuery(searchQuery.trim());
+      resetPaging();
+    }, SEARCH_DEBOUNCE_MS);
+    return () => window.clearTimeout(timer);
+  }, [searchQuery]);
+
+  // Only the latest request may update the grid (responses can arrive out of order)
+  const latestRequest = useRef(0);
+
   const fetchPatients = useCallback(async () => {
+    const requestId = ++latestRequest.current;
     setLoading(true);
     setError(null);
     try {
-      const resp = await apiService.getPatients();
+      const resp = await apiService.getPatients({
+        fields: ["id", "name", "age", "cancer_type", "cancer_subtype", "risk_score", "avatar_url"],
+        limit: pageSize,
+        cursor: cursors[page],
+        count: true,
+        q: debouncedQuery || undefined,
+        cancer_type: cancerType === "All Types" ? undefined : cancerType,
+        risk_level: RISK_LEVEL_PARAMS[riskLevel],
+      });
+      if (requestId !== latestRequest.current) return;
       const data = (resp && (resp.patients || resp.data?.patients)) || [];
       setPatients(data as any[]);
+      setTotal(resp?.total ?? data.length);
+      const nextCursor = resp?.next_cursor ?? null;
+      setCursors((prev) => {
+        const next = prev.slice(0, page + 1);
+        next[page + 1] = nextCursor;
+        return next;
+      });
     } catch (err: any) {
-      setError(err?.message || "Failed to load patients");
+      if (requestId === latestRequest.current) setError(err?.message || "Failed to load patients");
     } finally {
-      setLoading(false);
+      if (requestId === latestRequest.current) setLoading(false);
     }
-  }, []);
+  }, [page, debouncedQuery, cancerType, riskLevel]);
 
   useEffect(() => {
     let mounted = true;
@@ -33,36 +83,7 @@ export function PatientGrid() {
     return () => { mounted = false; };
   }, [fetchPatients]);
 
-  // Pagination
-  const [page, setPage] = useState<number>(0);
-  const pageSize = 8;
-
-  const filteredPatients = useMemo(() => {
-    return patients.filter((patient) => {
-      const name = (patient.name || "").toString();
-      // Search filter
-      const matchesSearch = name.toLowerCase().includes(searchQuery.toLowerCase());
-
-      // Cancer type filter (backend uses snake_case)
-      const pCancer = patient.cancer_type || patient.cancerType || "";
-      const matchesCancerType = cancerType === "All Types" || pCancer === cancerType;
-
-      // Risk level filter
-      const score = Number(patient.risk_score ?? patient.riskScore ?? 0);
-      let matchesRiskLevel = true;
-      if (riskLevel === "Low Risk") matchesRiskLevel = score <= 50;
-      else if (riskLevel === "Medium Risk") matchesRiskLevel = score > 50 && score <= 75;
-      else if (riskLevel === "High Risk") matchesRiskLevel = score > 75;
-
-      return matchesSearch && matchesCancerType && matchesRiskLevel;
-    });
-  }, [patients, searchQuery, cancerType, riskLevel]);
-
-  // Reset page when filters change and current page would be out of range
-  useEffect(() => {
-    const maxPage = Math.max(0, Math.ceil(filteredPatients.length / pageSize) - 1);
-    if (page > maxPage) setPage(0);
-  }, [filteredPatients.length]);
+  const hasNextPage = Boolean(cursors[page + 1]);
 
   return (
     <section className="py-8">
@@ -71,15 +92,21 @@ export function PatientGrid() {
           searchQuery={searchQuery}
           setSearchQuery={setSearchQuery}
           cancerType={cancerType}
-          setCancerType={setCancerType}
+          setCancerType={(type) => {
+            setCancerType(type);
+            resetPaging();
+          }}
           riskLevel={riskLevel}
-          setRiskLevel={setRiskLevel}
+          setRiskLevel={(level) => {
+            setRiskLevel(level);
+            resetPaging();
+          }}
         />
 
         {/* Results count */}
         <div className="mt-4 flex items-center justify-between">
           <p className="text-sm text-muted-foreground">
-            {loading ? "Loading patients..." : error ? `Error: ${error}` : `Showing ${Math.min(pageSize, Math.max(0, filteredPatients.length - page * pageSize))} of ${filteredPatients.length} patients`}
+            {loading ? "Loading patients..." : error ? `Error: ${error}` : `Showing ${patients.length} of ${total} patients`}
           </p>
           <div className="flex items-center gap-2">
             <Button variant="outline" size="sm" onClick={() => fetchPatients()}>
@@ -90,7 +117,7 @@ export function PatientGrid() {
 
         {/* Patient Grid */}
         <div className="mt-6 grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-4">
-          {!loading && !error && filteredPatients.slice(page * pageSize, (page + 1) * pageSize).map((patient, index) => (
+          {!loading && !error && patients.map((patient, index) => (
             <PatientCard
               key={patient.id}
               id={patient.id}
@@ -105,27 +132,23 @@ export function PatientGrid() {
           ))}
         </div>
 
-        {/* Pagination controls + preview of next page first names */}
-        {!loading && !error && filteredPatients.length > pageSize && (
+        {/* Pagination controls */}
+        {!loading && !error && total > pageSize && (
           <div className="mt-6 flex items-center justify-between">
             <div className="flex items-center gap-2">
               <Button size="sm" variant="outline" onClick={() => setPage((p) => Math.max(0, p - 1))} disabled={page === 0}>
                 Previous
               </Button>
-              <Button size="sm" onClick={() => setPage((p) => p + 1)} disabled={(page + 1) * pageSize >= filteredPatients.length}>
+              <Button size="sm" onClick={() => setPage((p) => p + 1)} disabled={!hasNextPage}>
                 Next
               </Button>
-              <div className="text-sm text-muted-foreground">Page {page + 1} of {Math.ceil(filteredPatients.length / pageSize)}</div>
-            </div>
-
-            <div className="text-sm text-muted-foreground">
-              Next: {filteredPatients.slice((page + 1) * pageSize, (page + 1) * pageSize + 3).map((p) => p.name).join(', ') || '—'}
+              <div className="text-sm text-muted-foreground">Page {page + 1} of {Math.ceil(total / pageSize)}</div>
             </div>
           </div>
         )}
 
         {/* Empty state */}
-        {!loading && !error && filteredPatients.length === 0 && (
+        {!loading && !error && patients.length === 0 && (
           <div className="mt-12 text-center py-12 bg-card rounded-xl border border-border/50">
             <p className="text-muted-foreground">
               No patients found matching your criteria.
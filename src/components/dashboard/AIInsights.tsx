@@ -1,7 +1,9 @@
+import { useEffect, useState } from "react";
 import { motion } from "framer-motion";
 import { Sparkles, Brain, ArrowRight, Zap } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { Link } from "react-router-dom";
+import { apiService } from "@/services/api";
 
 interface Insight {
   id: string;
@@ -31,7 +33,40 @@ const insights: Insight[] = [
   },
 ];
 
+interface FeatureImportance {
+  feature: string;
+  mean_abs_shap: number;
+}
+
+// "num__comorbidity_score" -> "Comorbidity score", "cat__treatment_type_immuno" -> "Treatment: immuno"
+const formatFeature = (name: string) => {
+  const raw = name.replace(/^(num|cat)__/, "");
+  if (raw.startsWith("treatment_type_")) return `Treatment: ${raw.replace("treatment_type_", "")}`;
+  const label = raw.replace(/_/g, " ");
+  return label.charAt(0).toUpperCase() + label.slice(1);
+};
+
 export function AIInsights() {
+  const [drivers, setDrivers] = useState<FeatureImportance[]>([]);
+  const [sampleSize, setSampleSize] = useState(0);
+
+  useEffect(() => {
+    let mounted = true;
+    apiService
+      .getGlobalExplanation()
+      .then((resp: any) => {
+        if (!mounted) return;
+        setDrivers((resp?.features || []).slice(0, 4));
+        setSampleSize(Number(resp?.sample_size || 0));
+      })
+      .catch((err) => console.error("Failed to load global explanation:", err));
+    return () => {
+      mounted = false;
+    };
+  }, []);
+
+  const maxImportance = drivers.reduce((max, d) => Math.max(max, d.mean_abs_shap), 0) || 1;
+
   return (
     <div className="relative overflow-hidden rounded-3xl border border-blue-100/50 dark:border-white/10 bg-white dark:bg-slate-950/50 dark:bg-gradient-to-b dark:from-violet-500/5 dark:to-purple-500/5 p-1 backdrop-blur-2xl shadow-[0_8px_30px_rgb(0,0,0,0.04)] dark:shadow-none">
       <div className="absolute inset-0 bg-grid-slate-100/50 dark:bg-grid-white/5 [mask-image:linear-gradient(0deg,transparent,black)]" />
@@ -91,6 +126,32 @@ export function AIInsights() {
           ))}
         </div>
 
+        {drivers.length > 0 && (
+          <div className="mt-6 rounded-xl border border-slate-200 dark:border-white/5 bg-white dark:bg-white/5 p-4 shadow-sm dark:shadow-none">
+            <p className="text-xs font-semibold uppercase tracking-wide text-slate-500 dark:text-slate-400 mb-3">
+              Top model drivers across {sampleSize} patients
+            </p>
+            <div className="space-y-2">
+              {drivers.map((driver) => (
+                <div key={driver.feature} className="flex items-center gap-3">
+                  <span className="w-36 truncate text-xs text-slate-700 dark:text-slate-200">
+                    {formatFeature(driver.feature)}
+                  </span>
+                  <div className="h-1.5 flex-1 rounded-full bg-slate-200 dark:bg-white/10 overflow-hidden">
+                    <div
+                      className="h-full bg-gradient-to-r from-violet-500 to-fuchsia-500"
+                      style={{ width: `${(driver.mean_abs_shap / maxImportance) * 100}%` }}
+                    />
+                  </div>
+                  <span className="w-12 text-right text-xs font-medium text-violet-600 dark:text-violet-300">
+                    {driver.mean_abs_shap.toFixed(3)}
+                  </span>
+                </div>
+              ))}
+            </div>
+          </div>
+        )}
+
         <Button 
           variant="ghost" 
           className="mt-6 w-full justify-between text-slate-500 hover:text-slate-900 dark:text-slate-400 dark:hover:text-white hover:bg-slate-100 dark:hover:bg-white/5 group"
@@ -2,6 +2,7 @@ import { motion } from "framer-motion";
 import { Users, ArrowUpRight, ArrowDownRight, Target, Calendar, Brain, Activity } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { Link } from "react-router-dom";
+import { avatarSrc } from "@/services/api";
 
 export function TopPatients({ patients }: { patients: any[] }) {
   return (
@@ -31,7 +32,7 @@ export function TopPatients({ patients }: { patients: any[] }) {
                 <div className="h-12 w-12 rounded-full overflow-hidden bg-gradient-to-br from-slate-100 to-slate-200 dark:from-slate-700 dark:to-slate-800 flex items-center justify-center text-sm font-bold text-slate-700 dark:text-white uppercase border-2 border-white/10 shadow-sm">
                   {patient.avatar_url || patient.avatarUrl ? (
                     <img 
-                      src={patient.avatar_url || patient.avatarUrl} 
+                      src={avatarSrc(patient.avatar_url || patient.avatarUrl, 128)} 
                       alt={patient.name}
                       className="w-full h-full object-cover"
                     />
@@ -32,7 +32,8 @@ import {
   Video,
   Building2
 } from "lucide-react";
-import { apiService } from "@/services/api";
+import { apiService, mergeDelta } from "@/services/api";
+import { subscribeToChanges } from "@/services/events";
 import { toast } from "@/components/ui/use-toast";
 import AnimatedNumber from "@/components/ui/AnimatedNumber";
 
@@ -126,13 +127,14 @@ export default function Appointments() {
 
   useEffect(() => {
     let mounted = true;
-    const pollMs = 10000;
+    // After the first full load, refetches ask only for what changed since the last sync_token
+    let syncToken: string | null = null;
 
     const load = async () => {
       try {
         setLoading(true);
         setError(null);
-        const resp: any = await apiService.getAppointments();
+        const resp: any = await apiService.getAppointments(syncToken ? { since: syncToken } : undefined);
         const list = resp?.appointments || resp?.data?.appointments || [];
         if (!mounted) return;
         const normalized = (list as any[]).map((a) => {
@@ -165,8 +167,15 @@ export default function Appointments() {
             duration: "30 min",
           };
         });
-        setAppointments(normalized);
+        if (syncToken) {
+          setAppointments((prev) => mergeDelta(prev, normalized, resp?.deleted || []));
+        } else {
+          setAppointments(normalized);
+        }
+        syncToken = resp?.sync_token || null;
       } catch (e: any) {
+        // Includes 410 (token older than the deletion log): the next refetch reloads the full list
+        syncToken = null;
         if (mounted) setError(e?.message || "Unable to load appointments");
       } finally {
         if (mounted) setLoading(false);
@@ -174,10 +183,10 @@ export default function Appointments() {
     };
 
     load();
-    const id = window.setInterval(load, pollMs);
+    const unsubscribe = subscribeToChanges(["appointment", "patient"], load);
     return () => {
       mounted = false;
-      window.clearInterval(id);
+      unsubscribe();
     };
   }, []);
 
@@ -7,6 +7,7 @@ import { Button } from "@/components/ui/button";
 import { Badge } from "@/components/ui/badge";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { Progress } from "@/components/ui/progress";
+import { avatarSrc } from "@/services/api";
 import { 
   ArrowLeft,
   Calendar,
@@ -51,6 +52,7 @@ export default function PatientDetail() {
   const [treatmentHistory, setTreatmentHistory] = useState<any[]>([]);
   const [medications, setMedications] = useState<any[]>([]);
   const [upcomingAppointments, setUpcomingAppointments] = useState<any[]>([]);
+  const [outcomeComparisons, setOutcomeComparisons] = useState<any[] | undefined>(undefined);
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
   
@@ -89,8 +91,8 @@ export default function PatientDetail() {
         setError(null);
         const pid = Number(id);
         const api = (await import("@/services/api")).apiService;
-        const resp = await api.getPatient(pid);
-        const patient = resp?.patient || resp?.data || resp || null;
+        const bundle = await api.getPatientBundle(pid);
+        const patient = bundle?.patient || null;
 
         if (!patient) {
           setError('Patient not found');
@@ -173,14 +175,9 @@ export default function PatientDetail() {
         }
         setMedications(meds);
 
-        // Appointments: fetch and filter by patient id
-        try {
-          const apptResp = await api.getAppointments();
-          const appts = (apptResp?.appointments || apptResp?.data?.appointments || apptResp || []).filter((a: any) => Number(a.patient_id || a.patientId) === Number(patient.id || patient.patient_id));
-          setUpcomingAppointments(appts);
-        } catch {
-          setUpcomingAppointments([]);
-        }
+        // Appointments and outcome comparisons come with the bundle (already filtered to this patient)
+        setUpcomingAppointments(bundle?.appointments || []);
+        setOutcomeComparisons(bundle?.comparisons);
       } catch (err: any) {
         setError(err?.message || 'Failed to load patient');
       } finally {
@@ -220,34 +217,25 @@ export default function PatientDetail() {
     const file = e.target.files?.[0];
     if (!file) return;
 
-    // Validate size (e.g. 2MB)
-    if (file.size > 2 * 1024 * 1024) {
-      toast.error("Image too large. Please select an image under 2MB.");
+    // Validate size (the server accepts up to 5MB)
+    if (file.size > 5 * 1024 * 1024) {
+      toast.error("Image too large. Please select an image under 5MB.");
       return;
     }
 
-    const reader = new FileReader();
-    reader.onloadend = async () => {
-      const base64String = reader.result as string;
-      try {
-        setSaving(true);
-        const pid = Number(id);
-        const api = (await import("@/services/api")).apiService;
-        
-        const resp = await api.updatePatient(pid, { avatar_url: base64String });
-        const updated = resp?.patient || resp?.data || resp;
-        
-        if (updated) {
-          setPatientData(updated);
-          toast.success("Patient photo updated successfully");
-        }
-      } catch (err: any) {
-        toast.error("Failed to upload photo");
-      } finally {
-        setSaving(false);
-      }
-    };
-    reader.readAsDataURL(file);
+    try {
+      setSaving(true);
+      const pid = Number(id);
+      const api = (await import("@/services/api")).apiService;
+
+      const resp = await api.uploadPatientAvatar(pid, file);
+      setPatientData((prev: any) => (prev ? { ...prev, avatar_url: resp.avatar_url } : prev));
+      toast.success("Patient photo updated successfully");
+    } catch (err: any) {
+      toast.error(err?.message || "Failed to upload photo");
+    } finally {
+      setSaving(false);
+    }
   };
 
   if (loading) {
@@ -298,7 +286,7 @@ export default function PatientDetail() {
                 >
                   {patientData?.avatar_url || patientData?.avatarUrl ? (
                     <img 
-                      src={patientData?.avatar_url || patientData?.avatarUrl} 
+                      src={avatarSrc(patientData?.avatar_url || patientData?.avatarUrl, 256)} 
                       alt={patientData?.name || 'Patient'}
                       className="w-full h-full object-cover"
                     />
@@ -538,7 +526,7 @@ export default function PatientDetail() {
               </TabsContent>
 
               <TabsContent value="outcomes" className="space-y-6">
-                <OutcomeTrackingTab patientId={parseInt(id || "1")} patientData={patientData} />
+                <OutcomeTrackingTab patientId={parseInt(id || "1")} patientData={patientData} initialComparisons={outcomeComparisons} />
               </TabsContent>
 
               <TabsContent value="medications" className="space-y-6">
@@ -781,7 +769,7 @@ export default function PatientDetail() {
               <div className="flex-1 bg-muted flex items-center justify-center min-h-[300px] md:min-h-[500px]">
                 {patientData?.avatar_url || patientData?.avatarUrl ? (
                   <img 
-                    src={patientData?.avatar_url || patientData?.avatarUrl} 
+                    src={avatarSrc(patientData?.avatar_url || patientData?.avatarUrl)} 
                     alt={patientData?.name}
                     className="w-full h-full object-contain"
                   />
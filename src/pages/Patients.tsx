@@ -11,6 +11,7 @@ import {
   Activity,
   Filter,
   RefreshCw,
+  Download,
 } from "lucide-react";
 
 type Patient = {
@@ -29,6 +30,10 @@ type Patient = {
 
 type RiskBand = "low" | "medium" | "high";
 
+// The orbit field stays legible up to this many patients; the server returns the first page of matches
+const MAX_FIELD_PATIENTS = 200;
+const SEARCH_DEBOUNCE_MS = 300;
+
 function getRiskBand(score: number): RiskBand {
   if (score <= 50) return "low";
   if (score <= 75) return "medium";
@@ -297,57 +302,70 @@ export default function Patients() {
 
   const navigate = useNavigate();
 
-  const filteredPatients = useMemo(() => {
-    return patientsData.filter((patient) => {
-      const matchesSearch = patient.name
-        .toLowerCase()
-        .includes(searchQuery.toLowerCase());
-
-      const matchesRisk =
-        riskLevel === "All"
-          ? true
-          : riskLevel === "Low"
-          ? getRiskBand(patient.riskScore) === "low"
-          : riskLevel === "Medium"
-          ? getRiskBand(patient.riskScore) === "medium"
-          : getRiskBand(patient.riskScore) === "high";
-
-      const matchesType =
-        cancerTypeFilter === "All Types" ||
-        (patient.cancerType || "").toLowerCase() ===
-          cancerTypeFilter.toLowerCase();
-
-      return matchesSearch && matchesRisk && matchesType;
-    });
-  }, [patientsData, searchQuery, riskLevel, cancerTypeFilter]);
-
-  // Derive simple global intensity signal
-  const overallLoad = useMemo(() => {
-    if (!patientsData.length) return "calm";
-    const high = patientsData.filter(
-      (p) => getRiskBand(p.riskScore) === "high"
-    ).length;
-    const ratio = high / patientsData.length;
-    if (ratio > 0.4) return "critical";
-    if (ratio > 0.2) return "elevated";
-    return "calm";
-  }, [patientsData]);
-
-  const cancerTypes = useMemo(() => {
-    const set = new Set<string>();
-    patientsData.forEach((p) => {
-      if (p.cancerType) set.add(p.cancerType);
-    });
-    return ["All Types", ...Array.from(set).sort()];
-  }, [patientsData]);
-
-  // Fetch patients once on mount and when manual refresh triggered
+  // Filtering and name search run on the server; the field shows one page of matches
+  const [debouncedQuery, setDebouncedQuery] = useState("");
+  const [totalMatches, setTotalMatches] = useState<number>(0);
+  const [knownCancerTypes, setKnownCancerTypes] = useState<string[]>([]);
+
+  useEffect(() => {
+    const timer = window.setTimeout(
+      () => setDebouncedQuery(searchQuery.trim()),
+      SEARCH_DEBOUNCE_MS
+    );
+    return () => window.clearTimeout(timer);
+  }, [searchQuery]);
+
+  const filtersActive =
+    riskLevel !== "All" || cancerTypeFilter !== "All Types" || debouncedQuery !== "";
+  const filteredPatients = patientsData;
+
+  // Derive simple global intensity signal (from the unfiltered panel only)
+  const [overallLoad, setOverallLoad] = useState<"calm" | "elevated" | "critical">("calm");
+
+  const cancerTypes = useMemo(
+    () => ["All Types", ...knownCancerTypes],
+    [knownCancerTypes]
+  );
+
+  const [exporting, setExporting] = useState(false);
+
+  // Download every patient matching the current filters (not just the first page) as CSV
+  const exportPatients = async () => {
+    try {
+      setExporting(true);
+      const api = (await import("@/services/api")).apiService;
+      const blob = await api.exportPatients("csv", {
+        q: debouncedQuery || undefined,
+        risk_level: riskLevel === "All" ? undefined : riskLevel.toLowerCase(),
+        cancer_type: cancerTypeFilter === "All Types" ? undefined : cancerTypeFilter,
+      });
+      const url = URL.createObjectURL(blob);
+      const link = document.createElement("a");
+      link.href = url;
+      link.download = `patients-${new Date().toISOString().slice(0, 10)}.csv`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (e: any) {
+      setError(e?.message || "Failed to export patients");
+    } finally {
+      setExporting(false);
+    }
+  };
+
+  // Fetch the matching patients whenever a filter changes, and on manual refresh
   const fetchPatients = async () => {
     try {
       setLoading(true);
       setError(null);
       const api = (await import("@/services/api")).apiService;
-      const resp = await api.getPatients();
+      const resp = await api.getPatients({
+        view: "summary",
+        limit: MAX_FIELD_PATIENTS,
+        count: true,
+        q: debouncedQuery || undefined,
+        risk_level: riskLevel === "All" ? undefined : riskLevel.toLowerCase(),
+        cancer_type: cancerTypeFilter === "All Types" ? undefined : cancerTypeFilter,
+      });
       const list = resp?.patients || resp?.data?.patients || [];
       const normalized: Patient[] = (list || []).map((p: any) => ({
         id: p.id,
@@ -363,6 +381,20 @@ export default function Patients() {
         raw: p,
       }));
       setPatientsData(normalized);
+      setTotalMatches(resp?.total ?? normalized.length);
+      // Keep every type seen so far selectable, even while a filter hides it
+      setKnownCancerTypes((prev) => {
+        const set = new Set(prev);
+        normalized.forEach((p) => {
+          if (p.cancerType) set.add(p.cancerType);
+        });
+        return Array.from(set).sort();
+      });
+      if (!filtersActive && normalized.length) {
+        const high = normalized.filter((p) => getRiskBand(p.riskScore) === "high").length;
+        const ratio = high / normalized.length;
+        setOverallLoad(ratio > 0.4 ? "critical" : ratio > 0.2 ? "elevated" : "calm");
+      }
     } catch (err: any) {
       setError(err?.message || "Unable to load patients");
       setPatientsData([]);
@@ -372,12 +404,8 @@ export default function Patients() {
   };
 
   useEffect(() => {
-    let mounted = true;
-    if (mounted) fetchPatients();
-    return () => {
-      mounted = false;
-    };
-  }, []);
+    fetchPatients();
+  }, [debouncedQuery, riskLevel, cancerTypeFilter]);
 
   const focusedPatient =
     filteredPatients.find((p) => p.id === focusedId) || filteredPatients[0];
@@ -529,6 +557,18 @@ export default function Patients() {
                         {loading ? "Syncing…" : "Refresh"}
                       </span>
                     </Button>
+                    <Button
+                      variant="outline"
+                      size="sm"
+                      className="h-8 px-3 rounded-full border-slate-200 bg-white/90 text-[11px] text-slate-800 hover:bg-white hover:border-emerald-400/60 gap-1 shadow-sm dark:border-border dark:bg-slate-900/80 dark:text-foreground"
+                      onClick={exportPatients}
+                      disabled={exporting}
+                    >
+                      <Download className="h-3.5 w-3.5" />
+                      <span className="hidden md:inline">
+                        {exporting ? "Exporting…" : "Export CSV"}
+                      </span>
+                    </Button>
                   </div>
                 </div>
 
@@ -693,7 +733,9 @@ export default function Patients() {
                 </div>
                       <div className="flex items-center gap-3">
                         <span className="text-slate-400">
-                          {filteredPatients.length} entities in current view
+                          {totalMatches > filteredPatients.length
+                            ? `${filteredPatients.length} of ${totalMatches} entities in current view`
+                            : `${filteredPatients.length} entities in current view`}
                         </span>
                       </div>
                     </div>
@@ -23,6 +23,7 @@ import {
   Lightbulb
 } from "lucide-react";
 import { apiService } from "@/services/api";
+import { subscribeToChanges } from "@/services/events";
 
 export default function Recommendations() {
   const [selectedCategory, setSelectedCategory] = useState("All");
@@ -50,10 +51,10 @@ export default function Recommendations() {
       }
     };
     load();
-    const id = window.setInterval(load, 15000);
+    const unsubscribe = subscribeToChanges(["recommendation", "patient"], load);
     return () => {
       mounted = false;
-      window.clearInterval(id);
+      unsubscribe();
     };
   }, []);
 
@@ -23,6 +23,7 @@ import {
 } from "lucide-react";
 import { LineChart, Line, BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, PieChart as RechartsPieChart, Pie, Cell, AreaChart, Area } from "recharts";
 import { apiService } from "@/services/api";
+import { subscribeToChanges } from "@/services/events";
 
 export default function Reports() {
   const [reportType, setReportType] = useState("overview");
@@ -114,10 +115,10 @@ export default function Reports() {
     };
 
     load();
-    const id = window.setInterval(load, 20000);
+    const unsubscribe = subscribeToChanges(["patient", "report", "appointment"], load);
     return () => {
       mounted = false;
-      window.clearInterval(id);
+      unsubscribe();
     };
   }, []);
 
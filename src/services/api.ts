@@ -6,7 +6,51 @@ interface ApiResponse<T> {
   [key: string]: any;
 }
 
+interface PageParams {
+  limit?: number;
+  cursor?: string | null;
+  // sync_token from an earlier response: only rows changed since then, plus `deleted` ids
+  since?: string | null;
+}
+
+interface SyncFields {
+  sync_token?: string;
+  deleted?: number[];
+}
+
+interface PatientListParams extends PageParams {
+  // 'summary' returns card fields only (no clinical/ML JSON)
+  view?: 'summary';
+  fields?: string[];
+  // Server-side filters (comma-separated values match any); q is a name substring search
+  risk_level?: string;
+  cancer_type?: string;
+  stage?: string;
+  status?: string;
+  min_age?: number;
+  max_age?: number;
+  q?: string;
+  // Genomics, from the indexed side tables (e.g. mutation: 'EGFR,ALK', msi_status: 'MSI-H')
+  mutation?: string;
+  msi_status?: string;
+  // Column to order by, '-' prefix for descending (e.g. 'name', '-risk_score')
+  sort?: string;
+  // Include `total`, the number of matching patients
+  count?: boolean;
+}
+
+export type ExportFormat = 'ndjson' | 'csv' | 'parquet';
+
+const PATIENT_FILTER_PARAMS = [
+  'risk_level', 'cancer_type', 'stage', 'status', 'min_age', 'max_age', 'q', 'mutation', 'msi_status', 'sort',
+] as const;
+
+// Last ETag + body per GET (keyed by token and endpoint), replayed when the server answers 304
+const MAX_ETAG_ENTRIES = 50;
+
 class ApiService {
+  private etagCache = new Map<string, { etag: string; body: any }>();
+
   private getToken(): string | null {
     return localStorage.getItem('oncoai_token');
   }
@@ -17,7 +61,8 @@ class ApiService {
   ): Promise<T> {
     const token = this.getToken();
     const headers: HeadersInit = {
-      'Content-Type': 'application/json',
+      // FormData bodies set their own multipart Content-Type
+      ...(options.body instanceof FormData ? {} : { 'Content-Type': 'application/json' }),
       ...options.headers,
     };
 
@@ -28,16 +73,28 @@ class ApiService {
       console.log(`[API] Sending request to ${endpoint} without token`);
     }
 
+    const isGet = !options.method || options.method === 'GET';
+    const etagKey = `${token ?? ''} ${endpoint}`;
+    const cached = isGet ? this.etagCache.get(etagKey) : undefined;
+    if (cached) {
+      headers['If-None-Match'] = cached.etag;
+    }
+
     try {
       const response = await fetch(`${API_BASE_URL}${endpoint}`, {
         ...options,
         headers,
       });
 
+      if (response.status === 304 && cached) {
+        return cached.body;
+      }
+
       if (!response.ok) {
         if (response.status === 401) {
           localStorage.removeItem('oncoai_token');
           localStorage.removeItem('oncoai_user');
+          this.etagCache.clear();
           window.dispatchEvent(new Event('auth:logout'));
         }
 
@@ -47,7 +104,16 @@ class ApiService {
         throw new Error(error.message || `HTTP error! status: ${response.status}`);
       }
 
-      return response.json();
+      const body = await response.json();
+      const etag = response.headers.get('ETag');
+      if (isGet && etag) {
+        this.etagCache.delete(etagKey);
+        this.etagCache.set(etagKey, { etag, body });
+        if (this.etagCache.size > MAX_ETAG_ENTRIES) {
+          this.etagCache.delete(this.etagCache.keys().next().value as string);
+        }
+      }
+      return body;
     } catch (error: any) {
       // Handle network errors
       if (error.name === 'TypeError' && error.message.includes('fetch')) {
@@ -99,15 +165,63 @@ class ApiService {
     });
   }
 
+  private pageQuery(page?: PatientListParams): string {
+    if (!page) return '';
+    const params = new URLSearchParams();
+    if (page.limit) params.append('limit', String(page.limit));
+    if (page.cursor) params.append('cursor', page.cursor);
+    if (page.since) params.append('since', page.since);
+    if (page.view) params.append('view', page.view);
+    if (page.fields?.length) params.append('fields', page.fields.join(','));
+    PATIENT_FILTER_PARAMS.forEach((key) => {
+      const value = page[key];
+      if (value !== undefined && value !== null && value !== '') params.append(key, String(value));
+    });
+    if (page.count) params.append('count', 'true');
+    const query = params.toString();
+    return query ? `?${query}` : '';
+  }
+
   // Patient endpoints
-  async getPatients() {
-    return this.request<ApiResponse<{ patients: any[] }>>('/patients');
+  // Without `page` the full list is returned; with it, one page plus `next_cursor` (null on the last page)
+  async getPatients(page?: PatientListParams) {
+    return this.request<ApiResponse<{ patients: any[]; next_cursor?: string | null; total?: number } & SyncFields>>(
+      `/patients${this.pageQuery(page)}`
+    );
+  }
+
+  // Cohort builder: filter is an and/or/not tree of {field, op, value} conditions (see backend/cohort_query.py)
+  async queryCohort(body: {
+    filter?: Record<string, any>;
+    sort?: string;
+    limit?: number;
+    cursor?: string | null;
+    fields?: string[];
+    count?: boolean;
+  }) {
+    return this.request<ApiResponse<{ patients: any[]; next_cursor: string | null; total?: number }>>(
+      '/cohorts/query',
+      { method: 'POST', body: JSON.stringify(body) }
+    );
   }
 
   async getPatient(id: number) {
     return this.request<ApiResponse<any>>(`/patients/${id}`);
   }
 
+  // Patient detail view in one request: patient, their appointments, outcomes,
+  // outcome comparisons and stored recommendations
+  async getPatientBundle(id: number) {
+    return this.request<ApiResponse<{
+      patient: any;
+      appointments: any[];
+      outcomes: any[];
+      comparisons: any[];
+      recommendations: any;
+      recommendations_stale: boolean;
+    }>>(`/patients/${id}/bundle`);
+  }
+
   async createPatient(patientData: any) {
     return this.request<ApiResponse<{ patient: any }>>('/patients', {
       method: 'POST',
@@ -122,6 +236,34 @@ class ApiService {
     });
   }
 
+  // Upload an image file as the patient's avatar; returns the stored image URL
+  async uploadPatientAvatar(id: number, file: File) {
+    const body = new FormData();
+    body.append('avatar', file);
+    return this.request<{ avatar_url: string }>(`/patients/${id}/avatar`, {
+      method: 'POST',
+      body,
+    });
+  }
+
+  // Download the panel (optionally filtered) as a file; the server streams it in batches
+  async exportPatients(format: ExportFormat = 'csv', filters?: PatientListParams): Promise<Blob> {
+    const params = new URLSearchParams({ format });
+    PATIENT_FILTER_PARAMS.forEach((key) => {
+      const value = filters?.[key];
+      if (value !== undefined && value !== null && value !== '') params.append(key, String(value));
+    });
+    const token = this.getToken();
+    const response = await fetch(`${API_BASE_URL}/patients/export?${params}`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+    });
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({ message: `HTTP error! status: ${response.status}` }));
+      throw new Error(error.message || `HTTP error! status: ${response.status}`);
+    }
+    return response.blob();
+  }
+
   async deletePatient(id: number) {
     return this.request<ApiResponse<{ message: string }>>(`/patients/${id}`, {
       method: 'DELETE',
@@ -137,9 +279,23 @@ class ApiService {
     return this.request<ApiResponse<{ recommendations: any[] }>>('/recommendations');
   }
 
+  async getGlobalExplanation(sampleSize?: number) {
+    const query = sampleSize ? `?sample_size=${sampleSize}` : '';
+    return this.request<ApiResponse<{ features: { feature: string; mean_abs_shap: number }[] }>>(
+      `/recommendations/global-explanation${query}`
+    );
+  }
+
   // Reports endpoints
-  async getReports() {
-    return this.request<ApiResponse<{ reports: any[] }>>('/reports');
+  async getReports(page?: PageParams) {
+    return this.request<ApiResponse<{ reports: any[]; next_cursor?: string | null } & SyncFields>>(
+      `/reports${this.pageQuery(page)}`
+    );
+  }
+
+  // The list carries metadata only; fetch a report's body by id
+  async getReport(id: number) {
+    return this.request<any>(`/reports/${id}`);
   }
 
   async generateReport(patientId: number) {
@@ -153,8 +309,10 @@ class ApiService {
   }
 
   // Appointments endpoints
-  async getAppointments() {
-    return this.request<ApiResponse<{ appointments: any[] }>>('/appointments');
+  async getAppointments(page?: PageParams) {
+    return this.request<ApiResponse<{ appointments: any[]; next_cursor?: string | null } & SyncFields>>(
+      `/appointments${this.pageQuery(page)}`
+    );
   }
 
   // Dashboard summary
@@ -193,8 +351,10 @@ class ApiService {
   }
 
   // Outcomes endpoints
-  async getPatientOutcomes(patientId: number) {
-    return this.request<ApiResponse<{ outcomes: any[] }>>(`/outcomes/patient/${patientId}`);
+  async getPatientOutcomes(patientId: number, since?: string | null) {
+    return this.request<ApiResponse<{ outcomes: any[] } & SyncFields>>(
+      `/outcomes/patient/${patientId}${this.pageQuery({ since })}`
+    );
   }
 
   async createOutcome(patientId: number, outcomeData: any) {
@@ -215,6 +375,13 @@ class ApiService {
     return this.request<ApiResponse<{ comparisons: any[] }>>(`/outcomes/comparison/patient/${patientId}`);
   }
 
+  // Short-lived token for the change-event stream (services/events.ts)
+  async getEventStreamToken() {
+    return this.request<{ token: string; expires_in: number }>('/events/token', {
+      method: 'POST',
+    });
+  }
+
   // Health check
   async healthCheck() {
     return this.request<ApiResponse<any>>('/health');
@@ -223,3 +390,27 @@ class ApiService {
 
 export const apiService = new ApiService();
 
+export type AvatarSize = 64 | 128 | 256;
+
+// <img> src for a patient avatar_url: stored avatars resolve against the API, optionally as a thumbnail
+export function avatarSrc(url: string | null | undefined, size?: AvatarSize): string | undefined {
+  if (!url) return undefined;
+  if (!url.startsWith('/api/avatars/')) return url;
+  const src = `${API_BASE_URL}${url.slice('/api'.length)}`;
+  return size ? `${src}?size=${size}` : src;
+}
+
+// Apply a ?since= delta to a list: drop deleted ids, then replace changed rows by id and append new ones
+export function mergeDelta<T extends { id: number }>(current: T[], changed: T[], deleted: number[] = []): T[] {
+  const gone = new Set(deleted);
+  const updates = new Map(changed.map((item) => [item.id, item]));
+  const merged = current
+    .filter((item) => !gone.has(item.id))
+    .map((item) => {
+      const next = updates.get(item.id);
+      updates.delete(item.id);
+      return next ?? item;
+    });
+  return [...merged, ...updates.values()];
+}
+
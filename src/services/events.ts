@@ -0,0 +1,113 @@
+import { apiService } from './api';
+
+const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000/api';
+
+// Server-sent change events (GET /api/events), shared by every subscriber in the tab.
+// Event types are "<entity>.<action>", e.g. patient.updated, appointment.created,
+// report.generated, recommendation.ready; "resync" means events were missed.
+const EVENT_TYPES = [
+  'patient.created',
+  'patient.updated',
+  'patient.deleted',
+  'appointment.created',
+  'appointment.updated',
+  'appointment.deleted',
+  'report.generated',
+  'recommendation.ready',
+  'outcome.saved',
+  'resync',
+];
+
+// Events only reach streams on the worker that handled the write, so pages keep a slow poll
+const FALLBACK_POLL_MS = 120000;
+// Bursts of events (e.g. a patient delete cascading) trigger one refetch
+const REFETCH_DEBOUNCE_MS = 300;
+// Wait before asking for a new stream token after the stream closed or the request failed
+const RECONNECT_MS = 3000;
+
+type ChangeListener = (type: string, data: any) => void;
+
+let source: EventSource | null = null;
+let sourceToken: string | null = null;
+let active = false;
+// Bumped on every connect/disconnect so a late token response or error is ignored
+let generation = 0;
+let lastEventId: string | null = null;
+const listeners = new Set<ChangeListener>();
+
+async function connect() {
+  const attempt = ++generation;
+  active = true;
+  sourceToken = localStorage.getItem('oncoai_token');
+
+  // EventSource cannot send headers, and the session token must not go in a URL:
+  // the stream is opened with a short-lived token that only it accepts
+  let streamToken: string;
+  try {
+    streamToken = (await apiService.getEventStreamToken()).token;
+  } catch {
+    // Pages keep their fallback poll meanwhile
+    if (attempt === generation) window.setTimeout(connect, RECONNECT_MS);
+    return;
+  }
+  if (attempt !== generation) return;
+
+  const params = new URLSearchParams({ stream_token: streamToken });
+  // After a token change or reconnect the new stream resumes from the last event seen
+  if (lastEventId) params.append('lastEventId', lastEventId);
+
+  const stream = new EventSource(`${API_BASE_URL}/events?${params.toString()}`);
+  source = stream;
+  EVENT_TYPES.forEach((type) => {
+    stream.addEventListener(type, (event) => {
+      const message = event as MessageEvent;
+      lastEventId = message.lastEventId || lastEventId;
+      const data = message.data ? JSON.parse(message.data) : {};
+      listeners.forEach((listener) => listener(type, data));
+    });
+  });
+  // Dropped connections are retried by the browser with the same URL; once the
+  // stream token has expired that retry is refused and the source closes
+  stream.onerror = () => {
+    if (stream.readyState === EventSource.CLOSED && attempt === generation) {
+      source = null;
+      window.setTimeout(connect, RECONNECT_MS);
+    }
+  };
+}
+
+function disconnect() {
+  generation++;
+  active = false;
+  source?.close();
+  source = null;
+}
+
+/**
+ * Call `refetch` whenever one of `entities` (e.g. ["appointment"]) changes, instead of
+ * polling. Returns the unsubscribe function (use it as the useEffect cleanup).
+ */
+export function subscribeToChanges(entities: string[], refetch: () => void): () => void {
+  let timer: number | undefined;
+  const listener: ChangeListener = (type) => {
+    if (type !== 'resync' && !entities.includes(type.split('.')[0])) return;
+    window.clearTimeout(timer);
+    timer = window.setTimeout(refetch, REFETCH_DEBOUNCE_MS);
+  };
+
+  const poll = window.setInterval(refetch, FALLBACK_POLL_MS);
+  if (typeof EventSource !== 'undefined') {
+    listeners.add(listener);
+    if (!active || sourceToken !== localStorage.getItem('oncoai_token')) {
+      disconnect();
+      connect();
+    }
+  }
+
+  return () => {
+    window.clearTimeout(timer);
+    window.clearInterval(poll);
+    listeners.delete(listener);
+    if (listeners.size === 0) disconnect();
+  };
+}